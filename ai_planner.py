@@ -1,35 +1,16 @@
 # ai_planner.py
-from openai import OpenAI
+from llm_backends import get_backend, LLMError, LLM_BACKEND, OPENAI_MODEL
+from prompt_format import format_weather_for_prompt, format_hourly_for_prompt
 
-def generate_schedule(api_key, weather_data, hourly_weather_data, activities, plan_type, city, selected_date=None):
-
-
-
-    client = OpenAI(api_key=api_key)
+SYSTEM_PROMPT = "You are a smart activity planner that creates optimized schedules based on weather conditions."
+LLM_TIMEOUT = 300
 
+def build_schedule_prompt(weather_data, hourly_weather_data, activities, plan_type, city, selected_date=None):
 
-    weather_text = "Weather Forecast:\n"
-    hourly_weather_text = "Hourly Weather Details:\n"
-    
-    for date, data in weather_data.items():
-        if data:
-            weather_text += f"{date.strftime('%A, %B %d')}:\n"
-            weather_text += f"  Temperature: {data['temperature']:.1f}°C\n"
-            weather_text += f"  Humidity: {data['humidity']:.1f}%\n"
-            weather_text += f"  Wind Speed: {data['wind_speed']:.1f} m/s\n"
-            weather_text += f"  Precipitation: {data['precipitation']:.1f} mm\n"
-            weather_text += f"  Solar Radiation: {data['solar_radiation']:.1f} W/m²\n\n"
-            
-            hourly_weather_text += f"{date.strftime('%A, %B %d')} Hourly Details:\n"
-            if date in hourly_weather_data and hourly_weather_data[date]:
-                for hour_data in hourly_weather_data[date]:
-                    hour = hour_data['hour']
-                    temp = hour_data['temperature']
-                    humidity = hour_data['humidity']
-                    wind = hour_data['wind_speed']
-                    precip = hour_data['precipitation']
-                    hourly_weather_text += f"  {hour:02d}:00 - Temp: {temp:.1f}°C, Humidity: {humidity:.1f}%, Wind: {wind:.1f} m/s, Precip: {precip:.1f} mm\n"
-            hourly_weather_text += "\n"
+    forecast_dates = [date for date, data in weather_data.items() if data]
+    weather_text = "Weather Forecast (CSV, one row per date):\n" + format_weather_for_prompt(weather_data)
+    hourly_table = format_hourly_for_prompt({date: (hourly_weather_data or {}).get(date) for date in forecast_dates})
+    hourly_weather_text = ("Hourly Weather Details (CSV):\n" + hourly_table) if hourly_table else ""
 
 
     if plan_type == "Daily Plan":
@@ -119,17 +100,124 @@ def generate_schedule(api_key, weather_data, hourly_weather_data, activities, pl
         ## Explanation of Schedule Logic
         [Detailed explanation of why activities were scheduled on specific days and times based on weather conditions]
         """
-    
+    return prompt
+
+def generate_schedule(api_key, weather_data, hourly_weather_data, activities, plan_type, city, selected_date=None):
+
+    prompt = build_schedule_prompt(weather_data, hourly_weather_data, activities, plan_type, city, selected_date)
+
     try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a smart activity planner that creates optimized schedules based on weather conditions."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=2000
-        )
-        return response.choices[0].message.content
-    except Exception as e:
-        raise Exception(f"Error connecting to OpenAI API: {e}")
\ No newline at end of file
+        backend = get_backend("openai", api_key=api_key, model=OPENAI_MODEL)
+        return backend.generate(prompt, temperature=0.7, system=SYSTEM_PROMPT, max_tokens=2000)
+    except LLMError as e:
+        raise Exception(f"Error connecting to OpenAI API: {e}")
+
+# Prompts and calls for the default (CLIMAX_LLM_BACKEND) model, shared by the dashboard and the
+# headless climax CLI. Errors come back as "⚠️ ..." text rather than exceptions.
+
+def llm_generate(prompt, temperature=0.4, backend=None):
+
+    name = backend or LLM_BACKEND
+    try:
+        backend = get_backend(backend, timeout=LLM_TIMEOUT)
+        text = backend.generate(prompt, temperature=temperature)
+    except LLMError as e:
+        return f"⚠️ LLM error ({name}): {e}"
+    return text if text else "⚠️ No response from the local model."
+
+def llm_generate_stream(prompt, temperature=0.4, cancel_event=None, backend=None):
+
+    # Yields text as the model produces it. Closing the generator, or setting cancel_event, drops the
+    # HTTP stream so the model stops generating for an abandoned run.
+    name = backend or LLM_BACKEND
+    produced = False
+    try:
+        backend = get_backend(backend, timeout=LLM_TIMEOUT)
+        for chunk in backend.stream(prompt, temperature=temperature, cancel_event=cancel_event):
+            produced = True
+            yield chunk
+    except LLMError as e:
+        yield f"⚠️ LLM error ({name}): {e}"
+        return
+    if not produced and not (cancel_event is not None and cancel_event.is_set()):
+        yield "⚠️ No response from the local model."
+
+def build_ollama_schedule_prompt(weather_data, activities, plan_type, city, day=None, start_date=None, end_date=None,
+                                 hourly_weather_data=None):
+
+    hourly_table = format_hourly_for_prompt(hourly_weather_data) if hourly_weather_data else ""
+    hourly_text = f"\nHourly weather (CSV, local solar time):\n{hourly_table}\n" if hourly_table else ""
+    if plan_type == "Daily Plan":
+        date_str = day.strftime("%Y-%m-%d") if day else ""
+        return f"""
+You are ClimaX's planner. Create a concise smart schedule.
+
+City: {city}
+Plan type: {plan_type}
+Date: {date_str}
+Activities:
+{activities}
+
+Weather data (CSV, one row per date):
+{format_weather_for_prompt(weather_data)}
+{hourly_text}
+Instructions:
+- Group activities by morning/afternoon/evening.
+- Consider temperature, precipitation, wind, humidity, solar radiation.
+- If outdoor risky (hot >32°C, rain >1mm, wind >15 m/s), suggest alternative or shift.
+- Keep short and practical. English only.
+"""
+    return f"""
+You are ClimaX's planner. Create a 7-day smart weekly plan.
+
+City: {city}
+Plan type: {plan_type}
+Date Range: {start_date} to {end_date}
+Activities (list):
+{activities}
+
+Weather data (CSV, one row per date):
+{format_weather_for_prompt(weather_data)}
+{hourly_text}
+Instructions:
+- Assign each activity to the best day depending on weather.
+- Spread activities logically across the week.
+- If outdoor activities clash with bad weather, move them to better days.
+- Present as a bullet-point plan, **day by day (Mon-Sun)**.
+- Use clear, concise English.
+"""
+
+def generate_schedule_with_ollama(weather_data, activities, plan_type, city, day=None, start_date=None, end_date=None,
+                                  stream=False, cancel_event=None, backend=None, hourly_weather_data=None):
+
+    prompt = build_ollama_schedule_prompt(weather_data, activities, plan_type, city, day, start_date, end_date,
+                                          hourly_weather_data)
+    if stream:
+        return llm_generate_stream(prompt, cancel_event=cancel_event, backend=backend)
+    return llm_generate(prompt, backend=backend)
+
+def build_recommendations_prompt(weather_data, activities_list):
+
+    weather_for_llm = format_weather_for_prompt(weather_data)
+    return f"""
+    You are ClimaX AI assistant.
+
+    Weather data (CSV, one row per date):
+    {weather_for_llm}
+
+    Activities:
+    {activities_list}
+
+    Task: Provide 3-5 concise, practical recommendations for the whole plan.
+    - If Daily Plan → group them into Morning / Afternoon / Evening.
+    - If Weekly Plan → assign activities day by day (Mon–Sun) depending on the weather.
+    - Consider temperature, precipitation, wind, humidity, solar radiation.
+    - Short, actionable, English only. No tables.
+    """
+
+def get_plan_recommendations(weather_data, activities_list, stream=False, cancel_event=None, backend=None):
+
+    prompt = build_recommendations_prompt(weather_data, activities_list)
+    if stream:
+        return llm_generate_stream(prompt, cancel_event=cancel_event, backend=backend)
+    return llm_generate(prompt, backend=backend)
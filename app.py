@@ -1,49 +1,39 @@
 
 import streamlit as st
-import pandas as pd
-import numpy as np
 from datetime import datetime, timedelta
-from pathlib import Path
-import base64
-import mimetypes
-import matplotlib.pyplot as plt
-import requests
-import json
+import math
+import os
+import uuid
 
 
+# Only light modules are imported up front so the form paints quickly on a fresh server. The data
+# pipeline (numpy, pandas, requests), the planner and the chart layer are imported where they are first
+# used, after the widgets are already on screen; see benchmarks/import_budget.py.
 from config import CITIES
-from data_fetcher import get_nasa_weather, create_weather_dataframe, NASA_DATA_START_YEAR
+from assets import find_asset, asset_url
+from metrics import METRICS, timed, start_metrics_server
+from jobs import get_job_registry
 
 st.set_page_config(page_title="ClimaX · Smart Activity Planner", layout="wide", initial_sidebar_state="collapsed")
 
-ROOT = Path(__file__).resolve().parent
-ASSETS_DIR = ROOT / ".streamlit" / "assets"
-
-
-def find_local_asset(name):
-    p = ASSETS_DIR / name
-    return p if p.exists() else None
-
-
-def make_data_uri(path: Path):
-    b = path.read_bytes()
-    mime, _ = mimetypes.guess_type(str(path))
-    if not mime:
-        mime = "application/octet-stream"
-    b64 = base64.b64encode(b).decode("ascii")
-    return f"data:{mime};base64,{b64}"
-
+start_metrics_server()
 
+# Collapsible per-process timings/counters at the bottom of the page; CLIMAX_PERFORMANCE_PANEL=0 hides it.
+SHOW_PERFORMANCE_PANEL = os.environ.get("CLIMAX_PERFORMANCE_PANEL", "1").strip().lower() not in {"0", "false", "no"}
+# CLIMAX_PLANNER=rules builds the schedule with the rule-based scheduler instead of the LLM.
+PLANNER = os.environ.get("CLIMAX_PLANNER", "llm").strip().lower()
+# CLIMAX_HOURLY=0 plans from daily predictions only, skipping the POWER hourly archive.
+HOURLY = os.environ.get("CLIMAX_HOURLY", "1").strip().lower() not in {"0", "false", "no"}
+# Plan creation runs as a background job (jobs.py); the page polls it this often.
+JOB_POLL_SECONDS = float(os.environ.get("CLIMAX_JOB_POLL_SECONDS", "0.5"))
 
 local_logo = None
-for cand in ["nasa-1.svg", "nasa.svg", "logo.svg"]:
-    p = find_local_asset(cand)
-    if p:
-        try:
-            local_logo = make_data_uri(p)
-        except Exception:
-            local_logo = str(p.as_uri())
-        break
+p = find_asset(["nasa-1.svg", "nasa.svg", "logo.svg"])
+if p:
+    try:
+        local_logo = asset_url(p)
+    except Exception:
+        local_logo = str(p.as_uri())
 
 NASA_LOGO = local_logo or "https://raw.githubusercontent.com/baraa194/video-logo-/main/nasa-1.svg"
 
@@ -55,17 +45,12 @@ BACKGROUND_CANDIDATES = [
     "pexels-pixabay-76969.jpeg"
 ]
 
-background_asset = None
-for name in BACKGROUND_CANDIDATES:
-    p = find_local_asset(name)
-    if p:
-        background_asset = p
-        break
+background_asset = find_asset(BACKGROUND_CANDIDATES)
 
 BACKGROUND_DATA_URI = ""
 if background_asset:
     try:
-        BACKGROUND_DATA_URI = make_data_uri(background_asset)
+        BACKGROUND_DATA_URI = asset_url(background_asset, optimize=True)
     except Exception:
         try:
             BACKGROUND_DATA_URI = str(background_asset.as_uri())
@@ -394,176 +379,127 @@ else:
 create_button = st.button("🧠 Create Smart Schedule")
 
 
-OLLAMA_URL = "http://localhost:11434/api/generate"
-OLLAMA_MODEL = "qwen2.5:3b-instruct"
-
-
-def ollama_generate(prompt: str, model: str = OLLAMA_MODEL, timeout: int =300, temperature: float = 0.4) -> str:
-
-    try:
-        payload = {
-            "model": model,
-            "prompt": prompt,
-            "stream": False,           
-            "options": {"temperature": temperature}
-        }
-        resp = requests.post(OLLAMA_URL, json=payload, timeout=timeout)
-        resp.raise_for_status()
-        data = resp.json()
-        text = (data.get("response") or "").strip()
-        return text if text else "⚠️ No response from the local model."
-    except requests.exceptions.RequestException as e:
-        return f"⚠️ Ollama error: {e}"
-    except ValueError:
-        return "⚠️ Failed to parse response from Ollama."
-
-
-def _serialize_weather_keys(d: dict) -> dict:
-    out = {}
-    for k, v in d.items():
-        if hasattr(k, "strftime"):
-            out[k.strftime("%Y-%m-%d")] = v
-        else:
-            out[str(k)] = v
-    return out
-
-def generate_schedule_with_ollama(
-    weather_data: dict,
-    activities: str,
-    plan_type: str,
-    city: str,
-    day: datetime | None,
-    start_date=None,
-    end_date=None
-):
-
-    if plan_type == "Daily Plan":
-        date_str = day.strftime("%Y-%m-%d") if day else ""
-        prompt = f"""
-You are ClimaX's planner. Create a concise smart schedule.
-
-City: {city}
-Plan type: {plan_type}
-Date: {date_str}
-Activities:
-{activities}
-
-Weather data:
-{weather_data}
-
-Instructions:
-- Group activities by morning/afternoon/evening.
-- Consider temperature, precipitation, wind, humidity, solar radiation.
-- If outdoor risky (hot >32°C, rain >1mm, wind >15 m/s), suggest alternative or shift.
-- Keep short and practical. English only.
-"""
-    else:
-        prompt = f"""
-You are ClimaX's planner. Create a 7-day smart weekly plan.
-
-City: {city}
-Plan type: {plan_type}
-Date Range: {start_date} to {end_date}
-Activities (list):
-{activities}
-
-Weather data (by date):
-{weather_data}
-
-Instructions:
-- Assign each activity to the best day depending on weather.
-- Spread activities logically across the week.
-- If outdoor activities clash with bad weather, move them to better days.
-- Present as a bullet-point plan, **day by day (Mon-Sun)**.
-- Use clear, concise English.
-"""
-    return ollama_generate(prompt)
-
-
-
-def get_ai_recommendations_with_ollama(weather_data: dict, activities_list: list[str]) -> str:
-
-    prompt = f"""
-You recommend activity-specific tips based on weather.
-
-Weather(JSON):
-{weather_data}
-
-Activities:
-{activities_list}
-
-For each activity, return 2-4 short bullet points (not tables), considering the weather risks and best timing.
-Language: English.
-"""
-    return ollama_generate(prompt)
-
-
+DAY_PREDICTION_LIMIT = 62
+
+
+def known_day_predictions(city: str, dates: list) -> dict:
+
+    # Per-day (prediction, history, trend) kept in session state keyed by (city, date), so sliding a
+    # weekly plan by a day only computes the one new day. Days this session has not seen come from the
+    # process-wide prediction cache inside the plan job.
+    store = st.session_state.setdefault('day_predictions', {})
+    return {d: store[(city, d)] for d in dates if (city, d) in store}
+
+
+def remember_day_predictions(city: str, predictions: dict) -> None:
+
+    # Failed days are not kept, so they are retried.
+    store = st.session_state.setdefault('day_predictions', {})
+    for d, result in predictions.items():
+        if result[0]:
+            store.pop((city, d), None)
+            store[(city, d)] = result
+    while len(store) > DAY_PREDICTION_LIMIT:
+        store.pop(next(iter(store)))
+
+
+def collect_plan_job(job) -> None:
+
+    # A finished job's result goes into session state, exactly where the results section reads it.
+    result = job.result or {}
+    if job.status == "failed":
+        st.session_state['plan_error'] = f"Could not create the schedule: {job.error}"
+        return
+    if job.status != "done":
+        return
+    remember_day_predictions(result['city'], result['predictions'])
+    if 'error' in result:
+        st.session_state['plan_error'] = result['error']
+        return
+    for key in ('weather_data', 'hourly_weather_data', 'historical_data', 'trend_data', 'extremes', 'activities',
+                'plan_type', 'ai_schedule', 'recommendations'):
+        st.session_state[key] = result[key]
+    st.session_state['selected_city'] = result['city']
+    st.session_state['plan_warnings'] = result['warnings']
+    if result['plan_type'] == "Weekly Plan":
+        st.session_state['start_date'] = result['dates'][0]
+        st.session_state['end_date'] = result['dates'][-1]
+    st.session_state['plan_notice'] = "Smart schedule created successfully!"
+
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def plan_job_progress() -> None:
+
+    # Only this fragment reruns while the job works; the whole page reruns once, when it is done.
+    from plan_jobs import PLAN_STAGES, STAGE_LABELS
+
+    registry = get_job_registry()
+    job = registry.get(st.session_state['session_key'])
+    if job is None:
+        return
+    if not job.done:
+        snapshot = job.snapshot()
+        stage = snapshot['stage']
+        st.progress(job.progress(), text=STAGE_LABELS.get(stage, "Waiting for a free worker...")
+                    + (f" ({PLAN_STAGES.index(stage) + 1}/{len(PLAN_STAGES)})" if stage in PLAN_STAGES else ""))
+        if snapshot['text']:
+            st.subheader("🗓️ Smart Schedule")
+            st.markdown(snapshot['text'])
+        if snapshot['recommendations']:
+            st.subheader("💡 Smart Recommendations")
+            st.markdown(snapshot['recommendations'])
+        if st.button("Cancel", key="cancel_plan_job"):
+            registry.cancel(st.session_state['session_key'])
+        return
+    registry.pop(st.session_state['session_key'], job)
+    collect_plan_job(job)
+    st.rerun()
+
+
+session_key = st.session_state.setdefault('session_key', uuid.uuid4().hex)
 
 if create_button:
     if not activities or (plan_type == "Daily Plan" and not selected_date):
         st.warning("Please enter activities and select a date.")
     else:
-        with st.spinner("📈 Analyzing decades of historical data to predict weather patterns..."):
-            target_date = selected_date if plan_type == "Daily Plan" else start_date
-            st.info(
-                f"Analyzing historical data for {target_date.strftime('%Y-%m-%d')} based on trends from {NASA_DATA_START_YEAR} onwards.")
-
-            weather_data = {}
-            historical_data_for_plot = {}
-            trend_data_for_plot = {}
-            city_coords = CITIES[selected_city]
-
-            if plan_type == "Daily Plan":
-                pred, hist, trend = get_nasa_weather(city_coords, selected_date)
-                if pred:
-                    weather_data[selected_date] = pred
-                    historical_data_for_plot[selected_date] = hist
-                    trend_data_for_plot[selected_date] = trend
-                else:
-                    st.error("Could not retrieve enough historical data to make a prediction.")
-                    st.stop()
-            else:
-                current_date = start_date
-                while current_date <= end_date:
-                    pred, hist, trend = get_nasa_weather(city_coords, current_date)
-                    if pred:
-                        weather_data[current_date] = pred
-                        historical_data_for_plot[current_date] = hist
-                        trend_data_for_plot[current_date] = trend
-                    current_date += timedelta(days=1)
-                if not weather_data:
-                    st.error("Could not retrieve weather forecast for any of the selected days.")
-                    st.stop()
-
-            st.session_state['weather_data'] = weather_data
-            st.session_state['historical_data'] = historical_data_for_plot
-            st.session_state['trend_data'] = trend_data_for_plot
-            st.session_state['activities'] = activities
-            st.session_state['plan_type'] = plan_type
-            st.session_state['selected_city'] = selected_city
-            if plan_type == "Weekly Plan":
-                st.session_state['start_date'] = start_date
-                st.session_state['end_date'] = end_date
-
-            ai_schedule = generate_schedule_with_ollama(
-                weather_data=weather_data,
-                activities=activities,
-                plan_type=plan_type,
-                city=selected_city,
-                day=(selected_date if plan_type == "Daily Plan" else None),
-                start_date=(start_date if plan_type == "Weekly Plan" else None),
-                end_date=(end_date if plan_type == "Weekly Plan" else None)
-            )
-
-            st.session_state['ai_schedule'] = ai_schedule
-            st.success("Smart schedule created successfully!")
+        from plan_jobs import submit_plan
+
+        if plan_type == "Daily Plan":
+            plan_dates = [selected_date]
+        else:
+            plan_dates = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+        submit_plan(session_key, selected_city, CITIES[selected_city], plan_type, plan_dates, activities,
+                    known=known_day_predictions(selected_city, plan_dates), planner=PLANNER, hourly=HOURLY)
+
+if get_job_registry().get(session_key) is not None:
+    plan_job_progress()
+
+if 'plan_error' in st.session_state:
+    st.error(st.session_state.pop('plan_error'))
+for warning in st.session_state.pop('plan_warnings', []):
+    st.warning(warning)
+if 'plan_notice' in st.session_state:
+    st.success(st.session_state.pop('plan_notice'))
 
 
 if 'weather_data' in st.session_state:
+    from data_fetcher import create_weather_dataframe
+    from charts import trend_chart_png
+    from extremes import EXTREME_EVENTS, event_label
+
     weather_data = st.session_state['weather_data']
+    extremes = st.session_state.get('extremes', {})
+    hourly_weather_data = st.session_state.get('hourly_weather_data', {})
     historical_data = st.session_state.get('historical_data', {})
     trend_data = st.session_state.get('trend_data', {})
 
+    if st.session_state.get('ai_schedule'):
+        st.subheader("🗓️ Smart Schedule")
+        if st.session_state['ai_schedule'].startswith("⚠️"):
+            st.error(st.session_state['ai_schedule'])
+        else:
+            st.markdown(st.session_state['ai_schedule'])
+
     st.subheader("🌤️ Predicted Weather Data (Based on Historical Trends)")
     try:
         weather_df = create_weather_dataframe(weather_data)
@@ -586,30 +522,25 @@ if 'weather_data' in st.session_state:
                     st.metric("Pressure", f"{data['pressure']:.1f} hPa")
                     st.metric("Solar Radiation", f"{data.get('solar_radiation', 0):.1f} W/m²")
 
+                odds = extremes.get(date)
+                if odds and odds["years"]:
+                    st.caption(f"Chance over {odds['years']} past years: " + " · ".join(
+                        f"{event_label(event)}: {odds['probabilities'][event[0]]:.0%}"
+                        for event in EXTREME_EVENTS if odds['probabilities'].get(event[0])))
+
+                hours = hourly_weather_data.get(date)
+                if hours:
+                    st.caption("Hour by hour (local solar time)")
+                    st.line_chart({"Temperature (°C)": [h['temperature'] for h in hours],
+                                   "Wind Speed (m/s)": [h['wind_speed'] for h in hours]})
+
                 hist = historical_data.get(date)
                 trend = trend_data.get(date)
-                if hist and trend and not np.isnan(trend['temperature']['slope']):
+                if hist and trend and not math.isnan(trend['temperature']['slope']):
                     try:
-                        years = list(hist.keys())
-                        temps = [hist[y]['temperature'] for y in years]
-                        slope = trend['temperature']['slope']
-                        intercept = trend['temperature']['intercept']
-                        predicted_temp = data['temperature']
-
-                        fig, ax = plt.subplots(figsize=(10, 6))
-                        ax.scatter(years, temps, label='Historical Data Points')
-                        trend_line_x = np.array([min(years), max(years), date.year])
-                        trend_line_y = slope * trend_line_x + intercept
-                        ax.plot(trend_line_x, trend_line_y, linestyle='--', linewidth=2, label='Trend Line')
-                        ax.scatter(date.year, predicted_temp, s=120, zorder=5, label=f'Predicted ({date.year})')
-                        ax.set_xlabel("Year", fontsize=18, color="#0b2a4a")
-                        ax.set_ylabel("Temperature (°C)", fontsize=18, color="#0b2a4a")
-                        ax.set_title(
-                            f"Temperature Trend for {date.strftime('%B %d')} in {st.session_state['selected_city']}",
-                            fontsize=20, color="#0b2a4a")
-                        ax.legend()
-                        ax.grid(True, linestyle=':', alpha=0.6)
-                        st.pyplot(fig)
+                        with timed("plot"):
+                            png = trend_chart_png(st.session_state['selected_city'], date, hist, trend, data['temperature'])
+                            st.image(png, use_container_width=True)
                     except Exception as e:
                         st.write("Plot error:", e)
                 else:
@@ -618,38 +549,29 @@ if 'weather_data' in st.session_state:
     st.subheader("💡 Smart Recommendations")
 
     activities_list = [act.strip() for act in st.session_state.get('activities', '').split('\n') if act.strip()]
+    ai_text = st.session_state.get('recommendations', '')
 
     if not activities_list:
         st.info("Enter activities and press 'Create Smart Schedule' to get recommendations.")
+    elif ai_text.startswith("⚠️"):
+        st.error(ai_text)
+    elif not ai_text.strip() or ai_text.strip().lower() in {"no response.", "no response"}:
+        st.warning("⚠️ No Smart Recommendations generated.")
     else:
-        try:
-            weather_for_llm = _serialize_weather_keys(weather_data)
-
-            prompt = f"""
-    You are ClimaX AI assistant.
-
-    Weather data (JSON):
-    {weather_for_llm}
-
-    Activities:
-    {activities_list}
-
-    Task: Provide 3-5 concise, practical recommendations for the whole plan.
-    - If Daily Plan → group them into Morning / Afternoon / Evening.
-    - If Weekly Plan → assign activities day by day (Mon–Sun) depending on the weather.
-    - Consider temperature, precipitation, wind, humidity, solar radiation.
-    - Short, actionable, English only. No tables.
-    """
-
-            ai_text = ollama_generate(prompt)
-
-            # عرض واضح حتى لو فيه تحذير
-            if not ai_text or not ai_text.strip() or ai_text.strip().lower() in {"no response.", "no response"}:
-                st.warning("⚠️ No Smart Recommendations generated.")
-            elif ai_text.startswith("⚠️"):
-                st.error(ai_text)
-            else:
-                st.markdown(ai_text)
-
-        except Exception as e:
-            st.error(f"Ollama error: {e}")
+        st.markdown(ai_text)
+
+
+if SHOW_PERFORMANCE_PANEL:
+    with st.expander("⏱️ Performance", expanded=False):
+        snapshot = METRICS.snapshot()
+        if snapshot["timers"]:
+            st.dataframe([
+                {"Stage": name, "Calls": t["count"], "Last (ms)": t["last_s"] * 1000,
+                 "Mean (ms)": t["sum_s"] / t["count"] * 1000, "Max (ms)": t["max_s"] * 1000}
+                for name, t in sorted(snapshot["timers"].items())
+            ], use_container_width=True, hide_index=True)
+        if snapshot["counters"]:
+            st.dataframe([{"Counter": name, "Value": value} for name, value in sorted(snapshot["counters"].items())],
+                         use_container_width=True, hide_index=True)
+        if not snapshot["timers"] and not snapshot["counters"]:
+            st.caption("No measurements yet in this server process.")
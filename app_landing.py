@@ -1,15 +1,11 @@
 
 
 import os
-from pathlib import Path
-import base64
-import mimetypes
 import streamlit as st
 
-st.set_page_config(page_title="ClimaX Landing", layout="wide", initial_sidebar_state="collapsed")
+from assets import find_asset, asset_url
 
-ROOT = Path(__file__).resolve().parent
-ASSETS_DIR = ROOT / ".streamlit" / "assets"
+st.set_page_config(page_title="ClimaX Landing", layout="wide", initial_sidebar_state="collapsed")
 
 LOCAL_IMAGE_NAMES = [
     "pexels-mssoymac-15250518.jpg",
@@ -24,23 +20,8 @@ LOCAL_LOGO_NAMES = ["nasa-1.svg", "logo.svg", "nasa.svg"]
 USER_GITHUB_BLOB = "https://github.com/baraa194/video-logo-/blob/main/pexels-mssoymac-15250518.jpg"
 GITHUB_RAW_FALLBACK = USER_GITHUB_BLOB.replace("github.com", "raw.githubusercontent.com").replace("/blob/", "/")
 
-def find_local_asset(candidates):
-    for name in candidates:
-        p = ASSETS_DIR / name
-        if p.exists():
-            return p
-    return None
-
-def make_data_uri(path: Path):
-    b = path.read_bytes()
-    mime, _ = mimetypes.guess_type(str(path))
-    if not mime:
-        mime = "application/octet-stream"
-    b64 = base64.b64encode(b).decode("ascii")
-    return f"data:{mime};base64,{b64}"
-
-local_image_file = find_local_asset(LOCAL_IMAGE_NAMES)
-local_logo_file = find_local_asset(LOCAL_LOGO_NAMES)
+local_image_file = find_asset(LOCAL_IMAGE_NAMES)
+local_logo_file = find_asset(LOCAL_LOGO_NAMES)
 
 image_env = os.environ.get("CLIMAX_BG_IMAGE", "").strip()
 logo_env = os.environ.get("CLIMAX_LOGO", "").strip()
@@ -50,7 +31,7 @@ if image_env:
     IMAGE_SRC = image_env
     IMAGE_SOURCE_TYPE = "env"
 elif local_image_file:
-    IMAGE_SRC = make_data_uri(local_image_file)
+    IMAGE_SRC = asset_url(local_image_file, optimize=True)
     IMAGE_SOURCE_TYPE = f"embedded_local:{local_image_file.name}"
 else:
     IMAGE_SRC = GITHUB_RAW_FALLBACK
@@ -61,7 +42,7 @@ if logo_env:
     LOGO_SOURCE_TYPE = "env"
 elif local_logo_file:
     try:
-        NASA_LOGO = make_data_uri(local_logo_file)
+        NASA_LOGO = asset_url(local_logo_file)
         LOGO_SOURCE_TYPE = f"embedded_local_logo:{local_logo_file.name}"
     except Exception:
         NASA_LOGO = str(local_logo_file.as_uri())
@@ -210,8 +191,8 @@ header, footer { display: none !important; }
     if (fb) fb.style.display = 'block';
     console.error("Background image load error for", url, e);
   };
-  // prevent stale caching during dev
-  img.src = url + (url.includes('?') ? '&_ts=' : '?_ts=') + Date.now();
+  // asset URLs are content-addressed (or inline), so the browser cache can be used as-is
+  img.src = url;
 })();
 </script>
 """
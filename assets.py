@@ -0,0 +1,125 @@
+# assets.py
+import base64
+import hashlib
+import mimetypes
+import os
+import shutil
+from functools import lru_cache
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parent
+ASSETS_DIR = ROOT / ".streamlit" / "assets"
+# Streamlit serves <app dir>/static/* at /app/static/* when server.enableStaticServing is on
+# (see .streamlit/config.toml).
+STATIC_DIR = ROOT / "static"
+STATIC_URL_PREFIX = "app/static"
+OPTIMIZED_DIR = Path(os.environ.get("CLIMAX_CACHE_DIR", "").strip() or ROOT / ".cache") / "assets"
+
+# "static" (default) publishes assets under static/ and references them by URL, so reruns only send a
+# short link instead of the image bytes; "inline" embeds them as data URIs (encoded once per process)
+# and is also the fallback when publishing fails.
+ASSET_MODE = os.environ.get("CLIMAX_ASSET_MODE", "static").strip().lower() or "static"
+BACKGROUND_OPTIMIZE = os.environ.get("CLIMAX_BACKGROUND_OPTIMIZE", "1").strip().lower() not in {"0", "false", "no"}
+BACKGROUND_MAX_WIDTH = int(os.environ.get("CLIMAX_BACKGROUND_MAX_WIDTH", "1920"))
+BACKGROUND_WEBP_QUALITY = int(os.environ.get("CLIMAX_BACKGROUND_WEBP_QUALITY", "75"))
+
+
+def find_asset(candidates, directory=ASSETS_DIR):
+
+    for name in candidates:
+        p = Path(directory) / name
+        if p.exists():
+            return p
+    return None
+
+
+def _fingerprint(path):
+
+    stat = path.stat()
+    return str(path), stat.st_mtime_ns, stat.st_size
+
+
+@lru_cache(maxsize=32)
+def _data_uri(path_str, mtime_ns, size):
+
+    path = Path(path_str)
+    mime, _ = mimetypes.guess_type(path_str)
+    if not mime:
+        mime = "image/webp" if path.suffix == ".webp" else "application/octet-stream"
+    b64 = base64.b64encode(path.read_bytes()).decode("ascii")
+    return f"data:{mime};base64,{b64}"
+
+
+def make_data_uri(path: Path):
+
+    # Memoized on (path, mtime, size): a rerun reuses the encoded string, an edited file is re-read.
+    return _data_uri(*_fingerprint(Path(path)))
+
+
+@lru_cache(maxsize=8)
+def _optimized_image(path_str, mtime_ns, size, max_width, quality):
+
+    try:
+        from PIL import Image
+    except ImportError:
+        return path_str
+    source = Path(path_str)
+    digest = hashlib.sha1(f"{path_str}:{mtime_ns}:{size}:{max_width}:{quality}".encode()).hexdigest()[:10]
+    target = OPTIMIZED_DIR / f"{source.stem}-{max_width}-{digest}.webp"
+    if not target.exists():
+        OPTIMIZED_DIR.mkdir(parents=True, exist_ok=True)
+        with Image.open(source) as image:
+            image = image.convert("RGB")
+            if image.width > max_width:
+                image = image.resize((max_width, round(image.height * max_width / image.width)), Image.LANCZOS)
+            tmp = target.with_suffix(".tmp")
+            image.save(tmp, format="WEBP", quality=quality, method=6)
+            tmp.replace(target)
+    # Keep the original if recompression did not actually help.
+    return str(target) if target.stat().st_size < size else path_str
+
+
+def optimized_image(path, max_width=BACKGROUND_MAX_WIDTH, quality=BACKGROUND_WEBP_QUALITY):
+
+    # Downscaled WebP copy of a raster image (needs Pillow; otherwise the original path is returned).
+    path = Path(path)
+    if path.suffix.lower() not in {".jpg", ".jpeg", ".png"}:
+        return path
+    try:
+        return Path(_optimized_image(*_fingerprint(path), max_width, quality))
+    except OSError:
+        return path
+
+
+@lru_cache(maxsize=32)
+def _publish_static(path_str, mtime_ns, size):
+
+    source = Path(path_str)
+    digest = hashlib.sha1(source.read_bytes()).hexdigest()[:10]
+    # Content-hashed names: a changed file gets a new URL, so browsers can keep the old one cached.
+    name = f"{source.stem}-{digest}{source.suffix}"
+    target = STATIC_DIR / name
+    if not target.exists():
+        STATIC_DIR.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(source, target)
+    return f"{STATIC_URL_PREFIX}/{name}"
+
+
+def publish_static(path):
+
+    return _publish_static(*_fingerprint(Path(path)))
+
+
+def asset_url(path, optimize=False):
+
+    # URL for a local asset in the configured ASSET_MODE; falls back to inlining if publishing fails.
+    path = Path(path)
+    if optimize and BACKGROUND_OPTIMIZE:
+        path = optimized_image(path)
+    if ASSET_MODE == "static":
+        try:
+            return publish_static(path)
+        except OSError:
+            pass
+    return make_data_uri(path)
@@ -0,0 +1,162 @@
+# batch_predict.py
+#
+# Trend predictions for many locations x many dates in one call, as a tidy DataFrame
+# (one row per location and date):
+#   python batch_predict.py --city Cairo --city London --start 2025-07-01 --days 7
+#   python batch_predict.py --locations venues.csv --start 2025-07-01 --end 2025-07-31 --output out.csv
+# A locations file is CSV with name,lat,lon columns.
+import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from config import CITIES
+from coords import coord_key
+from data_fetcher import WEATHER_PARAMS, get_multi_year_weather_data_for_dates, predict_weather_and_get_trend_batch
+from metrics import incr, timed
+
+
+# Locations fetched at once; each one already fans out over POWER_MAX_WORKERS year chunks.
+BATCH_MAX_WORKERS = int(os.environ.get("CLIMAX_BATCH_MAX_WORKERS", "4"))
+
+
+def normalize_locations(locations):
+
+    # {name: {"lat", "lon"}}, [(name, lat, lon)], [(lat, lon)] or [{"name", "lat", "lon"}] -> [(name, coords)].
+    if isinstance(locations, dict):
+        items = [(name, coords["lat"], coords["lon"]) for name, coords in locations.items()]
+    else:
+        items = []
+        for loc in locations:
+            if isinstance(loc, dict):
+                items.append((loc.get("name"), loc["lat"], loc["lon"]))
+            elif len(loc) == 3:
+                items.append(tuple(loc))
+            else:
+                items.append((None, *loc))
+    normalized = []
+    for name, lat, lon in items:
+        lat, lon = float(lat), float(lon)
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            raise ValueError(f"Invalid coordinates: ({lat}, {lon})")
+        # Blank names (None, or NaN from an empty CSV cell) fall back to the coordinates; numeric names are kept.
+        name = "" if name is None or pd.isna(name) else str(name).strip()
+        normalized.append((name or f"{lat:.4f},{lon:.4f}", {"lat": lat, "lon": lon}))
+    return normalized
+
+
+def predict_batch(locations, dates, max_workers=BATCH_MAX_WORKERS, include_trends=False):
+
+    # Each distinct point is fetched once for all dates (names sharing a point share the fetch), points
+    # are fetched concurrently, and every (point, date) history goes through a single vectorized fit.
+    locations = normalize_locations(locations)
+    dates = sorted(set(dates))
+    points = {}
+    for _, coords in locations:
+        points.setdefault(coord_key(coords), coords)
+    incr("batch_points", len(points))
+
+    with timed("batch_fetch"):
+        if len(points) > 1 and max_workers > 1:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(points))) as executor:
+                fetched = list(executor.map(lambda c: get_multi_year_weather_data_for_dates(c, dates), points.values()))
+        else:
+            fetched = [get_multi_year_weather_data_for_dates(c, dates) for c in points.values()]
+    histories = dict(zip(points, fetched))
+
+    keys = [(point, d) for point in points for d in dates]
+    fitted = dict(zip(keys, predict_weather_and_get_trend_batch(
+        [histories[point][d] for point, d in keys], [d.year for _, d in keys])))
+
+    rows = []
+    for name, coords in locations:
+        point = coord_key(coords)
+        for d in dates:
+            prediction, trend = fitted[(point, d)]
+            row = {"location": name, "lat": coords["lat"], "lon": coords["lon"], "date": d,
+                   "years": len(histories[point][d])}
+            for param in WEATHER_PARAMS:
+                row[param] = prediction[param] if prediction else float("nan")
+                if include_trends:
+                    row[f"{param}_slope"] = trend[param]["slope"] if trend else float("nan")
+            rows.append(row)
+    columns = ["location", "lat", "lon", "date", "years", *WEATHER_PARAMS]
+    if include_trends:
+        columns += [f"{param}_slope" for param in WEATHER_PARAMS]
+    return pd.DataFrame(rows, columns=columns)
+
+
+def read_locations_file(path):
+
+    frame = pd.read_csv(path)
+    missing = {"lat", "lon"} - set(frame.columns)
+    if missing:
+        raise ValueError(f"{path} is missing column(s): {', '.join(sorted(missing))}")
+    if "name" not in frame.columns:
+        frame["name"] = None
+    return [(row.name, row.lat, row.lon) for row in frame.itertuples(index=False)]
+
+
+def parse_point(value):
+
+    # "LAT,LON" -> (lat, lon); ValueError for anything else.
+    parts = value.split(",")
+    if len(parts) != 2:
+        raise ValueError(f"--point expects LAT,LON, got {value!r}")
+    try:
+        lat, lon = float(parts[0]), float(parts[1])
+    except ValueError:
+        raise ValueError(f"--point expects numeric LAT,LON, got {value!r}") from None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError(f"--point out of range: {value!r}")
+    return lat, lon
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Batch ClimaX weather predictions for many locations and dates.")
+    parser.add_argument("--city", action="append", default=[], help="Configured city name (repeatable).")
+    parser.add_argument("--point", action="append", default=[], metavar="LAT,LON", help="Arbitrary coordinates (repeatable).")
+    parser.add_argument("--locations", help="CSV file with name,lat,lon columns.")
+    parser.add_argument("--start", required=True, help="First date YYYY-MM-DD.")
+    parser.add_argument("--end", help="Last date YYYY-MM-DD (default: --start + --days - 1).")
+    parser.add_argument("--days", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=BATCH_MAX_WORKERS)
+    parser.add_argument("--trends", action="store_true", help="Add per-parameter slope columns.")
+    parser.add_argument("--output", help="Write CSV here instead of printing.")
+    args = parser.parse_args(argv)
+
+    locations = []
+    if args.city:
+        unknown = [c for c in args.city if c not in CITIES]
+        if unknown:
+            parser.error(f"unknown city: {', '.join(unknown)} (choose from {', '.join(sorted(CITIES))})")
+        locations += [(name, CITIES[name]["lat"], CITIES[name]["lon"]) for name in args.city]
+    for point in args.point:
+        try:
+            locations.append((None, *parse_point(point)))
+        except ValueError as e:
+            parser.error(str(e))
+    if args.locations:
+        locations += read_locations_file(args.locations)
+    if not locations:
+        parser.error("give at least one --city, --point or --locations file")
+
+    start = datetime.strptime(args.start, "%Y-%m-%d").date()
+    end = datetime.strptime(args.end, "%Y-%m-%d").date() if args.end else start + timedelta(days=args.days - 1)
+    if end < start:
+        parser.error("--end is before --start")
+    dates = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+    frame = predict_batch(locations, dates, max_workers=args.workers, include_trends=args.trends)
+    if args.output:
+        frame.to_csv(args.output, index=False, float_format="%.3f")
+    else:
+        print(frame.to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,115 @@
+# benchmarks/import_budget.py
+#
+# Cold-start guard: imports each entry point's top-level dependencies in a fresh interpreter under
+# `python -X importtime` and fails if the import time exceeds its budget, or if a module that should
+# only load on first use (pandas, matplotlib, ...) is pulled in up front.
+#   python benchmarks/import_budget.py                   # all entry points, default budgets
+#   python benchmarks/import_budget.py --budget-ms 600   # tighter budget for every entry point
+#   python benchmarks/import_budget.py --top 15          # also list the slowest imports
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+HEAVY_MODULES = ["pandas", "numpy", "matplotlib", "requests", "openai", "PIL"]
+
+# entry point -> (budget in ms, modules that must not be imported at startup)
+ENTRY_POINTS = {
+    "app.py": (900, HEAVY_MODULES),
+    "app_landing.py": (900, HEAVY_MODULES),
+    "climax.py": (1500, ["streamlit", "matplotlib", "openai"]),
+}
+
+
+def top_level_imports(path):
+
+    # Import statements that run when the script starts; imports nested in functions or blocks are lazy.
+    source = Path(path).read_text(encoding="utf-8")
+    return [ast.get_source_segment(source, node)
+            for node in ast.parse(source).body if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+def measure_imports(statements, env):
+
+    # -> (cumulative_ms, {module: cumulative_us}, loaded module names) for one fresh interpreter.
+    code = "\n".join(statements) + "\nimport sys, json\nprint(json.dumps(sorted(sys.modules)))"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, env=env,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed")
+    total_us = 0
+    per_module = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        per_module[name] = int(cumulative)
+        # Top-level entries have no indentation; their cumulative times add up to the whole import.
+        if not line.split("|")[2].startswith("  "):
+            total_us += int(cumulative)
+    return total_us / 1000, per_module, json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def check_entry_point(name, budget_ms, forbidden, runs, env):
+
+    statements = top_level_imports(ROOT / name)
+    best = None
+    for _ in range(runs):
+        total_ms, per_module, loaded = measure_imports(statements, env)
+        if best is None or total_ms < best[0]:
+            best = (total_ms, per_module, loaded)
+    total_ms, per_module, loaded = best
+    eager = [m for m in forbidden if m in loaded]
+    return {"entry": name, "import_ms": total_ms, "budget_ms": budget_ms, "eager": eager,
+            "ok": total_ms <= budget_ms and not eager, "per_module": per_module}
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Check ClimaX cold-start import time against a budget.")
+    parser.add_argument("entry", nargs="*", help=f"Entry points to check (default: all of {', '.join(ENTRY_POINTS)}).")
+    parser.add_argument("--budget-ms", type=float, default=None, help="Override every entry point's budget.")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters per entry point; the fastest counts.")
+    parser.add_argument("--top", type=int, default=0, help="List the N slowest imports per entry point.")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.entry if name not in ENTRY_POINTS]
+    if unknown:
+        parser.error(f"unknown entry point(s): {', '.join(unknown)}")
+
+    env = dict(os.environ)
+    scratch = tempfile.mkdtemp(prefix="climax-imports-")
+    env.setdefault("CLIMAX_CACHE_DIR", str(Path(scratch) / "cache"))
+    env.setdefault("CLIMAX_TILES_DIR", str(Path(scratch) / "tiles"))
+
+    failed = False
+    for name in args.entry or ENTRY_POINTS:
+        budget_ms, forbidden = ENTRY_POINTS[name]
+        if args.budget_ms is not None:
+            budget_ms = args.budget_ms
+        try:
+            result = check_entry_point(name, budget_ms, forbidden, args.runs, env)
+        except RuntimeError as e:
+            print(f"{name:16} FAILED to import: {e}")
+            failed = True
+            continue
+        status = "ok" if result["ok"] else "OVER BUDGET" if not result["eager"] else "EAGER IMPORTS"
+        line = f"{name:16} {result['import_ms']:8.1f} ms / {budget_ms:.0f} ms  {status}"
+        if result["eager"]:
+            line += f" ({', '.join(result['eager'])})"
+        print(line)
+        if args.top or not result["ok"]:
+            slowest = sorted(result["per_module"].items(), key=lambda item: -item[1])[:args.top or 10]
+            for module, us in slowest:
+                print(f"    {us / 1000:8.1f} ms  {module}")
+        failed = failed or not result["ok"]
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
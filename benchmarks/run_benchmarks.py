@@ -0,0 +1,214 @@
+# benchmarks/run_benchmarks.py
+#
+# Offline benchmarks for the plan pipeline: fetch -> fit -> DataFrame -> prompt -> LLM -> render.
+# NASA POWER is served from benchmarks/fixtures (recorded or synthetic) and the LLM is the stub
+# backend, so results only measure ClimaX itself.
+#
+#   python benchmarks/run_benchmarks.py                       # all stages, all CITIES
+#   python benchmarks/run_benchmarks.py --json out.json       # save results
+#   python benchmarks/run_benchmarks.py --compare out.json    # exit 1 if p50 regressed > tolerance
+#   python benchmarks/run_benchmarks.py --record              # re-record fixtures from NASA POWER
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# Isolate every on-disk cache and tile directory before the ClimaX modules read their settings.
+_WORKDIR = tempfile.mkdtemp(prefix="climax-bench-")
+os.environ["CLIMAX_CACHE_DIR"] = str(Path(_WORKDIR) / "cache")
+os.environ["CLIMAX_TILES_DIR"] = str(Path(_WORKDIR) / "tiles")
+os.environ["CLIMAX_LLM_BACKEND"] = "stub"
+# Fixtures answer instantly; do not let the POWER rate limiter dominate the timings.
+os.environ["CLIMAX_POWER_RATE_PER_SECOND"] = "0"
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import power_client
+from ai_planner import build_schedule_prompt
+from charts import get_chart_cache, trend_chart_png
+from config import CITIES
+from data_fetcher import (
+    NASA_DATA_START_YEAR, POWER_PARAMETERS, WEATHER_PARAMS, create_weather_dataframe,
+    get_multi_year_weather_data_for_dates, get_nasa_weather_for_dates, predict_weather_and_get_trend_batch,
+)
+from llm_backends import get_backend
+from llm_cache import get_llm_cache
+from prompt_format import format_weather_for_prompt
+from scheduler import plan_schedule
+from weather_block import WeatherBlock
+from weather_cache import get_weather_cache
+
+from power_fixtures import FixtureSession, fixture_is_synthetic, load_fixtures, record_fixtures
+
+ACTIVITIES = "Morning jog\nGrocery shopping\nPicnic in the park\nGym 7:00 PM\nEvening walk"
+
+
+def percentile(sorted_values, q):
+
+    if not sorted_values:
+        return float("nan")
+    k = (len(sorted_values) - 1) * q
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def measure(fn, setup=None, repeat=20, warmup=1):
+
+    # Latency percentiles over `repeat` timed runs, then one extra run under tracemalloc for peak memory.
+    for _ in range(warmup):
+        if setup:
+            setup()
+        fn()
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        gc.collect()
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    if setup:
+        setup()
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    times.sort()
+    return {
+        "runs": repeat,
+        "mean_ms": statistics.fmean(times) * 1000,
+        "p50_ms": percentile(times, 0.50) * 1000,
+        "p95_ms": percentile(times, 0.95) * 1000,
+        "p99_ms": percentile(times, 0.99) * 1000,
+        "peak_kib": peak / 1024,
+    }
+
+
+def plan_pipeline(city, coords, dates, plan_type):
+
+    results = get_nasa_weather_for_dates(coords, dates)
+    weather_data = WeatherBlock.from_records({d: r[0] for d, r in results.items() if r[0]}, WEATHER_PARAMS)
+    create_weather_dataframe(weather_data)
+    prompt = build_schedule_prompt(weather_data, {}, ACTIVITIES, plan_type, city, dates[0])
+    get_backend("stub").generate(prompt, use_cache=False)
+    for d, (pred, hist, trend) in results.items():
+        if pred:
+            trend_chart_png(city, d, hist, trend, pred["temperature"])
+
+
+def run_suite(cities, repeat, target):
+
+    week = [target + timedelta(days=i) for i in range(7)]
+    cache = get_weather_cache()
+    results = {}
+
+    for name, coords in cities.items():
+        results[f"fetch_cold_daily[{name}]"] = measure(
+            lambda: get_multi_year_weather_data_for_dates(coords, [target]), setup=cache.clear, repeat=max(3, repeat // 4))
+        results[f"fetch_warm_weekly[{name}]"] = measure(
+            lambda: get_multi_year_weather_data_for_dates(coords, week), repeat=repeat)
+        results[f"fetch_warm_weekly_window7[{name}]"] = measure(
+            lambda: get_multi_year_weather_data_for_dates(coords, week, window_days=7), repeat=repeat)
+
+    coords = next(iter(cities.values()))
+    city = next(iter(cities))
+    histories = list(get_multi_year_weather_data_for_dates(coords, week).values())
+    fitted = predict_weather_and_get_trend_batch(histories, [d.year for d in week])
+    weather_data = WeatherBlock.from_records({d: f[0] for d, f in zip(week, fitted)}, WEATHER_PARAMS)
+    prompt = build_schedule_prompt(weather_data, {}, ACTIVITIES, "Weekly Plan", city)
+
+    results["fit_weekly"] = measure(lambda: predict_weather_and_get_trend_batch(histories, [d.year for d in week]), repeat=repeat)
+    results["dataframe_weekly"] = measure(lambda: create_weather_dataframe(weather_data), repeat=repeat)
+    results["prompt_weekly"] = measure(lambda: (format_weather_for_prompt(weather_data),
+                                                build_schedule_prompt(weather_data, {}, ACTIVITIES, "Weekly Plan", city)), repeat=repeat)
+    results["schedule_rules_weekly"] = measure(lambda: plan_schedule(weather_data, ACTIVITIES, "Weekly Plan", week),
+                                               repeat=repeat)
+    results["llm_stub"] = measure(lambda: get_backend("stub").generate(prompt, use_cache=False), repeat=repeat)
+    chart_args = (city, week[0], histories[0], fitted[0][1], fitted[0][0]["temperature"])
+    results["render_trend"] = measure(lambda: trend_chart_png(*chart_args), setup=get_chart_cache().clear,
+                                      repeat=max(3, repeat // 4))
+    results["render_trend_cached"] = measure(lambda: trend_chart_png(*chart_args), repeat=repeat)
+
+    for name, coords in cities.items():
+        results[f"plan_daily[{name}]"] = measure(lambda: plan_pipeline(name, coords, [target], "Daily Plan"), repeat=max(3, repeat // 4))
+        results[f"plan_weekly[{name}]"] = measure(lambda: plan_pipeline(name, coords, week, "Weekly Plan"), repeat=max(3, repeat // 4))
+    get_llm_cache().clear()
+    get_chart_cache().clear()
+    return results
+
+
+def print_table(results, baseline=None):
+
+    header = f"{'benchmark':34} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'peak KiB':>10}"
+    if baseline:
+        header += f" {'vs base':>9}"
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        line = f"{name:34} {r['p50_ms']:10.2f} {r['p95_ms']:10.2f} {r['p99_ms']:10.2f} {r['peak_kib']:10.0f}"
+        if baseline and name in baseline:
+            line += f" {r['p50_ms'] / baseline[name]['p50_ms'] - 1:+9.0%}"
+        print(line)
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the ClimaX plan pipeline.")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--city", action="append", choices=sorted(CITIES), help="Limit to one city (repeatable).")
+    parser.add_argument("--date", default=None, help="Target date YYYY-MM-DD (default: today).")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Simulated NASA POWER round trip per request.")
+    parser.add_argument("--json", dest="json_out", default=None, help="Write results to this file.")
+    parser.add_argument("--compare", default=None, help="Baseline JSON from a previous --json run.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed p50 slowdown vs the baseline.")
+    parser.add_argument("--record", action="store_true", help="Record fixtures from NASA POWER (needs network).")
+    args = parser.parse_args(argv)
+
+    cities = {name: CITIES[name] for name in (args.city or CITIES)}
+    target = datetime.strptime(args.date, "%Y-%m-%d").date() if args.date else date.today()
+    end_year = date.today().year - 1
+    codes = list(POWER_PARAMETERS.values())
+
+    if args.record:
+        record_fixtures(cities, codes, NASA_DATA_START_YEAR, end_year, power_client.fetch_json)
+    session = FixtureSession(load_fixtures(cities, codes, NASA_DATA_START_YEAR, end_year), args.latency_ms / 1000)
+    power_client._session = session
+
+    results = run_suite(cities, args.repeat, target)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+    print_table(results, baseline)
+    synthetic = [name for name in cities if fixture_is_synthetic(name)]
+    print(f"\nNASA POWER fixture requests: {session.requests} ({session.bytes / 1e6:.1f} MB)"
+          + (f"; synthetic series for {', '.join(synthetic)}" if synthetic else ""))
+
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump({"date": target.isoformat(), "repeat": args.repeat, "results": results}, f, indent=2)
+
+    if baseline:
+        regressed = [name for name, r in results.items()
+                     if name in baseline and r["p50_ms"] > baseline[name]["p50_ms"] * (1 + args.tolerance)]
+        if regressed:
+            print(f"\np50 regressions beyond {args.tolerance:.0%}: {', '.join(regressed)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
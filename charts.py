@@ -0,0 +1,77 @@
+# charts.py
+import hashlib
+import io
+import os
+
+from lru import LRUCache
+from metrics import incr, timed
+
+
+# Rendered trend charts kept per process, keyed by (city, date, hash of the plotted data); reruns and
+# other sessions looking at the same day reuse the PNG instead of drawing a new figure.
+CHART_CACHE_MAX_ENTRIES = int(os.environ.get("CLIMAX_CHART_CACHE_MAX_ENTRIES", "128"))
+CHART_DPI = int(os.environ.get("CLIMAX_CHART_DPI", "100"))
+TEXT_COLOR = "#0b2a4a"
+
+
+_chart_cache = LRUCache(CHART_CACHE_MAX_ENTRIES)
+
+
+def get_chart_cache():
+
+    return _chart_cache
+
+
+def _data_hash(years, temps, slope, intercept, predicted_temp):
+
+    import numpy as np
+
+    digest = hashlib.sha1()
+    digest.update(np.asarray(years, dtype=np.int64).tobytes())
+    digest.update(np.asarray(temps, dtype=np.float64).tobytes())
+    digest.update(np.asarray([slope, intercept, predicted_temp], dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+def render_trend_png(years, temps, slope, intercept, predicted_temp, target_date, city, dpi=CHART_DPI):
+
+    # Figure + Agg canvas directly, never pyplot: nothing is registered in pyplot's global figure list,
+    # so the figure is freed as soon as the PNG has been written.
+    import numpy as np
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(10, 6))
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    ax.scatter(years, temps, label='Historical Data Points')
+    trend_line_x = np.array([min(years), max(years), target_date.year])
+    ax.plot(trend_line_x, slope * trend_line_x + intercept, linestyle='--', linewidth=2, label='Trend Line')
+    ax.scatter(target_date.year, predicted_temp, s=120, zorder=5, label=f'Predicted ({target_date.year})')
+    ax.set_xlabel("Year", fontsize=18, color=TEXT_COLOR)
+    ax.set_ylabel("Temperature (°C)", fontsize=18, color=TEXT_COLOR)
+    ax.set_title(f"Temperature Trend for {target_date.strftime('%B %d')} in {city}", fontsize=20, color=TEXT_COLOR)
+    ax.legend()
+    ax.grid(True, linestyle=':', alpha=0.6)
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=dpi, bbox_inches="tight")
+    fig.clear()
+    return buf.getvalue()
+
+
+def trend_chart_png(city, target_date, history, trend, predicted_temp, cache=None):
+
+    # history is the WeatherBlock behind the prediction, trend the per-parameter slope/intercept dict.
+    cache = cache if cache is not None else _chart_cache
+    years, temps = history.index, history.column('temperature')
+    slope, intercept = trend['temperature']['slope'], trend['temperature']['intercept']
+    key = (city, target_date, _data_hash(years, temps, slope, intercept, predicted_temp))
+    png = cache.get(key)
+    if png is not None:
+        incr("chart_cache_hits")
+        return png
+    incr("chart_cache_misses")
+    with timed("chart_render"):
+        png = render_trend_png(years, temps, slope, intercept, predicted_temp, target_date, city)
+    cache.put(key, png)
+    return png
@@ -0,0 +1,199 @@
+# climatology_tiles.py
+import calendar
+import os
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+
+from coords import coord_key
+from trends import fit_linear_trends, window_means
+from weather_block import WeatherBlock
+
+
+ROOT = Path(__file__).resolve().parent
+TILES_DIR = Path(os.environ.get("CLIMAX_TILES_DIR", "").strip() or ROOT / "climatology")
+DAYS_PER_TILE = 366
+
+
+def day_of_year_index(d):
+
+    # Position in a leap-year calendar, so Feb 29 has its own slot and Mar 1 is the same slot every year.
+    return (date(2000, d.month, d.day) - date(2000, 1, 1)).days
+
+
+def window_anchor(year, target_date):
+
+    # The target's calendar day in `year`; Feb 29 maps to Feb 28 in common years.
+    try:
+        return date(year, target_date.month, target_date.day)
+    except ValueError:
+        return date(year, 2, 28)
+
+
+def calendar_window_histories(start, values, years, target_dates, window_days, params):
+
+    # values is a daily series (days, params) over consecutive calendar days from `start`. For every
+    # target date and every one of `years` before it, the mean of the ±window_days around the target's
+    # calendar day that year; windows run across year ends (Jan 1 borrows the previous December) but
+    # never into the target's own year. -> [WeatherBlock indexed by year] per target date. Both the tile
+    # and the network path go through here, so they agree on every window.
+    values = np.asarray(values, dtype=float)
+    pairs = [(i, year) for i, d in enumerate(target_dates) for year in years if year < d.year]
+    anchors = np.array([(window_anchor(year, target_dates[i]) - start).days for i, year in pairs], dtype=int)
+    limits = np.array([(date(target_dates[i].year, 1, 1) - start).days - 1 for i, _ in pairs], dtype=int)
+    lo = np.clip(anchors - window_days, 0, len(values))
+    hi = np.minimum(np.minimum(anchors + window_days, limits), len(values) - 1)
+    means = window_means(values, lo, np.maximum(hi, lo - 1)) if pairs else np.empty((0, len(params)))
+    rows = [([], []) for _ in target_dates]
+    for (i, year), row in zip(pairs, means):
+        if not np.isnan(row).all():
+            rows[i][0].append(year)
+            rows[i][1].append(row)
+    return [WeatherBlock(kept, np.array(day).reshape(len(kept), len(params)), params) for kept, day in rows]
+
+
+def tile_filename(name):
+
+    return "".join(c if c.isalnum() else "_" for c in name.strip().lower()) + ".npz"
+
+
+class ClimatologyTile:
+
+    # Every day of the year for one location: values is (366 days, years, params) float32, plus the
+    # per-day linear trend fitted over all stored years. Lookups are plain array indexing.
+    __slots__ = ("name", "lat", "lon", "years", "values", "params", "slopes", "intercepts")
+
+    def __init__(self, name, lat, lon, years, values, params, slopes=None, intercepts=None):
+        self.name = name
+        self.lat = float(lat)
+        self.lon = float(lon)
+        self.years = np.asarray(years, dtype=int)
+        self.values = np.asarray(values, dtype=np.float32)
+        self.params = tuple(params)
+        if slopes is None or intercepts is None:
+            slopes, intercepts = fit_linear_trends(self.years, self.values)
+        self.slopes = np.asarray(slopes, dtype=np.float64)
+        self.intercepts = np.asarray(intercepts, dtype=np.float64)
+
+    @staticmethod
+    def _series_to_values(series, years, params):
+
+        values = np.full((DAYS_PER_TILE, len(years), len(params)), np.nan, dtype=np.float32)
+        year_index = {year: i for i, year in enumerate(years)}
+        for date_str, record in series.items():
+            year = int(date_str[:4])
+            if year not in year_index:
+                continue
+            doy = day_of_year_index(date(year, int(date_str[4:6]), int(date_str[6:8])))
+            values[doy, year_index[year]] = [record.get(param, np.nan) for param in params]
+        return values
+
+    @classmethod
+    def from_series(cls, name, city_coords, series, years, params):
+
+        years = list(years)
+        return cls(name, city_coords["lat"], city_coords["lon"], years,
+                   cls._series_to_values(series, years, params), params)
+
+    def append_years(self, series, years):
+
+        years = [y for y in years if y not in set(self.years.tolist())]
+        if not years:
+            return self
+        self.values = np.concatenate([self.values, self._series_to_values(series, years, self.params)], axis=1)
+        self.years = np.concatenate([self.years, np.asarray(years, dtype=int)])
+        self.slopes, self.intercepts = fit_linear_trends(self.years, self.values)
+        return self
+
+    @property
+    def coords(self):
+        return {"lat": self.lat, "lon": self.lon}
+
+    def covers(self, target_year):
+
+        return len(self.years) > 0 and self.years[-1] >= target_year - 1
+
+    def history(self, target_date):
+
+        # Same shape as the network path: years before the target year that have this calendar day.
+        day = self.values[day_of_year_index(target_date)]
+        keep = (self.years < target_date.year) & ~np.isnan(day).all(axis=1)
+        return WeatherBlock(self.years[keep], day[keep], self.params)
+
+    def daily_series(self):
+
+        # -> (start, values (days, params)): the tile laid out on the real calendar from Jan 1 of the first
+        # year to Dec 31 of the last, without the empty Feb 29 slot in common years; absent years are NaN.
+        if not len(self.years):
+            return date(2000, 1, 1), np.empty((0, len(self.params)), dtype=np.float32)
+        first, last = int(self.years.min()), int(self.years.max())
+        start = date(first, 1, 1)
+        series = np.full(((date(last, 12, 31) - start).days + 1, len(self.params)), np.nan, dtype=np.float32)
+        feb29 = day_of_year_index(date(2000, 2, 29))
+        for i, year in enumerate(self.years):
+            offset = (date(int(year), 1, 1) - start).days
+            days = self.values[:, i]
+            if not calendar.isleap(int(year)):
+                days = np.delete(days, feb29, axis=0)
+            series[offset:offset + len(days)] = days
+        return start, series
+
+    def windowed_histories(self, target_dates, window_days):
+
+        # history() with each year's value replaced by the mean of the ±window_days around the
+        # calendar day, computed exactly as the network path does (calendar_window_histories).
+        start, series = self.daily_series()
+        return calendar_window_histories(start, series, self.years.tolist(), list(target_dates), window_days,
+                                         self.params)
+
+    def trend(self, target_date):
+
+        # The stored coefficients were fitted on every tile year, so they only apply when the target
+        # year comes right after the tile; otherwise the caller refits on history().
+        if not len(self.years) or self.years[-1] != target_date.year - 1:
+            return None
+        doy = day_of_year_index(target_date)
+        return self.slopes[doy], self.intercepts[doy]
+
+    def save(self, directory=TILES_DIR):
+
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / tile_filename(self.name)
+        np.savez_compressed(
+            path,
+            name=np.array(self.name), lat=np.array(self.lat), lon=np.array(self.lon),
+            years=self.years, values=self.values, params=np.array(self.params),
+            slopes=self.slopes, intercepts=self.intercepts,
+        )
+        return path
+
+    @classmethod
+    def load(cls, path):
+
+        with np.load(path, allow_pickle=False) as data:
+            return cls(str(data["name"]), float(data["lat"]), float(data["lon"]), data["years"],
+                       data["values"], [str(p) for p in data["params"]], data["slopes"], data["intercepts"])
+
+
+def load_tile(name, directory=TILES_DIR):
+
+    path = Path(directory) / tile_filename(name)
+    return ClimatologyTile.load(path) if path.exists() else None
+
+
+def load_tiles(directory=TILES_DIR):
+
+    # {(lat, lon): tile} for every tile on disk; unreadable files are skipped.
+    tiles = {}
+    directory = Path(directory)
+    if not directory.is_dir():
+        return tiles
+    for path in sorted(directory.glob("*.npz")):
+        try:
+            tile = ClimatologyTile.load(path)
+        except Exception:
+            continue
+        tiles[coord_key(tile.coords)] = tile
+    return tiles
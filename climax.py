@@ -0,0 +1,257 @@
+# climax.py
+#
+# Headless entry point: the same weather predictions and planner prompts as the dashboard, without
+# importing Streamlit.
+#   python -m climax plan --city Cairo --date 2025-07-01 --activities activities.txt
+#   python -m climax plan --lat 30.04 --lon 31.24 --weekly --date 2025-07-01 --activity "Morning jog" --json
+#   python -m climax batch --input requests.jsonl --output plans.jsonl --workers 8
+# A batch input file has one JSON object per line:
+#   {"id": "u1", "city": "Cairo", "date": "2025-07-01", "plan_type": "Weekly Plan", "activities": "Gym\nPicnic"}
+# ("lat"/"lon" can replace "city"; "plan_type" defaults to "Daily Plan"; "hourly": true adds hourly weather;
+# "planner": "rules" schedules without the LLM).
+import argparse
+import json
+import math
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from ai_planner import generate_schedule_with_ollama, get_plan_recommendations
+from config import CITIES
+from data_fetcher import WEATHER_PARAMS, get_multi_year_weather_data_for_dates
+from extremes import get_extremes_for_dates
+from prediction_cache import get_shared_predictions
+from scheduler import format_schedule, plan_schedule
+from weather_block import WeatherBlock
+
+
+CLI_MAX_WORKERS = int(os.environ.get("CLIMAX_CLI_MAX_WORKERS", "4"))
+PLAN_TYPES = {"daily": "Daily Plan", "weekly": "Weekly Plan"}
+# "llm" asks the model for the schedule; "rules" uses scheduler.py and needs no model at all.
+PLANNERS = ("llm", "rules")
+DEFAULT_PLANNER = os.environ.get("CLIMAX_PLANNER", "llm").strip().lower()
+
+
+def plan_dates(plan_type, start):
+
+    return [start] if plan_type == "Daily Plan" else [start + timedelta(days=i) for i in range(7)]
+
+
+def resolve_location(city=None, lat=None, lon=None):
+
+    if city:
+        if lat is not None or lon is not None:
+            raise ValueError("Give either a city or lat and lon, not both.")
+        if city not in CITIES:
+            raise ValueError(f"Unknown city {city!r}; expected one of {', '.join(sorted(CITIES))}.")
+        return city, CITIES[city]
+    if lat is None or lon is None:
+        raise ValueError("Give a city or both lat and lon.")
+    lat, lon = float(lat), float(lon)
+    return f"{lat:.4f},{lon:.4f}", {"lat": lat, "lon": lon}
+
+
+def make_plan(city, city_coords, start, activities, plan_type="Daily Plan", recommendations=False, backend=None,
+              hourly=False, planner=DEFAULT_PLANNER, extremes=False):
+
+    # -> {"city", "plan_type", "dates", "weather": {date: {param: value}}, "schedule", ["slots"], ["recommendations"]}
+    # hourly=True also uses per-hour predictions from the POWER hourly archive for the schedule;
+    # extremes=True adds {"extremes": {date: event odds and percentiles}}.
+    dates = plan_dates(plan_type, start)
+    predictions = {d: pred for d, (pred, _, _) in get_shared_predictions(city_coords, dates).items() if pred}
+    result = {"city": city, "plan_type": plan_type, "dates": [d.isoformat() for d in dates]}
+    if not predictions:
+        result["error"] = "Could not retrieve enough historical data to make a prediction."
+        return result
+    weather_data = WeatherBlock.from_records(predictions, WEATHER_PARAMS)
+    result["weather"] = {d.isoformat(): {p: round(float(v), 3) for p, v in record.items()}
+                         for d, record in weather_data.items()}
+    hourly_weather_data = None
+    if hourly:
+        from hourly_fetcher import get_hourly_predictions
+
+        hourly_weather_data = get_hourly_predictions(city_coords, list(predictions))
+    if planner == "rules":
+        slots = plan_schedule(weather_data, activities, plan_type, list(predictions), hourly_weather_data)
+        result["schedule"] = format_schedule(slots)
+        result["slots"] = [{**slot, "date": slot["date"] and slot["date"].isoformat()} for slot in slots]
+    else:
+        result["schedule"] = generate_schedule_with_ollama(
+            weather_data, activities, plan_type, city,
+            day=start if plan_type == "Daily Plan" else None,
+            start_date=start if plan_type == "Weekly Plan" else None,
+            end_date=dates[-1] if plan_type == "Weekly Plan" else None,
+            backend=backend,
+            hourly_weather_data=hourly_weather_data,
+        )
+    if extremes:
+        result["extremes"] = {d.isoformat(): summary
+                              for d, summary in get_extremes_for_dates(city_coords, list(predictions)).items()}
+    if recommendations:
+        activities_list = [a.strip() for a in activities.split("\n") if a.strip()]
+        result["recommendations"] = get_plan_recommendations(weather_data, activities_list, backend=backend)
+    return result
+
+
+def _json_safe(value):
+
+    # Missing predictions are NaN floats, which json.dumps would write as a bare (invalid) NaN token.
+    if isinstance(value, float):
+        return None if math.isnan(value) else value
+    if isinstance(value, dict):
+        return {k: _json_safe(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(v) for v in value]
+    return value
+
+
+def dumps(result, **kwargs):
+
+    return json.dumps(_json_safe(result), ensure_ascii=False, allow_nan=False, **kwargs)
+
+
+def _parse_date(value):
+
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def run_batch(jobs, workers=CLI_MAX_WORKERS, recommendations=False, backend=None, hourly=False,
+              planner=DEFAULT_PLANNER):
+
+    # Weather for every (location, date) is fetched up front, one bulk request set per location, so the
+    # plan workers only read the cache; plans then run concurrently since they are LLM-bound.
+    parsed = []
+    for job in jobs:
+        try:
+            name, coords = resolve_location(job.get("city"), job.get("lat"), job.get("lon"))
+            plan_type = PLAN_TYPES.get(str(job.get("plan_type", "")).lower(), job.get("plan_type") or "Daily Plan")
+            if plan_type not in PLAN_TYPES.values():
+                raise ValueError(f"Unknown plan_type {job.get('plan_type')!r}.")
+            parsed.append((job, name, coords, _parse_date(job["date"]), plan_type, None))
+        except (KeyError, TypeError, ValueError) as e:
+            parsed.append((job, None, None, None, None, f"{type(e).__name__}: {e}"))
+
+    wanted = {}
+    for _, name, coords, start, plan_type, error in parsed:
+        if error is None:
+            key = (coords["lat"], coords["lon"])
+            wanted.setdefault(key, (coords, set()))[1].update(plan_dates(plan_type, start))
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(wanted) or 1))) as executor:
+        list(executor.map(lambda item: get_multi_year_weather_data_for_dates(item[0], sorted(item[1])), wanted.values()))
+
+    def run(item):
+        job, name, coords, start, plan_type, error = item
+        if error is None:
+            try:
+                result = make_plan(name, coords, start, job.get("activities", ""), plan_type,
+                                   recommendations=recommendations, backend=backend,
+                                   hourly=bool(job.get("hourly", hourly)), planner=job.get("planner", planner))
+            except Exception as e:
+                result = {"error": f"{type(e).__name__}: {e}"}
+        else:
+            result = {"error": error}
+        return {"id": job.get("id"), **result}
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        yield from executor.map(run, parsed)
+
+
+def _read_activities(args):
+
+    if args.activities == "-":
+        return sys.stdin.read()
+    if args.activities:
+        with open(args.activities, encoding="utf-8") as f:
+            return f.read()
+    return "\n".join(args.activity)
+
+
+def _print_plan(result):
+
+    if "error" in result:
+        print(f"Error: {result['error']}", file=sys.stderr)
+        return
+    print(f"{result['plan_type']} for {result['city']} ({result['dates'][0]}..{result['dates'][-1]})\n")
+    for day, record in result["weather"].items():
+        print(day + "  " + "  ".join(f"{p}={v:.1f}" for p, v in record.items()))
+    for day, summary in result.get("extremes", {}).items():
+        if summary:
+            print(day + "  " + "  ".join(f"P({name})={p:.0%}" for name, p in summary["probabilities"].items()
+                                         if p is not None))
+    print("\n" + result["schedule"])
+    if "recommendations" in result:
+        print("\n" + result["recommendations"])
+
+
+def main(argv=None):
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--backend", default=None, help="LLM backend (ollama, openai, stub); default CLIMAX_LLM_BACKEND.")
+    common.add_argument("--planner", choices=PLANNERS, default=DEFAULT_PLANNER,
+                        help="Schedule with the LLM or with the rule-based scheduler; default CLIMAX_PLANNER or llm.")
+    parser = argparse.ArgumentParser(prog="climax", description="Headless ClimaX planner.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    plan = sub.add_parser("plan", parents=[common], help="Create one plan.")
+    where = plan.add_mutually_exclusive_group(required=True)
+    where.add_argument("--city", choices=sorted(CITIES))
+    where.add_argument("--lat", type=float)
+    plan.add_argument("--lon", type=float)
+    plan.add_argument("--date", default=None, help="YYYY-MM-DD (default: today); first day of a weekly plan.")
+    plan.add_argument("--weekly", action="store_true", help="7-day plan starting at --date.")
+    plan.add_argument("--activities", help="File with one activity per line ('-' for stdin).")
+    plan.add_argument("--activity", action="append", default=[], help="One activity (repeatable).")
+    plan.add_argument("--recommendations", action="store_true", help="Also generate plan recommendations.")
+    plan.add_argument("--hourly", action="store_true", help="Include hourly weather in the schedule prompt.")
+    plan.add_argument("--extremes", action="store_true", help="Add extreme-weather odds and percentiles.")
+    plan.add_argument("--json", action="store_true", help="Print the result as JSON.")
+
+    batch = sub.add_parser("batch", parents=[common], help="Create many plans from a JSON-lines file.")
+    batch.add_argument("--input", required=True, help="JSON-lines requests ('-' for stdin).")
+    batch.add_argument("--output", default="-", help="JSON-lines results (default: stdout).")
+    batch.add_argument("--workers", type=int, default=CLI_MAX_WORKERS)
+    batch.add_argument("--recommendations", action="store_true")
+    batch.add_argument("--hourly", action="store_true", help="Hourly weather for every job (or per job with \"hourly\").")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "plan":
+        activities = _read_activities(args)
+        if not activities.strip():
+            parser.error("give --activities FILE or at least one --activity")
+        try:
+            name, coords = resolve_location(args.city, args.lat, args.lon)
+        except ValueError as e:
+            parser.error(str(e))
+        start = _parse_date(args.date) if args.date else datetime.now().date()
+        result = make_plan(name, coords, start, activities, "Weekly Plan" if args.weekly else "Daily Plan",
+                           recommendations=args.recommendations, backend=args.backend, hourly=args.hourly,
+                           planner=args.planner, extremes=args.extremes)
+        if args.json:
+            print(dumps(result, indent=2))
+        else:
+            _print_plan(result)
+        return 1 if "error" in result else 0
+
+    if args.input == "-":
+        jobs = [json.loads(line) for line in sys.stdin if line.strip()]
+    else:
+        with open(args.input, encoding="utf-8") as source:
+            jobs = [json.loads(line) for line in source if line.strip()]
+    sink = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    failed = 0
+    try:
+        for result in run_batch(jobs, args.workers, args.recommendations, args.backend, args.hourly, args.planner):
+            failed += "error" in result
+            sink.write(dumps(result) + "\n")
+            sink.flush()
+    finally:
+        if sink is not sys.stdout:
+            sink.close()
+    print(f"{len(jobs) - failed}/{len(jobs)} plans created.", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,7 +1,3 @@
-import streamlit as st
-
-st.set_page_config(page_title="Smart Activity Planner", layout="wide")
-
 CITIES = {
     "Cairo": {"lat": 30.0444, "lon": 31.2357},
     "London": {"lat": 51.5074, "lon": -0.1278},
@@ -0,0 +1,9 @@
+# coords.py
+
+COORD_DIGITS = 4
+
+
+def coord_key(city_coords, digits=COORD_DIGITS):
+
+    # (lat, lon) rounded to ~10 m: the identity of a point in every cache, tile and batch.
+    return round(float(city_coords["lat"]), digits), round(float(city_coords["lon"]), digits)
@@ -1,119 +1,383 @@
 # data_fetcher.py
-import requests
+import logging
+import os
+
 import numpy as np
-import pandas as pd
-from datetime import datetime
+from datetime import datetime, date, timedelta
+
+from trends import stack_histories, fit_linear_trends, predict_from_trends
+from weather_block import WeatherBlock
+from climatology_tiles import TILES_DIR, calendar_window_histories, load_tiles, window_anchor
+from coords import coord_key
+from power_client import fetch_json_many
+from metrics import incr, timed
+from weather_cache import get_weather_cache
+
 
+logger = logging.getLogger("climax.data")
 
 NASA_DATA_START_YEAR = 1981
+NASA_POWER_DAILY_URL = "https://power.larc.nasa.gov/api/temporal/daily/point"
+# Years per bulk POWER request; 1981->today is served in three calls.
+NASA_BULK_CHUNK_YEARS = 15
+# Chunks missing at most this many years are patched with per-year date windows instead.
+NASA_WINDOW_FETCH_MAX_YEARS = 3
+# With k > 0, each past year contributes the mean of the k days either side of the calendar day
+# instead of that single day: steadier estimates from the same downloaded series.
+CLIMATOLOGY_WINDOW_DAYS = int(os.environ.get("CLIMAX_CLIMATOLOGY_WINDOW_DAYS", "0"))
+
+POWER_PARAMETERS = {
+    "temperature": "T2M",
+    "humidity": "RH2M",
+    "wind_speed": "WS2M",
+    "precipitation": "PRECTOTCORR",
+    "pressure": "PS",
+    "solar_radiation": "ALLSKY_SFC_SW_DWN",
+}
+WEATHER_PARAMS = list(POWER_PARAMETERS)
+WEATHER_COLUMN_LABELS = {
+    'temperature': 'Temperature (°C)',
+    'humidity': 'Humidity (%)',
+    'wind_speed': 'Wind Speed (m/s)',
+    'precipitation': 'Precipitation (mm)',
+    'pressure': 'Pressure (hPa)',
+    'solar_radiation': 'Solar Radiation (W/m²)'
+}
 
 def clean_nasa_value(value):
 
     return np.nan if value == -999 else value
 
-def get_nasa_weather_for_single_year(city_coords, date_str):
+def build_power_url(city_coords, start_str, end_str):
 
-    url = (
-        f"https://power.larc.nasa.gov/api/temporal/daily/point"
-        f"?start={date_str}&end={date_str}"
+    return (
+        f"{NASA_POWER_DAILY_URL}"
+        f"?start={start_str}&end={end_str}"
         f"&latitude={city_coords['lat']}&longitude={city_coords['lon']}"
-        f"&community=SB&parameters=T2M,RH2M,WS2M,PRECTOTCORR,PS,ALLSKY_SFC_SW_DWN"
+        f"&community=SB&parameters={','.join(POWER_PARAMETERS.values())}"
         f"&format=JSON"
     )
-    try:
-        response = requests.get(url)
-        if response.status_code == 200:
-            data = response.json()
-            params = data.get("properties", {}).get("parameter", {})
-            return {
-                "temperature": clean_nasa_value(params.get("T2M", {}).get(str(date_str), -999)),
-                "humidity": clean_nasa_value(params.get("RH2M", {}).get(str(date_str), -999)),
-                "wind_speed": clean_nasa_value(params.get("WS2M", {}).get(str(date_str), -999)),
-                "precipitation": clean_nasa_value(params.get("PRECTOTCORR", {}).get(str(date_str), -999)),
-                "pressure": clean_nasa_value(params.get("PS", {}).get(str(date_str), -999)),
-                "solar_radiation": clean_nasa_value(params.get("ALLSKY_SFC_SW_DWN", {}).get(str(date_str), -999))
-            }
-    except:
-        pass
-    return None
 
-def get_multi_year_weather_data(city_coords, target_date):
+def parse_power_day(params, date_str):
+
+    return {
+        name: clean_nasa_value(params.get(code, {}).get(str(date_str), -999))
+        for name, code in POWER_PARAMETERS.items()
+    }
+
+def parse_power_series(data):
+
+    params = data.get("properties", {}).get("parameter", {})
+    dates = set()
+    for code in POWER_PARAMETERS.values():
+        dates.update(params.get(code, {}).keys())
+    return {date_str: parse_power_day(params, date_str) for date_str in sorted(dates)}
+
+def _fetch_ranges(city_coords, ranges):
+
+    # All [start, end] requests go out concurrently on the pooled session; results keep input order.
+    today_str = datetime.now().strftime("%Y%m%d")
+    urls = [build_power_url(city_coords, start_str, min(end_str, today_str)) for start_str, end_str in ranges]
+    return [parse_power_series(data) if data is not None else None for data in fetch_json_many(urls)]
+
+def _fetch_year_chunks(city_coords, chunks):
+
+    return _fetch_ranges(city_coords, [(f"{start}0101", f"{end}1231") for start, end in chunks])
+
+def calendar_day_per_year(target_date, start_year, end_year):
+
+    # {year: YYYYMMDD} for every year in [start_year, end_year) that has this calendar day (Feb 29 only in leap years).
+    days = {}
+    for year in range(start_year, end_year):
+        try:
+            days[year] = date(year, target_date.month, target_date.day).strftime("%Y%m%d")
+        except ValueError:
+            continue
+    return days
+
+def get_nasa_weather_years(city_coords, start_year, end_year):
 
-    historical_data = {}
-    for year in range(NASA_DATA_START_YEAR, target_date.year):
-        historical_date = target_date.replace(year=year)
-        date_str = historical_date.strftime("%Y%m%d")
-        data = get_nasa_weather_for_single_year(city_coords, date_str)
-        if data:
-            historical_data[year] = data
+    # Full daily series for [start_year, end_year] as {YYYYMMDD: {...}}, or None if any chunk failed.
+    chunks = [
+        (chunk_start, min(chunk_start + NASA_BULK_CHUNK_YEARS - 1, end_year))
+        for chunk_start in range(start_year, end_year + 1, NASA_BULK_CHUNK_YEARS)
+    ]
+    cache = get_weather_cache()
+    merged = {}
+    for series in _fetch_year_chunks(city_coords, chunks):
+        if series is None:
+            return None
+        cache.put_many(city_coords, series)
+        merged.update(series)
+    return merged
+
+_climatology_tiles = None
+
+def load_climatology_tiles(directory=TILES_DIR, reload=False):
+
+    # Precomputed per-city tiles (see precompute_climatology.py), loaded once per process.
+    global _climatology_tiles
+    if _climatology_tiles is None or reload:
+        _climatology_tiles = {
+            key: tile for key, tile in load_tiles(directory).items() if tile.params == tuple(WEATHER_PARAMS)
+        }
+    return _climatology_tiles
+
+def find_climatology_tile(city_coords, target_year):
+
+    tile = load_climatology_tiles().get(coord_key(city_coords))
+    return tile if tile is not None and tile.covers(target_year) else None
+
+@timed("nasa_fetch")
+def get_multi_year_weather_data_for_dates(city_coords, target_dates, window_days=None):
+
+    # History for several target dates at once: {date: WeatherBlock indexed by year}. Dates covered by a
+    # precomputed climatology tile are sliced out of it with no network at all; the rest come from the
+    # on-disk cache where possible, and the year chunks that still have gaps are pulled in bulk,
+    # concurrently and only once for all dates (every fetched day is cached, so later dates are local lookups).
+    # window_days (default CLIMATOLOGY_WINDOW_DAYS) > 0 switches to per-year ±k-day window means.
+    target_dates = list(target_dates)
+    window_days = CLIMATOLOGY_WINDOW_DAYS if window_days is None else window_days
+    results = {}
+    remaining = []
+    tiled = {}
+    for target_date in target_dates:
+        tile = find_climatology_tile(city_coords, target_date.year)
+        if tile is not None:
+            tiled.setdefault(id(tile), (tile, []))[1].append(target_date)
+            incr("climatology_tile_hits")
+        else:
+            remaining.append(target_date)
+    for tile, dates in tiled.values():
+        if window_days > 0:
+            results.update(zip(dates, tile.windowed_histories(dates, window_days)))
         else:
-            if not historical_data:
-                st.warning(f"Could not find data for year {year}. The archive for this location might start later.")
-            break
-    return historical_data
+            results.update((d, tile.history(d)) for d in dates)
+    if remaining:
+        if window_days > 0:
+            results.update(_fetch_windowed_weather_data_for_dates(city_coords, remaining, window_days))
+        else:
+            results.update(_fetch_multi_year_weather_data_for_dates(city_coords, remaining))
+    return {d: results[d] for d in target_dates}
 
-def predict_weather_and_get_trend(historical_data, target_year):
+def _fetch_multi_year_weather_data_for_dates(city_coords, target_dates):
 
-    if not historical_data or len(historical_data) < 2:
-        return None, None
+    cache = get_weather_cache()
+    wanted = {d: calendar_day_per_year(d, NASA_DATA_START_YEAR, d.year) for d in target_dates}
+    cached = cache.get_many(city_coords, {ds for days in wanted.values() for ds in days.values()})
+
+    # Days still needed per year.
+    missing_days = {}
+    for days in wanted.values():
+        for year, ds in days.items():
+            if ds not in cached:
+                missing_days.setdefault(year, []).append(ds)
+    available = dict(cached)
+    available.update(_fetch_missing_days(city_coords, missing_days))
+
+    results = {}
+    for target_date, days in wanted.items():
+        historical_data = {}
+        gaps = []
+        for year in range(NASA_DATA_START_YEAR, target_date.year):
+            data = available.get(days.get(year))
+            if data:
+                historical_data[year] = data
+            elif days.get(year) in missing_days.get(year, ()):
+                gaps.append(year)
+        if gaps:
+            # Missing years simply drop out of the fit; the trend is computed from the years that arrived.
+            incr("history_missing_years", len(gaps))
+            logger.warning("No NASA POWER data for %s in %d year(s) (%s) at %s; fitting on %d year(s).",
+                           target_date.strftime("%m-%d"), len(gaps), _format_years(gaps),
+                           coord_key(city_coords), len(historical_data))
+        results[target_date] = WeatherBlock.from_records(historical_data, WEATHER_PARAMS)
+    return results
+
+def _fetch_windowed_weather_data_for_dates(city_coords, target_dates, window_days):
+
+    # Per past year, one contiguous span of days covering every target's ±window_days window (so a
+    # week needs a single span per year); the fetched days are laid out as one calendar series and
+    # calendar_window_histories() takes every window mean from it, exactly as for a tile.
+    cache = get_weather_cache()
+    today = datetime.now().date()
+    margin = timedelta(days=window_days)
+    spans = {}
+    for year in range(NASA_DATA_START_YEAR, max(d.year for d in target_dates)):
+        anchors = [window_anchor(year, d) for d in target_dates if d.year > year]
+        start = max(min(anchors) - margin, date(NASA_DATA_START_YEAR, 1, 1))
+        end = min(max(anchors) + margin, today)
+        if start <= end:
+            spans[year] = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    days = {day.strftime("%Y%m%d"): day for span in spans.values() for day in span}
+    cached = cache.get_many(city_coords, days)
+    missing_days = {}
+    for ds in sorted(set(days) - set(cached)):
+        missing_days.setdefault(int(ds[:4]), []).append(ds)
+    available = dict(cached)
+    available.update(_fetch_missing_days(city_coords, missing_days))
 
-    years_list = list(historical_data.keys())
-    years_for_fit = np.array(years_list).reshape(-1, 1)
-    
-    prediction = {}
-    trend_parameters = {}
-    
-    for param in ['temperature', 'humidity', 'wind_speed', 'precipitation', 'pressure', 'solar_radiation']:
-        values = np.array([historical_data[y][param] for y in years_list])
-        
-        valid_indices = ~np.isnan(values)
-        if np.sum(valid_indices) < 2:
-            prediction[param] = np.nan
-            trend_parameters[param] = {'slope': np.nan, 'intercept': np.nan}
+    start = min(days.values(), default=today)
+    series = np.full(((max(days.values(), default=today) - start).days + 1, len(WEATHER_PARAMS)), np.nan)
+    for ds, day in days.items():
+        record = available.get(ds)
+        if record:
+            series[(day - start).days] = [np.nan if record.get(p) is None else record[p] for p in WEATHER_PARAMS]
+    blocks = calendar_window_histories(start, series, range(NASA_DATA_START_YEAR, max(d.year for d in target_dates)),
+                                       target_dates, window_days, WEATHER_PARAMS)
+    for d, block in zip(target_dates, blocks):
+        missing = (d.year - NASA_DATA_START_YEAR) - len(block)
+        if missing > 0:
+            incr("history_missing_years", missing)
+    return dict(zip(target_dates, blocks))
+
+def _fetch_missing_days(city_coords, missing_days):
+
+    # {year: [YYYYMMDD, ...]} still needed -> {YYYYMMDD: {...}} fetched (and cached). A chunk with only a
+    # few such years (typically the recent, provisional ones being revalidated) is fetched as one
+    # contiguous window per year covering all the requested days, instead of re-downloading the whole chunk.
+    if not missing_days:
+        return {}
+    cache = get_weather_cache()
+    last_year = max(missing_days) + 1
+    chunks = [
+        (chunk_start, min(chunk_start + NASA_BULK_CHUNK_YEARS, last_year) - 1)
+        for chunk_start in range(NASA_DATA_START_YEAR, last_year, NASA_BULK_CHUNK_YEARS)
+    ]
+    requests_plan = []
+    for start, end in chunks:
+        years = [y for y in missing_days if start <= y <= end]
+        if not years:
             continue
-            
-        clean_years = years_for_fit[valid_indices]
-        clean_values = values[valid_indices]
-        
-        try:
-            slope, intercept = np.polyfit(clean_years.flatten(), clean_values, 1)
-            predicted_value = slope * target_year + intercept
-            
-            prediction[param] = predicted_value
-
-            trend_parameters[param] = {'slope': slope, 'intercept': intercept}
-        except:
-            prediction[param] = np.nan
-            trend_parameters[param] = {'slope': np.nan, 'intercept': np.nan}
-            
+        if len(years) <= NASA_WINDOW_FETCH_MAX_YEARS:
+            requests_plan += [(y, y, min(missing_days[y]), max(missing_days[y])) for y in sorted(years)]
+        else:
+            requests_plan.append((start, end, f"{start}0101", f"{end}1231"))
+
+    available = {}
+    retry_plan = []
+    fetched = _fetch_ranges(city_coords, [(start_str, end_str) for _, _, start_str, end_str in requests_plan])
+    for (first_year, last_year, _, _), series in zip(requests_plan, fetched):
+        if series is None:
+            # A whole chunk that still failed after retries is split into small per-year windows, which
+            # are cheaper for POWER to serve; whatever fails again is left as a gap in the history.
+            if last_year > first_year:
+                retry_plan += [(y, min(missing_days[y]), max(missing_days[y]))
+                               for y in range(first_year, last_year + 1) if y in missing_days]
+            continue
+        cache.put_many(city_coords, series)
+        available.update(series)
+    if retry_plan:
+        incr("power_chunk_splits")
+        for _, series in zip(retry_plan, _fetch_ranges(city_coords, [(s, e) for _, s, e in retry_plan])):
+            if series is not None:
+                cache.put_many(city_coords, series)
+                available.update(series)
+    return available
+
+def _format_years(years):
+
+    # [1981, 1982, 1983, 1990] -> "1981-1983, 1990"
+    spans = []
+    for year in years:
+        if spans and year == spans[-1][1] + 1:
+            spans[-1][1] = year
+        else:
+            spans.append([year, year])
+    return ", ".join(str(a) if a == b else f"{a}-{b}" for a, b in spans)
+
+def get_multi_year_weather_data(city_coords, target_date):
+
+    return get_multi_year_weather_data_for_dates(city_coords, [target_date])[target_date]
+
+def as_weather_block(historical_data):
+
+    if isinstance(historical_data, WeatherBlock):
+        return historical_data
+    return WeatherBlock.from_records(historical_data or {}, WEATHER_PARAMS)
+
+@timed("trend_fit")
+def predict_weather_and_get_trend_batch(histories, target_years):
+
+    # One vectorized fit for many days: (days x years x params) -> [(prediction, trend_parameters), ...].
+    if not histories:
+        return []
+    histories = [as_weather_block(history) for history in histories]
+    years, values = stack_histories(histories)
+    slopes, intercepts = fit_linear_trends(years, values)
+    predictions = predict_from_trends(slopes, intercepts, target_years)
+
+    results = []
+    for d, history in enumerate(histories):
+        if not history or len(history) < 2:
+            results.append((None, None))
+            continue
+        results.append(_trend_dicts(predictions[d], slopes[d], intercepts[d]))
+    return results
+
+def _trend_dicts(prediction_row, slope_row, intercept_row):
+
+    prediction = {param: prediction_row[p] for p, param in enumerate(WEATHER_PARAMS)}
+    trend_parameters = {
+        param: {'slope': slope_row[p], 'intercept': intercept_row[p]}
+        for p, param in enumerate(WEATHER_PARAMS)
+    }
     return prediction, trend_parameters
 
+def predict_weather_and_get_trend(historical_data, target_year):
+
+    if not historical_data or len(historical_data) < 2:
+        return None, None
+    return predict_weather_and_get_trend_batch([historical_data], [target_year])[0]
+
 def get_nasa_weather(city_coords, date):
 
-    historical_data = get_multi_year_weather_data(city_coords, date)
-    if not historical_data:
-        return None, None, None
-        
-    predicted_weather, trend_params = predict_weather_and_get_trend(historical_data, date.year)
-    return predicted_weather, historical_data, trend_params
+    return get_nasa_weather_for_dates(city_coords, [date])[date]
+
+def get_nasa_weather_for_dates(city_coords, dates, window_days=None):
+
+    # Same as get_nasa_weather for every date, sharing one concurrent fetch and one batched fit:
+    # {date: (prediction, history, trend)}. Tile-backed dates reuse the tile's stored coefficients
+    # when they were fitted on exactly this history.
+    window_days = CLIMATOLOGY_WINDOW_DAYS if window_days is None else window_days
+    histories = get_multi_year_weather_data_for_dates(city_coords, dates, window_days)
+    fitted = {}
+    to_fit = []
+    for date, historical_data in histories.items():
+        tile = find_climatology_tile(city_coords, date.year) if window_days <= 0 else None
+        stored = tile.trend(date) if tile is not None else None
+        if stored is not None and len(historical_data) >= 2:
+            slope_row, intercept_row = stored
+            fitted[date] = _trend_dicts(predict_from_trends(slope_row, intercept_row, date.year), slope_row, intercept_row)
+        else:
+            to_fit.append(date)
+    batch = predict_weather_and_get_trend_batch([histories[d] for d in to_fit], [d.year for d in to_fit])
+    fitted.update(zip(to_fit, batch))
+
+    results = {}
+    for date, historical_data in histories.items():
+        if not historical_data:
+            results[date] = (None, None, None)
+            continue
+        predicted_weather, trend_params = fitted[date]
+        results[date] = (predicted_weather, historical_data, trend_params)
+    return results
 
 
 
 def create_weather_dataframe(weather_data):
 
+    import pandas as pd
+
     if not weather_data:
         return pd.DataFrame()
-    
-    weather_df = pd.DataFrame.from_dict(weather_data, orient='index')
-    weather_df.index.name = 'Date'
+
+    if isinstance(weather_data, WeatherBlock):
+        weather_df = weather_data.to_frame(index_name='Date')
+    else:
+        weather_df = pd.DataFrame.from_dict(weather_data, orient='index')
+        weather_df.index.name = 'Date'
     weather_df.reset_index(inplace=True)
     weather_df['Date'] = pd.to_datetime(weather_df['Date']).dt.strftime('%Y-%m-%d')
-    weather_df = weather_df.rename(columns={
-        'temperature': 'Temperature (°C)',
-        'humidity': 'Humidity (%)',
-        'wind_speed': 'Wind Speed (m/s)',
-        'precipitation': 'Precipitation (mm)',
-        'pressure': 'Pressure (hPa)',
-        'solar_radiation': 'Solar Radiation (W/m²)'
-    })
-    return weather_df
\ No newline at end of file
+    weather_df = weather_df.rename(columns=WEATHER_COLUMN_LABELS)
+    return weather_df
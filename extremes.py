@@ -0,0 +1,186 @@
+# extremes.py
+import warnings
+from pathlib import Path
+
+import numpy as np
+
+from climatology_tiles import TILES_DIR, day_of_year_index, tile_filename
+from data_fetcher import WEATHER_COLUMN_LABELS, find_climatology_tile, get_multi_year_weather_data_for_dates
+from metrics import incr, timed
+from trends import stack_histories
+
+
+# Empirical odds of extreme weather on a calendar day: the share of past years in which the day
+# crossed a threshold, and percentiles of each parameter, NaN years left out.
+# (name, parameter, ">" or "<", threshold)
+EXTREME_EVENTS = (
+    ("very_hot", "temperature", ">", 35.0),
+    ("hot", "temperature", ">", 30.0),
+    ("freezing", "temperature", "<", 0.0),
+    ("rain", "precipitation", ">", 1.0),
+    ("heavy_rain", "precipitation", ">", 10.0),
+    ("windy", "wind_speed", ">", 10.0),
+    ("very_humid", "humidity", ">", 85.0),
+)
+PERCENTILES = (5, 10, 25, 50, 75, 90, 95)
+EXTREMES_DIR = Path(TILES_DIR) / "extremes"
+
+
+def event_probabilities(values, params, events=EXTREME_EVENTS):
+
+    # values (..., years, params) -> (..., events): every day and every threshold in one comparison.
+    # "<" events are compared on negated values, so a single ">" covers both directions.
+    values = np.asarray(values, dtype=float)
+    columns = values[..., [list(params).index(param) for _, param, _, _ in events]]
+    signs = np.array([1.0 if op == ">" else -1.0 for _, _, op, _ in events])
+    thresholds = np.array([threshold for _, _, _, threshold in events], dtype=float)
+    valid = ~np.isnan(columns)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        crossed = (columns * signs > thresholds * signs).sum(axis=-2)
+        return crossed / valid.sum(axis=-2)
+
+
+def percentiles(values, qs=PERCENTILES):
+
+    # values (..., years, params) -> (..., len(qs), params); all-NaN series give NaN without a warning.
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return np.moveaxis(np.nanpercentile(np.asarray(values, dtype=float), qs, axis=-2), 0, -2)
+
+
+class ExtremesTable:
+
+    # Per-city lookup built from a climatology tile: probabilities (366 days, events), percentiles
+    # (366 days, qs, params) and the number of years with data (366 days,), so a request only indexes
+    # by day of year.
+    __slots__ = ("name", "years", "params", "events", "qs", "probabilities", "percentiles", "counts")
+
+    def __init__(self, name, years, params, events, qs, probabilities, percentiles, counts=None):
+        self.name = name
+        self.years = np.asarray(years, dtype=int)
+        self.params = tuple(params)
+        self.events = tuple(tuple(event) for event in events)
+        self.qs = tuple(qs)
+        self.probabilities = np.asarray(probabilities, dtype=np.float32)
+        self.percentiles = np.asarray(percentiles, dtype=np.float32)
+        self.counts = None if counts is None else np.asarray(counts, dtype=int)
+
+    @classmethod
+    def from_tile(cls, tile, events=EXTREME_EVENTS, qs=PERCENTILES):
+
+        return cls(tile.name, tile.years, tile.params, events, qs,
+                   event_probabilities(tile.values, tile.params, events), percentiles(tile.values, qs),
+                   (~np.isnan(tile.values).all(axis=-1)).sum(axis=-1))
+
+    def lookup(self, target_date):
+
+        # Like ClimatologyTile.trend(): the table summarizes every tile year, so it only answers for the
+        # year right after the tile. Other years return None and go through the history path, which
+        # keeps just the years before the target.
+        if not len(self.years) or self.years[-1] != target_date.year - 1:
+            return None
+        doy = day_of_year_index(target_date)
+        return summarize(self.probabilities[doy], self.percentiles[doy], self.params, self.events, self.qs,
+                         self.counts[doy])
+
+    def save(self, directory=EXTREMES_DIR):
+
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / tile_filename(self.name)
+        np.savez_compressed(
+            path,
+            name=np.array(self.name), years=self.years, params=np.array(self.params),
+            event_names=np.array([e[0] for e in self.events]), event_params=np.array([e[1] for e in self.events]),
+            event_ops=np.array([e[2] for e in self.events]), event_thresholds=np.array([e[3] for e in self.events]),
+            qs=np.array(self.qs), probabilities=self.probabilities, percentiles=self.percentiles, counts=self.counts,
+        )
+        return path
+
+    @classmethod
+    def load(cls, path):
+
+        with np.load(path, allow_pickle=False) as data:
+            events = [(str(n), str(p), str(o), float(t)) for n, p, o, t in zip(
+                data["event_names"], data["event_params"], data["event_ops"], data["event_thresholds"])]
+            return cls(str(data["name"]), data["years"], [str(p) for p in data["params"]], events,
+                       [float(q) for q in data["qs"]], data["probabilities"], data["percentiles"],
+                       data["counts"] if "counts" in data.files else None)
+
+
+def event_label(event):
+
+    # ("hot", "temperature", ">", 30.0) -> "Temperature > 30 °C"
+    name, param, op, threshold = event
+    label, _, unit = WEATHER_COLUMN_LABELS.get(param, param).partition(" (")
+    return f"{label} {op} {threshold:g} {unit.rstrip(')')}".rstrip()
+
+
+def summarize(probabilities, day_percentiles, params, events, qs, years):
+
+    # One day's arrays -> {"years", "probabilities": {event: p}, "percentiles": {param: {q: value}}}.
+    def clean(value):
+        return None if np.isnan(value) else round(float(value), 3)
+
+    return {
+        "years": int(years),
+        "probabilities": {event[0]: clean(p) for event, p in zip(events, probabilities)},
+        "percentiles": {param: {f"p{q:g}": clean(day_percentiles[i, p]) for i, q in enumerate(qs)}
+                        for p, param in enumerate(params)},
+    }
+
+
+def load_extremes_table(name, directory=EXTREMES_DIR):
+
+    path = Path(directory) / tile_filename(name)
+    return ExtremesTable.load(path) if path.exists() else None
+
+
+_tables = {}
+
+
+def _table_for_tile(tile, events, qs):
+
+    # Precomputed table from disk when it matches the tile; otherwise built once from the tile.
+    key = (tile.name, int(tile.years[-1]) if len(tile.years) else None, tuple(events), tuple(qs))
+    table = _tables.get(key)
+    if table is None:
+        table = load_extremes_table(tile.name)
+        if (table is None or table.counts is None or table.events != tuple(events) or table.qs != tuple(qs)
+                or table.params != tile.params or not np.array_equal(table.years, tile.years)):
+            table = ExtremesTable.from_tile(tile, events, qs)
+        _tables[key] = table
+    return table
+
+
+@timed("extremes")
+def get_extremes_for_dates(city_coords, dates, events=EXTREME_EVENTS, qs=PERCENTILES):
+
+    # {date: summary} for each date. Days in the year right after a climatology tile are table lookups;
+    # the rest are computed from their history (tile slices or fetched) in one vectorized pass.
+    dates = list(dates)
+    results = {}
+    remaining = []
+    for d in dates:
+        tile = find_climatology_tile(city_coords, d.year)
+        summary = _table_for_tile(tile, events, qs).lookup(d) if tile is not None else None
+        if summary is not None:
+            results[d] = summary
+            incr("extremes_table_hits")
+        else:
+            remaining.append(d)
+    if remaining:
+        # Single calendar days, like the tile the tables are built from, whatever the trend window.
+        histories = get_multi_year_weather_data_for_dates(city_coords, remaining, window_days=0)
+        blocks = [histories.get(d) for d in remaining]
+        usable = [(d, block) for d, block in zip(remaining, blocks) if block is not None and len(block)]
+        for d in remaining:
+            results.setdefault(d, None)
+        if usable:
+            years, values = stack_histories([block for _, block in usable])
+            params = usable[0][1].params
+            probabilities = event_probabilities(values, params, events)
+            day_percentiles = percentiles(values, qs)
+            for i, (d, block) in enumerate(usable):
+                results[d] = summarize(probabilities[i], day_percentiles[i], params, events, qs, len(block))
+    return {d: results[d] for d in dates}
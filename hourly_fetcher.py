@@ -0,0 +1,143 @@
+# hourly_fetcher.py
+import logging
+from datetime import datetime
+
+import numpy as np
+
+from data_fetcher import calendar_day_per_year
+from metrics import incr, timed
+from power_client import fetch_json_many
+from trends import fit_linear_trends, predict_from_trends
+from weather_cache import get_hourly_cache
+
+
+logger = logging.getLogger("climax.hourly")
+
+NASA_POWER_HOURLY_URL = "https://power.larc.nasa.gov/api/temporal/hourly/point"
+# POWER's hourly archive starts in 2001.
+HOURLY_DATA_START_YEAR = 2001
+HOURLY_POWER_PARAMETERS = {
+    "temperature": "T2M",
+    "humidity": "RH2M",
+    "wind_speed": "WS2M",
+    "precipitation": "PRECTOTCORR",
+}
+HOURLY_PARAMS = list(HOURLY_POWER_PARAMETERS.keys())
+# Requested days of one year closer than this are fetched as a single window.
+HOURLY_WINDOW_MAX_GAP_DAYS = 7
+
+
+def build_hourly_power_url(city_coords, start_str, end_str):
+
+    # Local solar time, so hour 7 is 7 AM at the location.
+    return (
+        f"{NASA_POWER_HOURLY_URL}"
+        f"?start={start_str}&end={end_str}"
+        f"&latitude={city_coords['lat']}&longitude={city_coords['lon']}"
+        f"&community=SB&parameters={','.join(HOURLY_POWER_PARAMETERS.values())}"
+        f"&time-standard=LST&format=JSON"
+    )
+
+
+def parse_hourly_series(data):
+
+    # {"T2M": {"YYYYMMDDHH": v, ...}, ...} -> {YYYYMMDD: float32 (24, params)}, -999 as NaN.
+    params = data.get("properties", {}).get("parameter", {})
+    days = {}
+    for p, code in enumerate(HOURLY_POWER_PARAMETERS.values()):
+        for stamp, value in params.get(code, {}).items():
+            block = days.get(stamp[:8])
+            if block is None:
+                block = days[stamp[:8]] = np.full((24, len(HOURLY_PARAMS)), np.nan, dtype=np.float32)
+            if value is not None and value != -999:
+                block[int(stamp[8:10]), p] = value
+    return days
+
+
+def _windows(date_strs, max_gap_days=HOURLY_WINDOW_MAX_GAP_DAYS):
+
+    # Sorted YYYYMMDD strings -> [(start, end)] runs; a week across New Year becomes two windows, not a year.
+    windows = []
+    for ds in sorted(date_strs):
+        day = datetime.strptime(ds, "%Y%m%d").date()
+        if windows and (day - windows[-1][1]).days <= max_gap_days:
+            windows[-1][1] = day
+        else:
+            windows.append([day, day])
+    return [(start.strftime("%Y%m%d"), end.strftime("%Y%m%d")) for start, end in windows]
+
+
+@timed("hourly_fetch")
+def get_hourly_history(city_coords, target_dates):
+
+    # -> {date: (years, values)} with values float32 (24, years, params). Everything comes from the hourly
+    # cache when possible; the remaining days go out as one window per year (per run of nearby days),
+    # all concurrently, and every fetched day is cached.
+    target_dates = list(target_dates)
+    wanted = {d: calendar_day_per_year(d, HOURLY_DATA_START_YEAR, d.year) for d in target_dates}
+    needed = {ds for days in wanted.values() for ds in days.values()}
+    cache = get_hourly_cache()
+    available = cache.get_many(city_coords, needed, HOURLY_PARAMS)
+
+    missing = sorted(needed - set(available))
+    today_str = datetime.now().strftime("%Y%m%d")
+    by_year = {}
+    for ds in missing:
+        by_year.setdefault(ds[:4], []).append(ds)
+    ranges = [(start, min(end, today_str)) for days in by_year.values() for start, end in _windows(days)]
+    ranges = [(start, end) for start, end in ranges if start <= end]
+    if ranges:
+        responses = fetch_json_many(build_hourly_power_url(city_coords, start, end) for start, end in ranges)
+        failed = 0
+        for data in responses:
+            if data is None:
+                failed += 1
+                continue
+            series = parse_hourly_series(data)
+            cache.put_many(city_coords, series, HOURLY_PARAMS)
+            available.update(series)
+        if failed:
+            incr("hourly_failed_windows", failed)
+            logger.warning("%d of %d hourly POWER windows failed at %s; those years are left out.",
+                           failed, len(ranges), city_coords)
+
+    results = {}
+    for target_date, days in wanted.items():
+        years = [year for year, ds in days.items() if ds in available]
+        values = np.full((24, len(years), len(HOURLY_PARAMS)), np.nan, dtype=np.float32)
+        for y, year in enumerate(years):
+            values[:, y, :] = available[days[year]]
+        results[target_date] = (np.array(years, dtype=int), values)
+    return results
+
+
+@timed("hourly_fit")
+def fit_hourly_trends(histories, target_years):
+
+    # One vectorized least-squares fit over (days, 24 hours, years, params) -> predictions (days, 24, params).
+    all_years = np.unique(np.concatenate([years for years, _ in histories] or [np.array([], dtype=int)]))
+    if not len(all_years):
+        return np.full((len(histories), 24, len(HOURLY_PARAMS)), np.nan)
+    stacked = np.full((len(histories), 24, len(all_years), len(HOURLY_PARAMS)), np.nan, dtype=np.float32)
+    for d, (years, values) in enumerate(histories):
+        if len(years):
+            stacked[d][:, np.searchsorted(all_years, years), :] = values
+    slopes, intercepts = fit_linear_trends(all_years, stacked)
+    return predict_from_trends(slopes, intercepts, np.asarray(target_years)[:, None])
+
+
+def get_hourly_predictions(city_coords, dates):
+
+    # {date: [{'hour': h, 'temperature': ..., ...} for h in 0..23]} as ai_planner.generate_schedule expects;
+    # dates without any hourly history are left out.
+    dates = list(dates)
+    histories = get_hourly_history(city_coords, dates)
+    usable = [d for d in dates if len(histories[d][0]) >= 2]
+    if not usable:
+        return {}
+    predictions = fit_hourly_trends([histories[d] for d in usable], [d.year for d in usable])
+    return {
+        d: [{"hour": hour, **{param: float(predictions[i, hour, p]) for p, param in enumerate(HOURLY_PARAMS)}}
+            for hour in range(24)]
+        for i, d in enumerate(usable)
+    }
@@ -0,0 +1,196 @@
+# jobs.py
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import incr, timed
+
+
+# Long-running work (plan creation) runs on one bounded pool per process instead of inside the
+# Streamlit script thread. Jobs are keyed by the caller's session, so a rerun finds its job again,
+# and a session has at most one job: submitting a new one cancels the previous.
+JOB_MAX_WORKERS = int(os.environ.get("CLIMAX_JOB_MAX_WORKERS", "4"))
+# Finished jobs nobody collected are dropped after this long.
+JOB_RETENTION_SECONDS = int(os.environ.get("CLIMAX_JOB_RETENTION_SECONDS", "900"))
+
+logger = logging.getLogger("climax.jobs")
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+
+    # Progress is reported by the job function itself through start_stage()/append_text()/warn();
+    # readers take snapshot()s from any thread.
+    def __init__(self, key, stages=()):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.stages = tuple(stages)
+        self.status = "queued"
+        self.stage = None
+        self.completed = []
+        self.text = ""
+        self.recommendations = ""
+        self.warnings = []
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def done(self):
+        return self.status in ("done", "failed", "cancelled")
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def start_stage(self, name):
+
+        if self.cancelled:
+            raise JobCancelled()
+        with self._lock:
+            if self.stage is not None:
+                self.completed.append(self.stage)
+            self.stage = name
+
+    def append_text(self, text):
+
+        # Partial output (a streamed LLM answer) that pollers can show before the job ends.
+        with self._lock:
+            self.text += text
+
+    def append_recommendations(self, text):
+
+        # A second streamed answer, shown below the first.
+        with self._lock:
+            self.recommendations += text
+
+    def warn(self, message):
+
+        # Something the job did without (a data source that failed), for the page to mention.
+        with self._lock:
+            self.warnings.append(message)
+
+    def cancel(self):
+
+        self.cancel_event.set()
+
+    def progress(self):
+
+        with self._lock:
+            if self.status == "done":
+                return 1.0
+            return len(self.completed) / len(self.stages) if self.stages else 0.0
+
+    def snapshot(self):
+
+        with self._lock:
+            return {
+                "id": self.id, "status": self.status, "stage": self.stage, "completed": list(self.completed),
+                "text": self.text, "recommendations": self.recommendations, "warnings": list(self.warnings),
+                "error": self.error, "elapsed_s": (self.finished_at or time.time()) - self.created_at,
+            }
+
+
+class JobRegistry:
+
+    def __init__(self, max_workers=JOB_MAX_WORKERS, retention_seconds=JOB_RETENTION_SECONDS):
+        self.retention_seconds = retention_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="climax-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key, fn, *args, stages=(), name="job", **kwargs):
+
+        # fn(job, *args, **kwargs) runs on the pool; its return value becomes job.result.
+        job = Job(key, stages)
+        with self._lock:
+            previous = self._jobs.get(key)
+            self._jobs[key] = job
+        if previous is not None and not previous.done:
+            previous.cancel()
+        self._prune()
+        incr("jobs_submitted")
+        self._executor.submit(self._run, job, name, fn, args, kwargs)
+        return job
+
+    def _run(self, job, name, fn, args, kwargs):
+
+        if job.cancelled:
+            job.status = "cancelled"
+            job.finished_at = time.time()
+            incr("jobs_cancelled")
+            return
+        job.status = "running"
+        try:
+            with timed(name):
+                result = fn(job, *args, **kwargs)
+            job.result = result
+            job.status = "cancelled" if job.cancelled else "done"
+        except JobCancelled:
+            job.status = "cancelled"
+        except Exception as e:
+            logger.exception("Job %s (%s) failed", job.id, name)
+            job.error = f"{type(e).__name__}: {e}"
+            job.status = "failed"
+            incr("jobs_failed")
+        finally:
+            with job._lock:
+                if job.stage is not None and job.status == "done":
+                    job.completed.append(job.stage)
+            job.finished_at = time.time()
+            if job.status == "cancelled":
+                incr("jobs_cancelled")
+
+    def get(self, key):
+
+        with self._lock:
+            return self._jobs.get(key)
+
+    def pop(self, key, job=None):
+
+        # Removes the key's job once its result has been collected (only `job` itself when given).
+        with self._lock:
+            if job is None or self._jobs.get(key) is job:
+                return self._jobs.pop(key, None)
+            return None
+
+    def cancel(self, key):
+
+        job = self.get(key)
+        if job is not None and not job.done:
+            job.cancel()
+        return job
+
+    def active_count(self):
+
+        with self._lock:
+            return sum(not job.done for job in self._jobs.values())
+
+    def _prune(self):
+
+        cutoff = time.time() - self.retention_seconds
+        with self._lock:
+            for key in [k for k, job in self._jobs.items() if job.done and job.finished_at < cutoff]:
+                del self._jobs[key]
+
+
+_job_registry = None
+_job_registry_lock = threading.Lock()
+
+
+def get_job_registry():
+
+    global _job_registry
+    with _job_registry_lock:
+        if _job_registry is None:
+            _job_registry = JobRegistry()
+        return _job_registry
@@ -0,0 +1,331 @@
+# llm_backends.py
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from llm_cache import get_llm_cache, response_key
+from metrics import METRICS
+
+
+LLM_BACKEND = os.environ.get("CLIMAX_LLM_BACKEND", "ollama").strip().lower() or "ollama"
+LLM_MAX_RETRIES = int(os.environ.get("CLIMAX_LLM_MAX_RETRIES", "2"))
+LLM_BACKOFF_SECONDS = float(os.environ.get("CLIMAX_LLM_BACKOFF_SECONDS", "1.0"))
+
+OLLAMA_URL = os.environ.get("CLIMAX_OLLAMA_URL", "http://localhost:11434/api/generate")
+OLLAMA_MODEL = os.environ.get("CLIMAX_OLLAMA_MODEL", "qwen2.5:3b-instruct")
+OPENAI_MODEL = "gpt-3.5-turbo"
+
+
+class LLMError(Exception):
+    pass
+
+
+class LLMBackend(ABC):
+
+    # One instance per (backend, model, credentials) per process, holding its pooled client.
+    # generate()/stream() add the response cache, retries with exponential backoff and per-call
+    # metrics on top of the backend-specific _generate()/_stream().
+    name = "base"
+
+    def __init__(self, model, timeout=300, max_retries=LLM_MAX_RETRIES, backoff=LLM_BACKOFF_SECONDS):
+        self.model = model
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.last_call = None
+        self.metrics = {"calls": 0, "errors": 0, "retries": 0, "cache_hits": 0, "latency_s": 0.0,
+                        "prompt_tokens": 0, "completion_tokens": 0}
+        self._metrics_lock = threading.Lock()
+
+    @abstractmethod
+    def _generate(self, prompt, temperature, system, max_tokens):
+        # -> (text, prompt_tokens, completion_tokens)
+        ...
+
+    @abstractmethod
+    def _stream(self, prompt, temperature, system, max_tokens, usage):
+        # Yields text chunks; fills usage["prompt_tokens"/"completion_tokens"] when the backend reports them.
+        ...
+
+    def _cache_key(self, prompt, temperature, system):
+
+        return response_key(f"{self.name}:{self.model}", f"{system or ''}\n{prompt}", temperature)
+
+    def _record(self, started, retries, prompt_tokens, completion_tokens, cached=False, error=False):
+
+        latency = time.perf_counter() - started
+        call = {"backend": self.name, "model": self.model, "latency_s": latency, "retries": retries,
+                "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                "cached": cached, "error": error}
+        with self._metrics_lock:
+            self.metrics["calls"] += 1
+            self.metrics["errors"] += int(error)
+            self.metrics["retries"] += retries
+            self.metrics["cache_hits"] += int(cached)
+            self.metrics["latency_s"] += latency
+            self.metrics["prompt_tokens"] += prompt_tokens or 0
+            self.metrics["completion_tokens"] += completion_tokens or 0
+            self.last_call = call
+        METRICS.observe(f"llm_{self.name}", latency)
+        METRICS.incr("llm_calls")
+        METRICS.incr("llm_errors", int(error))
+        METRICS.incr("llm_retries", retries)
+        METRICS.incr("llm_cache_hits", int(cached))
+        METRICS.incr("llm_prompt_tokens", prompt_tokens or 0)
+        METRICS.incr("llm_completion_tokens", completion_tokens or 0)
+        return call
+
+    def _sleep_before_retry(self, attempt):
+
+        time.sleep(self.backoff * (2 ** attempt) * (0.5 + random.random() / 2))
+
+    def generate(self, prompt, temperature=0.4, system=None, max_tokens=None, use_cache=True):
+
+        cache = get_llm_cache()
+        key = self._cache_key(prompt, temperature, system)
+        started = time.perf_counter()
+        if use_cache:
+            cached = cache.get(key)
+            if cached is not None:
+                self._record(started, 0, 0, 0, cached=True)
+                return cached
+        for attempt in range(self.max_retries + 1):
+            try:
+                text, prompt_tokens, completion_tokens = self._generate(prompt, temperature, system, max_tokens)
+                break
+            except LLMError:
+                if attempt == self.max_retries:
+                    self._record(started, attempt, 0, 0, error=True)
+                    raise
+                self._sleep_before_retry(attempt)
+        text = (text or "").strip()
+        self._record(started, attempt, prompt_tokens, completion_tokens)
+        if text and use_cache:
+            cache.put(key, text)
+        return text
+
+    def stream(self, prompt, temperature=0.4, system=None, max_tokens=None, cancel_event=None, use_cache=True):
+
+        # Retries only happen before the first chunk; once text has been shown, an error is raised.
+        # Only complete, uncancelled generations are cached.
+        cache = get_llm_cache()
+        key = self._cache_key(prompt, temperature, system)
+        started = time.perf_counter()
+        if use_cache:
+            cached = cache.get(key)
+            if cached is not None:
+                self._record(started, 0, 0, 0, cached=True)
+                yield cached
+                return
+        for attempt in range(self.max_retries + 1):
+            usage = {"prompt_tokens": 0, "completion_tokens": 0}
+            parts = []
+            chunks = self._stream(prompt, temperature, system, max_tokens, usage)
+            try:
+                for chunk in chunks:
+                    if cancel_event is not None and cancel_event.is_set():
+                        self._record(started, attempt, usage["prompt_tokens"], len(parts))
+                        return
+                    if chunk:
+                        parts.append(chunk)
+                        yield chunk
+                break
+            except LLMError:
+                if parts or attempt == self.max_retries:
+                    self._record(started, attempt, 0, 0, error=True)
+                    raise
+                self._sleep_before_retry(attempt)
+            finally:
+                chunks.close()
+        self._record(started, attempt, usage["prompt_tokens"], usage["completion_tokens"] or len(parts))
+        text = "".join(parts).strip()
+        if text and use_cache:
+            cache.put(key, text)
+
+
+class OllamaBackend(LLMBackend):
+
+    name = "ollama"
+
+    def __init__(self, model=OLLAMA_MODEL, url=OLLAMA_URL, **kwargs):
+        super().__init__(model, **kwargs)
+        self.url = url
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=8)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _payload(self, prompt, temperature, system, max_tokens, stream):
+
+        options = {"temperature": temperature}
+        if max_tokens:
+            options["num_predict"] = max_tokens
+        payload = {"model": self.model, "prompt": prompt, "stream": stream, "options": options}
+        if system:
+            payload["system"] = system
+        return payload
+
+    def _generate(self, prompt, temperature, system, max_tokens):
+
+        try:
+            resp = self.session.post(self.url, json=self._payload(prompt, temperature, system, max_tokens, False),
+                                     timeout=self.timeout)
+            resp.raise_for_status()
+            data = resp.json()
+        except requests.exceptions.RequestException as e:
+            raise LLMError(e) from e
+        except ValueError as e:
+            raise LLMError("Failed to parse response from Ollama.") from e
+        return data.get("response") or "", data.get("prompt_eval_count", 0), data.get("eval_count", 0)
+
+    def _stream(self, prompt, temperature, system, max_tokens, usage):
+
+        resp = None
+        try:
+            resp = self.session.post(self.url, json=self._payload(prompt, temperature, system, max_tokens, True),
+                                     timeout=self.timeout, stream=True)
+            resp.raise_for_status()
+            for line in resp.iter_lines():
+                if not line:
+                    continue
+                data = json.loads(line)
+                if data.get("error"):
+                    raise LLMError(data["error"])
+                chunk = data.get("response") or ""
+                if chunk:
+                    yield chunk
+                if data.get("done"):
+                    usage["prompt_tokens"] = data.get("prompt_eval_count", 0)
+                    usage["completion_tokens"] = data.get("eval_count", 0)
+                    break
+        except requests.exceptions.RequestException as e:
+            raise LLMError(e) from e
+        except ValueError as e:
+            raise LLMError("Failed to parse response from Ollama.") from e
+        finally:
+            if resp is not None:
+                resp.close()
+
+
+class OpenAIBackend(LLMBackend):
+
+    name = "openai"
+
+    def __init__(self, model=OPENAI_MODEL, api_key=None, **kwargs):
+        super().__init__(model, **kwargs)
+        from openai import OpenAI
+
+        # Retries are handled by LLMBackend so they show up in the metrics.
+        self.client = OpenAI(api_key=api_key, timeout=self.timeout, max_retries=0)
+
+    def _messages(self, prompt, system):
+
+        messages = [{"role": "system", "content": system}] if system else []
+        return messages + [{"role": "user", "content": prompt}]
+
+    def _generate(self, prompt, temperature, system, max_tokens):
+
+        try:
+            response = self.client.chat.completions.create(
+                model=self.model, messages=self._messages(prompt, system),
+                temperature=temperature, max_tokens=max_tokens,
+            )
+        except Exception as e:
+            raise LLMError(e) from e
+        usage = response.usage
+        return (response.choices[0].message.content or "",
+                usage.prompt_tokens if usage else 0, usage.completion_tokens if usage else 0)
+
+    def _stream(self, prompt, temperature, system, max_tokens, usage):
+
+        stream = None
+        try:
+            stream = self.client.chat.completions.create(
+                model=self.model, messages=self._messages(prompt, system),
+                temperature=temperature, max_tokens=max_tokens,
+                stream=True, stream_options={"include_usage": True},
+            )
+            for chunk in stream:
+                if chunk.usage:
+                    usage["prompt_tokens"] = chunk.usage.prompt_tokens
+                    usage["completion_tokens"] = chunk.usage.completion_tokens
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except LLMError:
+            raise
+        except Exception as e:
+            raise LLMError(e) from e
+        finally:
+            if stream is not None:
+                stream.close()
+
+
+class StubBackend(LLMBackend):
+
+    # Deterministic, model-free responses for load tests and offline runs; latency_s simulates a model.
+    name = "stub"
+
+    def __init__(self, model="stub", latency_s=0.0, **kwargs):
+        super().__init__(model, **kwargs)
+        self.latency_s = latency_s
+
+    def _text(self, prompt):
+
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+        lines = [line.strip() for line in prompt.splitlines() if line.strip()]
+        return f"Stub plan {digest}: {len(lines)} prompt lines considered.\n- Keep outdoor activities to mild hours.\n- Move the rest indoors if it rains."
+
+    def _generate(self, prompt, temperature, system, max_tokens):
+
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        text = self._text(prompt)
+        return text, len(prompt.split()), len(text.split())
+
+    def _stream(self, prompt, temperature, system, max_tokens, usage):
+
+        text = self._text(prompt)
+        words = text.split(" ")
+        for i, word in enumerate(words):
+            if self.latency_s:
+                time.sleep(self.latency_s / len(words))
+            yield word if i == len(words) - 1 else word + " "
+        usage["prompt_tokens"] = len(prompt.split())
+        usage["completion_tokens"] = len(words)
+
+
+BACKENDS = {"ollama": OllamaBackend, "openai": OpenAIBackend, "stub": StubBackend}
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(name=None, **kwargs):
+
+    # Long-lived instance per configuration, so each backend keeps one pooled client per process. Setup
+    # failures (unknown name, missing client library or API key) are LLMErrors like any call failure.
+    name = (name or LLM_BACKEND).lower()
+    if name not in BACKENDS:
+        raise LLMError(f"Unknown LLM backend {name!r}; expected one of {sorted(BACKENDS)}.")
+    key = (name, tuple(sorted((k, str(v)) for k, v in kwargs.items())))
+    with _backends_lock:
+        if key not in _backends:
+            try:
+                _backends[key] = BACKENDS[name](**kwargs)
+            except Exception as e:
+                raise LLMError(f"Could not set up the {name} backend: {e}") from e
+        return _backends[key]
+
+
+def backend_metrics():
+
+    with _backends_lock:
+        backends = list(_backends.values())
+    return [{"backend": b.name, "model": b.model, **b.metrics} for b in backends]
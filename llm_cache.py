@@ -0,0 +1,108 @@
+# llm_cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from lru import LRUCache
+
+
+ROOT = Path(__file__).resolve().parent
+
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get("CLIMAX_LLM_CACHE_MAX_ENTRIES", "256"))
+# Optional second tier that survives restarts; off unless CLIMAX_LLM_CACHE_DISK=1.
+LLM_CACHE_DISK = os.environ.get("CLIMAX_LLM_CACHE_DISK", "").strip().lower() in {"1", "true", "yes"}
+LLM_CACHE_DISK_PATH = Path(os.environ.get("CLIMAX_CACHE_DIR", "").strip() or ROOT / ".cache") / "llm_responses.sqlite"
+LLM_CACHE_DISK_MAX_ENTRIES = int(os.environ.get("CLIMAX_LLM_CACHE_DISK_MAX_ENTRIES", "5000"))
+
+
+def response_key(model, prompt, temperature):
+
+    payload = json.dumps([model, prompt, round(float(temperature), 4)], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+
+    def __init__(self, max_entries=LLM_CACHE_MAX_ENTRIES, disk_path=None, disk_max_entries=LLM_CACHE_DISK_MAX_ENTRIES):
+        self.disk_max_entries = disk_max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = LRUCache(max_entries)
+        self._lock = threading.Lock()
+        self._conn = None
+        if disk_path is not None:
+            Path(disk_path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(disk_path), check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+
+    def get(self, key):
+
+        with self._lock:
+            response = self._entries.get(key)
+            if response is not None:
+                self.hits += 1
+                return response
+            if self._conn is not None:
+                row = self._conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+                    self._conn.commit()
+                    self._entries.put(key, row[0])
+                    self.hits += 1
+                    return row[0]
+            self.misses += 1
+            return None
+
+    def put(self, key, response):
+
+        with self._lock:
+            self._entries.put(key, response)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, accessed_at) VALUES (?, ?, ?)",
+                    (key, response, time.time()),
+                )
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.disk_max_entries,),
+                )
+                self._conn.commit()
+
+    def stats(self):
+
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "entries": len(self._entries),
+        }
+
+    def clear(self):
+
+        with self._lock:
+            self._entries.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM responses")
+                self._conn.commit()
+            self.hits = self.misses = 0
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMResponseCache(disk_path=LLM_CACHE_DISK_PATH if LLM_CACHE_DISK else None)
+        return _cache
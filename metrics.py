@@ -0,0 +1,150 @@
+# metrics.py
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import ContextDecorator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Set CLIMAX_METRICS_PORT to serve /metrics (Prometheus text format) from a background thread, and
+# CLIMAX_METRICS_LOG=1 to also emit one JSON log line per timed stage on stderr.
+METRICS_PORT = int(os.environ.get("CLIMAX_METRICS_PORT", "0") or 0)
+# Loopback only unless set otherwise (e.g. 0.0.0.0 for a scraper on another host).
+METRICS_HOST = os.environ.get("CLIMAX_METRICS_HOST", "127.0.0.1").strip() or "127.0.0.1"
+METRICS_LOG = os.environ.get("CLIMAX_METRICS_LOG", "").strip().lower() in {"1", "true", "yes"}
+METRICS_PREFIX = "climax_"
+
+logger = logging.getLogger("climax.metrics")
+if METRICS_LOG and not logger.handlers:
+    # Nothing configures logging in the app, so the JSON lines get their own handler.
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+class Metrics:
+
+    # Process-wide counters and stage timers. Timers keep count/sum/max, which is enough for rates and
+    # averages in Prometheus and for the dashboard's Performance panel.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.timers = {}
+
+    def incr(self, name, value=1):
+
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name, seconds):
+
+        with self._lock:
+            timer = self.timers.setdefault(name, {"count": 0, "sum_s": 0.0, "max_s": 0.0, "last_s": 0.0})
+            timer["count"] += 1
+            timer["sum_s"] += seconds
+            timer["max_s"] = max(timer["max_s"], seconds)
+            timer["last_s"] = seconds
+        if METRICS_LOG:
+            logger.info(json.dumps({"event": "timing", "stage": name, "seconds": round(seconds, 6)}))
+
+    def snapshot(self):
+
+        with self._lock:
+            return {"counters": dict(self.counters), "timers": {k: dict(v) for k, v in self.timers.items()}}
+
+    def reset(self):
+
+        with self._lock:
+            self.counters.clear()
+            self.timers.clear()
+
+    def prometheus_text(self):
+
+        snap = self.snapshot()
+        lines = []
+        for name, value in sorted(snap["counters"].items()):
+            metric = f"{METRICS_PREFIX}{name}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+        for name, timer in sorted(snap["timers"].items()):
+            metric = f"{METRICS_PREFIX}{name}_seconds"
+            lines += [
+                f"# TYPE {metric} summary",
+                f"{metric}_count {timer['count']}",
+                f"{metric}_sum {timer['sum_s']:.6f}",
+                f"# TYPE {metric}_max gauge",
+                f"{metric}_max {timer['max_s']:.6f}",
+            ]
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics()
+
+
+def incr(name, value=1):
+
+    METRICS.incr(name, value)
+
+
+class timed(ContextDecorator):
+
+    # `with timed("stage"):` or `@timed("stage")`; each use gets its own start time, so it is thread-safe.
+    def __init__(self, name, metrics=None):
+        self.name = name
+        self.metrics = metrics or METRICS
+
+    def _recreate_cm(self):
+        return type(self)(self.name, self.metrics)
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self._started)
+        return False
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+
+        if self.path.split("?")[0] == "/metrics":
+            body, content_type = METRICS.prometheus_text().encode("utf-8"), "text/plain; version=0.0.4"
+        elif self.path.split("?")[0] == "/metrics.json":
+            body, content_type = json.dumps(METRICS.snapshot()).encode("utf-8"), "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port=METRICS_PORT, host=METRICS_HOST):
+
+    # Streamlit cannot add routes, so the scrape endpoint is a small side server; idempotent per process.
+    global _server
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as e:
+                logger.warning("Could not start metrics server on %s:%s: %s", host, port, e)
+                return None
+            threading.Thread(target=_server.serve_forever, name="climax-metrics", daemon=True).start()
+        return _server
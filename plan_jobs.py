@@ -0,0 +1,103 @@
+# plan_jobs.py
+import logging
+import sqlite3
+
+import requests
+
+from ai_planner import generate_schedule_with_ollama, get_plan_recommendations
+from data_fetcher import WEATHER_PARAMS
+from extremes import get_extremes_for_dates
+from hourly_fetcher import get_hourly_predictions
+from jobs import get_job_registry
+from prediction_cache import get_shared_predictions
+from scheduler import format_schedule, plan_schedule
+from weather_block import WeatherBlock
+
+
+logger = logging.getLogger("climax.plan_jobs")
+
+PLAN_STAGES = ("weather", "hourly", "extremes", "schedule", "recommendations")
+STAGE_LABELS = {
+    "weather": "📈 Analyzing decades of historical data to predict weather patterns...",
+    "hourly": "🕒 Predicting hour-by-hour conditions...",
+    "extremes": "🌡️ Estimating the odds of extreme weather...",
+    "schedule": "🗓️ Writing the smart schedule...",
+    "recommendations": "💡 Writing smart recommendations...",
+}
+# What a failed hourly or extremes fetch can raise; the plan is still made without that data.
+# Anything else is a bug and fails the job.
+OPTIONAL_DATA_ERRORS = (requests.exceptions.RequestException, OSError, sqlite3.Error, ValueError, KeyError)
+
+
+def run_plan(job, city, city_coords, plan_type, dates, activities, known=None, planner="llm", hourly=True):
+
+    # The dashboard's "Create Smart Schedule" work, off the script thread. known holds the
+    # (prediction, history, trend) the session already has, so only new days are computed. Returns
+    # everything the page keeps in session state; "error" is set when no day could be predicted.
+    # hourly=True adds per-hour predictions from the POWER hourly archive, used by both planners.
+    known = dict(known or {})
+    job.start_stage("weather")
+    missing = [d for d in dates if d not in known]
+    predictions = {**known, **(get_shared_predictions(city_coords, missing) if missing else {})}
+    predictions = {d: predictions[d] for d in dates}
+    result = {"city": city, "plan_type": plan_type, "dates": list(dates), "activities": activities,
+              "predictions": predictions}
+    usable = {d: p for d, p in predictions.items() if p[0]}
+    if not usable:
+        result["error"] = ("Could not retrieve enough historical data to make a prediction." if plan_type == "Daily Plan"
+                           else "Could not retrieve weather forecast for any of the selected days.")
+        return result
+    weather_data = WeatherBlock.from_records({d: p[0] for d, p in usable.items()}, WEATHER_PARAMS)
+    result.update(weather_data=weather_data,
+                  historical_data={d: p[1] for d, p in usable.items()},
+                  trend_data={d: p[2] for d, p in usable.items()})
+
+    job.start_stage("hourly")
+    try:
+        result["hourly_weather_data"] = get_hourly_predictions(city_coords, weather_data.keys()) if hourly else {}
+    except OPTIONAL_DATA_ERRORS:
+        logger.exception("Hourly predictions failed for %s", city)
+        job.warn("Hour-by-hour predictions are unavailable; the schedule uses daily values only.")
+        result["hourly_weather_data"] = {}
+    hourly_weather_data = result["hourly_weather_data"] or None
+
+    job.start_stage("extremes")
+    try:
+        result["extremes"] = get_extremes_for_dates(city_coords, weather_data.keys())
+    except OPTIONAL_DATA_ERRORS:
+        logger.exception("Extreme-weather odds failed for %s", city)
+        job.warn("The odds of extreme weather are unavailable for this plan.")
+        result["extremes"] = {}
+
+    job.start_stage("schedule")
+    if planner == "rules":
+        schedule = format_schedule(plan_schedule(weather_data, activities, plan_type, weather_data.keys(),
+                                                 hourly_weather_data))
+        job.append_text(schedule)
+    else:
+        for chunk in generate_schedule_with_ollama(
+                weather_data=weather_data, activities=activities, plan_type=plan_type, city=city,
+                day=dates[0] if plan_type == "Daily Plan" else None,
+                start_date=dates[0] if plan_type == "Weekly Plan" else None,
+                end_date=dates[-1] if plan_type == "Weekly Plan" else None,
+                stream=True, cancel_event=job.cancel_event, hourly_weather_data=hourly_weather_data):
+            job.append_text(chunk)
+    result["ai_schedule"] = job.snapshot()["text"]
+
+    job.start_stage("recommendations")
+    activities_list = [a.strip() for a in activities.split("\n") if a.strip()]
+    try:
+        if activities_list:
+            for chunk in get_plan_recommendations(weather_data, activities_list, stream=True,
+                                                  cancel_event=job.cancel_event):
+                job.append_recommendations(chunk)
+        result["recommendations"] = job.snapshot()["recommendations"]
+    except Exception as e:
+        result["recommendations"] = f"⚠️ Could not create recommendations: {e}"
+    result["warnings"] = job.snapshot()["warnings"]
+    return result
+
+
+def submit_plan(session_key, *args, **kwargs):
+
+    return get_job_registry().submit(session_key, run_plan, *args, stages=PLAN_STAGES, name="plan_job", **kwargs)
@@ -0,0 +1,137 @@
+# power_client.py
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import incr, timed
+
+
+POWER_MAX_WORKERS = int(os.environ.get("CLIMAX_POWER_MAX_WORKERS", "8"))
+# (connect, read) seconds; bulk multi-year responses can take a while to be generated server-side.
+POWER_TIMEOUT = (
+    float(os.environ.get("CLIMAX_POWER_CONNECT_TIMEOUT", "10")),
+    float(os.environ.get("CLIMAX_POWER_READ_TIMEOUT", "120")),
+)
+
+# Transient failures (connection errors, timeouts, 429 and 5xx) are retried with capped exponential
+# backoff and full jitter, or after the server's Retry-After when it sends one.
+POWER_MAX_RETRIES = int(os.environ.get("CLIMAX_POWER_MAX_RETRIES", "3"))
+POWER_BACKOFF_SECONDS = float(os.environ.get("CLIMAX_POWER_BACKOFF_SECONDS", "1.0"))
+POWER_BACKOFF_MAX_SECONDS = float(os.environ.get("CLIMAX_POWER_BACKOFF_MAX_SECONDS", "30"))
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+RETRY_EXCEPTIONS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                    requests.exceptions.ChunkedEncodingError)
+# Process-wide request rate towards POWER (token bucket); 0 disables the limiter.
+POWER_RATE_PER_SECOND = float(os.environ.get("CLIMAX_POWER_RATE_PER_SECOND", "5"))
+POWER_RATE_BURST = int(os.environ.get("CLIMAX_POWER_RATE_BURST", str(max(POWER_MAX_WORKERS, 1))))
+
+logger = logging.getLogger("climax.power")
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class RateLimiter:
+
+    # Token bucket shared by every worker thread: at most `burst` back-to-back requests, then `rate` per second.
+    def __init__(self, rate=POWER_RATE_PER_SECOND, burst=POWER_RATE_BURST):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+_rate_limiter = RateLimiter()
+
+
+def get_session():
+
+    # One keep-alive session per process; urllib3's pool is thread-safe, so workers share it.
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(POWER_MAX_WORKERS, 1))
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def _retry_delay(attempt, response=None):
+
+    retry_after = (getattr(response, "headers", None) or {}).get("Retry-After")
+    if retry_after:
+        try:
+            return min(float(retry_after), POWER_BACKOFF_MAX_SECONDS)
+        except ValueError:
+            pass
+    return random.uniform(0, min(POWER_BACKOFF_MAX_SECONDS, POWER_BACKOFF_SECONDS * 2 ** attempt))
+
+
+def fetch_json(url, timeout=POWER_TIMEOUT, max_retries=POWER_MAX_RETRIES):
+
+    # Parsed JSON, or None once the retries are used up or the error is not transient (e.g. a 4xx).
+    for attempt in range(max_retries + 1):
+        response = None
+        waited = _rate_limiter.acquire()
+        if waited:
+            incr("power_rate_limited_seconds", waited)
+        try:
+            with timed("power_request"):
+                response = get_session().get(url, timeout=timeout)
+            incr("power_http_requests")
+            incr("power_http_bytes", len(response.content or b""))
+            if response.status_code == 200:
+                return response.json()
+            reason = f"HTTP {response.status_code}"
+            if response.status_code not in RETRY_STATUSES:
+                break
+        except RETRY_EXCEPTIONS as e:
+            reason = type(e).__name__
+        except ValueError:
+            # A 200 with a truncated body; the next attempt usually gets the whole document.
+            reason = "invalid JSON"
+        except requests.exceptions.RequestException as e:
+            reason = type(e).__name__
+            break
+        if attempt < max_retries:
+            incr("power_http_retries")
+            time.sleep(_retry_delay(attempt, response))
+    incr("power_http_errors")
+    logger.warning("NASA POWER request failed after %d attempt(s) (%s): %s", attempt + 1, reason, url)
+    return None
+
+
+def fetch_json_many(urls, max_workers=POWER_MAX_WORKERS, timeout=POWER_TIMEOUT):
+
+    # Results line up with `urls` regardless of completion order; failed requests come back as None.
+    urls = list(urls)
+    if len(urls) <= 1 or max_workers <= 1:
+        return [fetch_json(url, timeout) for url in urls]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(urls))) as executor:
+        return list(executor.map(lambda url: fetch_json(url, timeout), urls))
@@ -0,0 +1,69 @@
+# precompute_climatology.py
+#
+# Offline job that builds the per-city climatology tiles the dashboard loads at startup:
+#   python precompute_climatology.py build            # every configured city, 1981 -> last full year
+#   python precompute_climatology.py refresh          # append only the years missing from each tile
+#   python precompute_climatology.py build --city Cairo --end-year 2024
+# Each tile is saved with its extreme-weather table (extremes.py) under <tiles-dir>/extremes.
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+from config import CITIES
+from climatology_tiles import ClimatologyTile, TILES_DIR, load_tile
+from data_fetcher import NASA_DATA_START_YEAR, WEATHER_PARAMS, get_nasa_weather_years
+from extremes import ExtremesTable
+
+
+def build_city_tile(name, city_coords, end_year=None, directory=TILES_DIR):
+
+    end_year = end_year or datetime.now().year - 1
+    series = get_nasa_weather_years(city_coords, NASA_DATA_START_YEAR, end_year)
+    if series is None:
+        raise RuntimeError(f"Could not fetch NASA POWER history for {name}.")
+    tile = ClimatologyTile.from_series(name, city_coords, series, range(NASA_DATA_START_YEAR, end_year + 1), WEATHER_PARAMS)
+    tile.save(directory)
+    return tile
+
+
+def refresh_city_tile(name, city_coords, end_year=None, directory=TILES_DIR):
+
+    end_year = end_year or datetime.now().year - 1
+    tile = load_tile(name, directory)
+    if tile is None or tile.params != tuple(WEATHER_PARAMS):
+        return build_city_tile(name, city_coords, end_year, directory)
+    first_new_year = int(tile.years[-1]) + 1
+    if first_new_year > end_year:
+        return tile
+    series = get_nasa_weather_years(city_coords, first_new_year, end_year)
+    if series is None:
+        raise RuntimeError(f"Could not fetch NASA POWER {first_new_year}-{end_year} for {name}.")
+    tile.append_years(series, range(first_new_year, end_year + 1))
+    tile.save(directory)
+    return tile
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Precompute ClimaX climatology tiles for the configured cities.")
+    parser.add_argument("command", choices=["build", "refresh"])
+    parser.add_argument("--city", action="append", choices=sorted(CITIES), help="Limit to one city (repeatable).")
+    parser.add_argument("--end-year", type=int, default=None, help="Last year to include (default: last full year).")
+    parser.add_argument("--tiles-dir", default=str(TILES_DIR))
+    args = parser.parse_args(argv)
+
+    job = build_city_tile if args.command == "build" else refresh_city_tile
+    failed = False
+    for name in args.city or list(CITIES):
+        try:
+            tile = job(name, CITIES[name], args.end_year, args.tiles_dir)
+            ExtremesTable.from_tile(tile).save(Path(args.tiles_dir) / "extremes")
+            print(f"{name}: {tile.years[0]}-{tile.years[-1]} ({len(tile.years)} years)")
+        except RuntimeError as e:
+            print(f"{name}: {e}")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
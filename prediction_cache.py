@@ -0,0 +1,298 @@
+# prediction_cache.py
+import logging
+import os
+import pickle
+import threading
+import time
+import uuid
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+from coords import coord_key
+from data_fetcher import CLIMATOLOGY_WINDOW_DAYS, get_nasa_weather_for_dates
+from lru import LRUCache
+from metrics import incr, timed
+
+
+# (point, date) -> (prediction, history, trend), shared by every session in the process, or by every
+# process when CLIMAX_REDIS_URL points at a Redis-compatible server. Concurrent requests for the same
+# key wait for the one computation already in flight instead of all going to NASA POWER.
+PREDICTION_CACHE_TTL_SECONDS = int(os.environ.get("CLIMAX_PREDICTION_CACHE_TTL_SECONDS", str(6 * 3600)))
+PREDICTION_CACHE_MAX_ENTRIES = int(os.environ.get("CLIMAX_PREDICTION_CACHE_MAX_ENTRIES", "2048"))
+PREDICTION_CACHE_WAIT_SECONDS = float(os.environ.get("CLIMAX_PREDICTION_CACHE_WAIT_SECONDS", "300"))
+REDIS_URL = os.environ.get("CLIMAX_REDIS_URL", "").strip()
+REDIS_PREFIX = "climax:prediction:"
+# Deletes a lock only while it still holds the caller's token, so a holder whose lock expired cannot
+# release the one another worker took since.
+REDIS_UNLOCK_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+logger = logging.getLogger("climax.predictions")
+
+
+class MemoryStore:
+
+    # In-process stand-in for Redis: LRU with a per-entry expiry.
+    def __init__(self, max_entries=PREDICTION_CACHE_MAX_ENTRIES):
+        self._entries = LRUCache(max_entries)
+
+    def get(self, key):
+        return self._entries.get(key)
+
+    def set(self, key, value, ttl):
+        self._entries.put(key, value, ttl)
+
+    def lock(self, key, ttl):
+        return True
+
+    def unlock(self, key):
+        pass
+
+    def locked(self, key):
+        return False
+
+    def clear(self):
+        self._entries.clear()
+
+
+class RedisStore:
+
+    # Pickled values under REDIS_PREFIX with a server-side TTL. lock()/unlock() use SET NX with a random
+    # token so that, across processes, only one computes a key while the others poll for its value.
+    def __init__(self, url=REDIS_URL, client=None):
+        if client is None:
+            import redis
+
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self._tokens = {}
+        self._tokens_lock = threading.Lock()
+
+    def get(self, key):
+
+        raw = self.client.get(REDIS_PREFIX + key)
+        return pickle.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl):
+
+        self.client.set(REDIS_PREFIX + key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), ex=ttl)
+
+    def lock(self, key, ttl):
+
+        token = uuid.uuid4().hex
+        if not self.client.set(REDIS_PREFIX + "lock:" + key, token, nx=True, ex=max(1, int(ttl))):
+            return False
+        with self._tokens_lock:
+            self._tokens[key] = token
+        return True
+
+    def unlock(self, key):
+
+        with self._tokens_lock:
+            token = self._tokens.pop(key, None)
+        if token is not None:
+            self.client.eval(REDIS_UNLOCK_SCRIPT, 1, REDIS_PREFIX + "lock:" + key, token)
+
+    def locked(self, key):
+
+        return bool(self.client.exists(REDIS_PREFIX + "lock:" + key))
+
+    def clear(self):
+
+        keys = list(self.client.scan_iter(REDIS_PREFIX + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+
+class PredictionCache:
+
+    def __init__(self, store, ttl=PREDICTION_CACHE_TTL_SECONDS, wait_seconds=PREDICTION_CACHE_WAIT_SECONDS):
+        self.store = store
+        self.ttl = ttl
+        self.wait_seconds = wait_seconds
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def _store_get(self, key):
+
+        try:
+            return self.store.get(key)
+        except Exception as e:
+            logger.warning("Prediction cache read failed: %s", e)
+            return None
+
+    def _store_set(self, key, value, cacheable):
+
+        if not cacheable(value):
+            return
+        try:
+            self.store.set(key, value, self.ttl)
+        except Exception as e:
+            logger.warning("Prediction cache write failed: %s", e)
+
+    def get_many(self, keys, compute, cacheable=lambda value: value is not None):
+
+        # compute(missing_keys) -> {key: value}. Each missing key is computed by exactly one caller in
+        # this process; other callers asking for it meanwhile block on that caller's result.
+        results = {}
+        missing = []
+        for key in keys:
+            value = self._store_get(key)
+            if value is not None:
+                results[key] = value
+            else:
+                missing.append(key)
+        incr("prediction_cache_hits", len(results))
+        if not missing:
+            return results
+
+        owned, waiting = {}, {}
+        with self._lock:
+            for key in missing:
+                if key in self._inflight:
+                    waiting[key] = self._inflight[key]
+                else:
+                    owned[key] = self._inflight[key] = Future()
+        incr("prediction_cache_waits", len(waiting))
+
+        if owned:
+            try:
+                computed = self._compute_owned(list(owned), compute, cacheable)
+                for key, future in owned.items():
+                    results[key] = computed.get(key)
+                    future.set_result(results[key])
+            except BaseException as e:
+                for future in owned.values():
+                    if not future.done():
+                        future.set_exception(e)
+                raise
+            finally:
+                with self._lock:
+                    for key in owned:
+                        self._inflight.pop(key, None)
+
+        late = []
+        for key, future in waiting.items():
+            try:
+                results[key] = future.result(timeout=self.wait_seconds)
+            except FutureTimeout:
+                late.append(key)
+        if late:
+            # The caller computing these is too slow; do it here rather than fail the request.
+            incr("prediction_cache_wait_timeouts", len(late))
+            computed = dict(compute(late))
+            for key in late:
+                results[key] = computed.get(key)
+                self._store_set(key, results[key], cacheable)
+        return results
+
+    def _compute_owned(self, keys, compute, cacheable):
+
+        # With a shared store, keys another process is already computing are polled for instead.
+        locked = [key for key in keys if self._try_lock(key)]
+        others = [key for key in keys if key not in locked]
+        computed = {}
+        try:
+            if locked:
+                incr("prediction_cache_misses", len(locked))
+                with timed("prediction_compute"):
+                    computed = dict(compute(locked))
+                for key in locked:
+                    self._store_set(key, computed.get(key), cacheable)
+        finally:
+            for key in locked:
+                self._unlock(key)
+        if others:
+            computed.update(self._poll(others, compute))
+        return computed
+
+    def _try_lock(self, key):
+
+        try:
+            return self.store.lock(key, self.wait_seconds)
+        except Exception:
+            return True
+
+    def _unlock(self, key):
+
+        try:
+            self.store.unlock(key)
+        except Exception:
+            pass
+
+    def _poll(self, keys, compute):
+
+        deadline = time.monotonic() + self.wait_seconds
+        found = {}
+        pending = list(keys)
+        abandoned = []
+        while pending and time.monotonic() < deadline:
+            time.sleep(0.2)
+            for key in list(pending):
+                value = self._store_get(key)
+                if value is not None:
+                    found[key] = value
+                    pending.remove(key)
+                elif not self._is_locked(key):
+                    # Released without a cached value: the other process failed or got nothing usable.
+                    abandoned.append(key)
+                    pending.remove(key)
+        if pending or abandoned:
+            found.update(compute(pending + abandoned))
+        return found
+
+    def _is_locked(self, key):
+
+        try:
+            return self.store.locked(key)
+        except Exception:
+            return False
+
+    def clear(self):
+
+        self.store.clear()
+
+
+_prediction_cache = None
+_prediction_cache_lock = threading.Lock()
+
+
+def get_prediction_cache():
+
+    global _prediction_cache
+    with _prediction_cache_lock:
+        if _prediction_cache is None:
+            store = None
+            if REDIS_URL:
+                try:
+                    store = RedisStore(REDIS_URL)
+                    store.client.ping()
+                except Exception as e:
+                    logger.warning("Redis prediction cache unavailable (%s); using the in-process cache.", e)
+                    store = None
+            _prediction_cache = PredictionCache(store or MemoryStore())
+        return _prediction_cache
+
+
+def prediction_key(city_coords, date):
+
+    lat, lon = coord_key(city_coords)
+    key = f"{lat}:{lon}:{date.isoformat()}"
+    # Windowed predictions differ from exact-day ones, so a shared store keeps them apart.
+    return f"{key}:w{CLIMATOLOGY_WINDOW_DAYS}" if CLIMATOLOGY_WINDOW_DAYS > 0 else key
+
+
+def get_shared_predictions(city_coords, dates):
+
+    # Drop-in for data_fetcher.get_nasa_weather_for_dates backed by the shared cache: {date: (prediction, history, trend)}.
+    keys = {prediction_key(city_coords, d): d for d in dates}
+
+    def compute(missing_keys):
+        fresh = get_nasa_weather_for_dates(city_coords, [keys[k] for k in missing_keys])
+        return {prediction_key(city_coords, d): result for d, result in fresh.items()}
+
+    cached = get_prediction_cache().get_many(list(keys), compute, cacheable=lambda value: bool(value and value[0]))
+    return {d: cached.get(k) or (None, None, None) for k, d in keys.items()}
@@ -0,0 +1,149 @@
+# prompt_format.py
+import math
+import os
+
+import numpy as np
+
+
+# Weather context is capped at roughly this many tokens per prompt; prefill time on the local
+# model grows with prompt length.
+PROMPT_TOKEN_BUDGET = int(os.environ.get("CLIMAX_PROMPT_TOKEN_BUDGET", "1200"))
+CHARS_PER_TOKEN = 4
+
+PROMPT_COLUMNS = {
+    "temperature": "temp_c",
+    "humidity": "rh_pct",
+    "wind_speed": "wind_ms",
+    "precipitation": "precip_mm",
+    "pressure": "pressure_kpa",
+    "solar_radiation": "solar_wm2",
+}
+HOURLY_PROMPT_COLUMNS = {
+    "temperature": "temp_c",
+    "humidity": "rh_pct",
+    "wind_speed": "wind_ms",
+    "precipitation": "precip_mm",
+}
+
+
+def estimate_tokens(text):
+
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _format_value(value, digits):
+
+    if value is None:
+        return ""
+    value = float(value)
+    return "" if np.isnan(value) else f"{value:.{digits}f}"
+
+
+def _format_key(key):
+
+    if hasattr(key, "strftime"):
+        return f"{key.strftime('%Y-%m-%d')},{key.strftime('%a')}"
+    return f"{key},"
+
+
+def weather_table_rows(weather_data, columns=PROMPT_COLUMNS, digits=1):
+
+    # weather_data is a WeatherBlock or {date: {param: value}}; one CSV row per date.
+    header = "date,day," + ",".join(columns.values())
+    rows = []
+    for key, record in weather_data.items():
+        if not record:
+            continue
+        values = [_format_value(record.get(param), digits) for param in columns]
+        rows.append(_format_key(key) + "," + ",".join(values))
+    return header, rows
+
+
+def hourly_table_rows(hourly_weather_data, columns=HOURLY_PROMPT_COLUMNS, digits=1):
+
+    # {date: [{'hour': h, param: value, ...}, ...]} -> one CSV row per (date, hour).
+    header = "date,day,hour," + ",".join(columns.values())
+    rows = []
+    for key, hours in (hourly_weather_data or {}).items():
+        for hour_data in hours or []:
+            values = [_format_value(hour_data.get(param), digits) for param in columns]
+            rows.append(f"{_format_key(key)},{int(hour_data['hour']):02d}," + ",".join(values))
+    return header, rows
+
+
+def _summarize_rows(header, rows, digits):
+
+    # Column-wise min/mean/max over rows that did not fit the budget.
+    names = header.split(",")
+    cells = [row.split(",") for row in rows]
+    parts = []
+    for i, name in enumerate(names):
+        numbers = []
+        for row in cells:
+            try:
+                numbers.append(float(row[i]))
+            except (IndexError, ValueError):
+                continue
+        if numbers and name not in {"date", "day", "hour"}:
+            parts.append(f"{name} {min(numbers):.{digits}f}/{sum(numbers) / len(numbers):.{digits}f}/{max(numbers):.{digits}f}")
+    first, last = cells[0][0], cells[-1][0]
+    span = first if first == last else f"{first}..{last}"
+    return f"# {len(rows)} more rows ({span}) min/mean/max: " + "; ".join(parts)
+
+
+def fit_token_budget(header, rows, max_tokens=PROMPT_TOKEN_BUDGET, digits=1):
+
+    # Keep whole rows while they fit, then replace the rest with a one-line summary.
+    budget = max_tokens * CHARS_PER_TOKEN
+    lines = [header]
+    used = len(header) + 1
+    summary_reserve = 60 + 24 * header.count(",")
+    for i, row in enumerate(rows):
+        remaining = rows[i + 1:]
+        reserve = summary_reserve if remaining else 0
+        if used + len(row) + 1 + reserve > budget and i > 0:
+            lines.append(_summarize_rows(header, rows[i:], digits))
+            break
+        lines.append(row)
+        used += len(row) + 1
+    return "\n".join(lines)
+
+
+def format_weather_for_prompt(weather_data, max_tokens=PROMPT_TOKEN_BUDGET, digits=1):
+
+    header, rows = weather_table_rows(weather_data, digits=digits)
+    return fit_token_budget(header, rows, max_tokens, digits)
+
+
+def _coarsen_hours(hours, step):
+
+    # Average consecutive hours into step-hour blocks labelled by their first hour.
+    blocks = {}
+    for hour_data in hours or []:
+        blocks.setdefault(int(hour_data["hour"]) // step * step, []).append(hour_data)
+    coarse = []
+    for start, members in sorted(blocks.items()):
+        block = {"hour": start}
+        for param in HOURLY_PROMPT_COLUMNS:
+            values = [float(m[param]) for m in members if m.get(param) is not None and not np.isnan(float(m[param]))]
+            block[param] = sum(values) / len(values) if values else np.nan
+        coarse.append(block)
+    return coarse
+
+
+def format_hourly_for_prompt(hourly_weather_data, max_tokens=PROMPT_TOKEN_BUDGET, digits=1):
+
+    # Over budget, hours are first averaged into 3/6/12-hour blocks (so every day keeps its shape)
+    # before any rows are summarized away.
+    hourly_weather_data = hourly_weather_data or {}
+    for step in (1, 3, 6, 12):
+        data = hourly_weather_data if step == 1 else {
+            key: _coarsen_hours(hours, step) for key, hours in hourly_weather_data.items()
+        }
+        header, rows = hourly_table_rows(data, digits=digits)
+        if not rows:
+            return ""
+        text = "\n".join([header] + rows)
+        if estimate_tokens(text) <= max_tokens:
+            return text if step == 1 else f"# {step}-hour averages\n{text}"
+    return f"# {step}-hour averages\n" + fit_token_budget(header, rows, max_tokens, digits)
@@ -0,0 +1,215 @@
+# scheduler.py
+import re
+
+import numpy as np
+
+from utils import extract_time_from_activity
+
+
+# The same rules the planner prompts give the LLM, applied directly: every (activity, day, hour) slot
+# gets a score from the predicted weather and activities are placed greedily, so a schedule takes
+# well under a millisecond and the LLM is only needed for prose.
+COMFORT_RANGE_C = (18.0, 25.0)
+HOT_C = 30.0
+TOO_HOT_C = 32.0
+RAIN_LIGHT_MM = 1.0
+RAIN_HEAVY_MM = 5.0
+WIND_STRONG_MS = 10.0
+WIND_MAX_MS = 15.0
+# Daily POWER values are day means; without hourly data the temperature follows this cosine around
+# the mean, peaking mid-afternoon.
+DIURNAL_AMPLITUDE_C = 5.0
+DIURNAL_PEAK_HOUR = 15
+DAY_HOURS = range(6, 23)
+# Slots scoring below this break one of the hard rules (too hot, heavy rain, strong wind).
+UNSUITABLE = -100.0
+# Added to the hours an activity names ("morning jog", "evening walk").
+PREFERRED_HOURS_BONUS = 5.0
+# Weekly plans: each activity already placed on a day makes that day this much less attractive.
+DAY_LOAD_PENALTY = 1.5
+
+# Whole words only, so "Brunch", "Chess tournament", "campus" or "Run errands" stay indoors.
+OUTDOOR_KEYWORDS = (
+    "outdoors?", "outside", "parks?", "picnics?", "jog(?:s|ging)?", "running", "(?:a|morning|evening|trail|long) run",
+    "walk(?:s|ing)?", "hik(?:e|es|ing)", "bik(?:e|es|ing)", "cycl(?:e|es|ing)", "swim(?:s|ming)?", "beach(?:es)?",
+    "garden(?:s|ing)?", "football", "soccer", "tennis", "golf", "camp(?:s|ing)?", "fishing", "barbecue", "bbq",
+    "markets?", "tours?", "sightseeing", "playground", "zoo",
+)
+OUTDOOR_RE = re.compile(rf"\b(?:{'|'.join(OUTDOOR_KEYWORDS)})\b")
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+# "Monday: Team meeting", "Fri - Dinner": the activity only goes on that weekday.
+WEEKDAY_PREFIX_RE = re.compile(
+    rf"^({'|'.join(WEEKDAYS)}|{'|'.join(day[:3] for day in WEEKDAYS)})\.?\s*[:\-–]\s*(.+)$", re.IGNORECASE)
+TIME_OF_DAY_HOURS = {
+    "morning": range(6, 12), "breakfast": range(6, 11), "lunch": range(11, 15), "afternoon": range(12, 18),
+    "dinner": range(18, 22), "evening": range(17, 22), "night": range(19, 23),
+}
+
+
+def parse_activities(activities):
+
+    # Text (one per line) or a list -> [{"name", "outdoor", "minutes" (explicit start or None), "hours",
+    # "weekday" (0 = Monday, or None)}].
+    lines = activities.split("\n") if isinstance(activities, str) else list(activities)
+    parsed = []
+    for line in lines:
+        name = line.strip()
+        if not name:
+            continue
+        weekday = None
+        prefix = WEEKDAY_PREFIX_RE.match(name)
+        if prefix:
+            weekday = [day[:3] for day in WEEKDAYS].index(prefix.group(1)[:3].lower())
+            name = prefix.group(2).strip()
+        lowered = name.lower()
+        hours = [h for word, span in TIME_OF_DAY_HOURS.items() if re.search(rf"\b{word}", lowered) for h in span]
+        parsed.append({
+            "name": name,
+            "outdoor": bool(OUTDOOR_RE.search(lowered)),
+            "minutes": extract_time_from_activity(name),
+            "hours": sorted(set(hours)),
+            "weekday": weekday,
+        })
+    return parsed
+
+
+def hourly_grid(weather_data, dates, hourly_weather_data=None):
+
+    # -> temperature (D, 24), wind (D, 24) and daily precipitation (D,). Hourly predictions are used
+    # where present; otherwise the daily values are spread over the day.
+    hours = np.arange(24)
+    diurnal = DIURNAL_AMPLITUDE_C * np.cos(2 * np.pi * (hours - DIURNAL_PEAK_HOUR) / 24)
+    temperature = np.full((len(dates), 24), np.nan)
+    wind = np.full((len(dates), 24), np.nan)
+    rain = np.full(len(dates), np.nan)
+    for d, day in enumerate(dates):
+        daily = weather_data[day] if day in weather_data else {}
+        temperature[d] = daily.get("temperature", np.nan) + diurnal
+        wind[d] = daily.get("wind_speed", np.nan)
+        rain[d] = daily.get("precipitation", np.nan)
+        for hour_data in (hourly_weather_data or {}).get(day) or []:
+            h = int(hour_data["hour"])
+            temperature[d, h] = hour_data.get("temperature", temperature[d, h])
+            wind[d, h] = hour_data.get("wind_speed", wind[d, h])
+    return temperature, wind, rain
+
+
+def outdoor_scores(temperature, wind, rain):
+
+    # Higher is better; NaN weather counts as neutral.
+    low, high = COMFORT_RANGE_C
+    t = np.nan_to_num(temperature, nan=(low + high) / 2)
+    w = np.nan_to_num(wind, nan=0.0)
+    r = np.nan_to_num(rain, nan=0.0)[:, None]
+    score = -(np.maximum(low - t, 0) + np.maximum(t - high, 0))
+    score -= 2 * np.maximum(t - HOT_C, 0) + np.maximum(w - WIND_STRONG_MS, 0)
+    score -= np.where(r > RAIN_LIGHT_MM, 3.0, 0.0)
+    unsuitable = (t > TOO_HOT_C) | (w > WIND_MAX_MS) | (r > RAIN_HEAVY_MM)
+    return np.where(unsuitable, score + UNSUITABLE, score)
+
+
+def score_slots(parsed, outdoor):
+
+    # (activities, days, 24) scores from outdoor_scores(). Indoor activities lean slightly towards the
+    # hours that are bad outdoors, leaving the pleasant ones to outdoor activities; hours outside
+    # DAY_HOURS are never picked.
+    indoor = -0.1 * np.maximum(outdoor, UNSUITABLE)
+    is_outdoor = np.array([a["outdoor"] for a in parsed], dtype=bool)
+    scores = np.where(is_outdoor[:, None, None], outdoor[None], indoor[None])
+    preferred = np.zeros((len(parsed), 24))
+    for i, activity in enumerate(parsed):
+        preferred[i, activity["hours"]] = PREFERRED_HOURS_BONUS
+    scores = scores + preferred[:, None, :]
+    awake = np.full(24, -np.inf)
+    awake[list(DAY_HOURS)] = 0.0
+    return scores + awake
+
+
+def plan_schedule(weather_data, activities, plan_type, dates, hourly_weather_data=None):
+
+    # -> [{"activity", "date", "time", "outdoor", "temperature", "warning"}] sorted by date and time.
+    # Daily plans fill one day; weekly plans place each activity once somewhere in the week. Activities
+    # given a weekday only go on that day; when the plan has no such day they come last, with date and
+    # time None and the reason as the warning.
+    dates = list(dates)[:1] if plan_type == "Daily Plan" else list(dates)
+    weekdays = [day.weekday() for day in dates]
+    parsed, unscheduled = [], []
+    for activity in parse_activities(activities):
+        (parsed if activity["weekday"] is None or activity["weekday"] in weekdays else unscheduled).append(activity)
+    unscheduled = [{
+        "activity": activity["name"], "date": None, "time": None, "outdoor": activity["outdoor"], "temperature": None,
+        "warning": f"Only on {WEEKDAYS[activity['weekday']].title()}s, which this plan does not include.",
+    } for activity in unscheduled]
+    if not parsed or not dates:
+        return unscheduled
+    allowed = np.array([[a["weekday"] is None or a["weekday"] == w for w in weekdays] for a in parsed])
+    temperature, wind, rain = hourly_grid(weather_data, dates, hourly_weather_data)
+    outdoor = outdoor_scores(temperature, wind, rain)
+    scores = score_slots(parsed, outdoor)
+    taken = np.zeros((len(dates), 24), dtype=bool)
+    day_load = np.zeros(len(dates))
+
+    # Fixed times first, then the activities with the fewest usable slots.
+    order = sorted(range(len(parsed)), key=lambda i: (
+        parsed[i]["minutes"] is None, int((scores[i][allowed[i]] > UNSUITABLE / 2).sum())))
+    entries = []
+    for i in order:
+        activity = parsed[i]
+        candidates = scores[i] - DAY_LOAD_PENALTY * day_load[:, None]
+        if activity["minutes"] is not None:
+            hour = activity["minutes"] // 60
+            days = np.flatnonzero(allowed[i])
+            d = int(days[np.argmax(candidates[days, hour])])
+            minute = activity["minutes"] % 60
+        else:
+            candidates = np.where(allowed[i][:, None], candidates, -np.inf)
+            free = np.where(taken, -np.inf, candidates)
+            if np.isneginf(free).all():
+                free = candidates
+            d, hour = np.unravel_index(int(np.argmax(free)), candidates.shape)
+            d, hour, minute = int(d), int(hour), 0
+        taken[d, hour] = True
+        day_load[d] += 1
+        warning = None
+        if activity["outdoor"] and outdoor[d, hour] <= UNSUITABLE / 2:
+            warning = "Weather is poor for this outdoor activity; consider an indoor alternative."
+        entries.append({
+            "activity": activity["name"],
+            "date": dates[d],
+            "time": f"{hour:02d}:{minute:02d}",
+            "outdoor": activity["outdoor"],
+            "temperature": None if np.isnan(temperature[d, hour]) else round(float(temperature[d, hour]), 1),
+            "warning": warning,
+        })
+    return sorted(entries, key=lambda e: (e["date"], e["time"])) + unscheduled
+
+
+def _period(time_str):
+
+    hour = int(time_str[:2])
+    return "Morning" if hour < 12 else "Afternoon" if hour < 17 else "Evening"
+
+
+def format_schedule(entries):
+
+    # Markdown in the shape of the LLM plans: per day, grouped by morning/afternoon/evening, then the
+    # activities that could not be placed.
+    if not entries:
+        return "No activities to schedule."
+    lines = []
+    for day in sorted({e["date"] for e in entries if e["date"] is not None}):
+        lines.append(f"**{day.strftime('%A, %B %d')}**")
+        period = None
+        for entry in (e for e in entries if e["date"] == day):
+            if _period(entry["time"]) != period:
+                period = _period(entry["time"])
+                lines.append(f"- {period}")
+            detail = f" ({entry['temperature']:.0f}°C)" if entry["temperature"] is not None else ""
+            note = f" — {entry['warning']}" if entry["warning"] else ""
+            lines.append(f"  - {entry['time']} {entry['activity']}{detail}{note}")
+        lines.append("")
+    unscheduled = [e for e in entries if e["date"] is None]
+    if unscheduled:
+        lines.append("**Not scheduled**")
+        lines.extend(f"- {entry['activity']} — {entry['warning']}" for entry in unscheduled)
+    return "\n".join(lines).rstrip()
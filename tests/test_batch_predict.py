@@ -0,0 +1,27 @@
+# tests/test_batch_predict.py
+import pytest
+
+from batch_predict import main, normalize_locations, parse_point
+
+
+def test_blank_names_fall_back_to_coordinates_and_others_are_kept():
+
+    names = [name for name, _ in normalize_locations(
+        [(None, 1, 2), (float("nan"), 1, 2), ("  ", 1, 2), (42, 1, 2), (" Cairo ", 1, 2)])]
+    assert names == ["1.0000,2.0000", "1.0000,2.0000", "1.0000,2.0000", "42", "Cairo"]
+
+
+def test_parse_point():
+
+    assert parse_point("30.04,31.23") == (30.04, 31.23)
+    for value in ("30.04", "a,b", "1,2,3", "91,0"):
+        with pytest.raises(ValueError):
+            parse_point(value)
+
+
+def test_bad_point_is_a_usage_error(capsys):
+
+    with pytest.raises(SystemExit) as exit_info:
+        main(["--point", "30.04", "--start", "2026-01-01"])
+    assert exit_info.value.code == 2
+    assert "LAT,LON" in capsys.readouterr().err
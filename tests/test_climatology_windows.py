@@ -0,0 +1,96 @@
+# tests/test_climatology_windows.py
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+import data_fetcher
+import extremes
+from climatology_tiles import ClimatologyTile
+from data_fetcher import NASA_DATA_START_YEAR, WEATHER_PARAMS
+from weather_cache import WeatherCache
+
+LAST_YEAR = 2025
+TARGETS = [date(2026, 1, 1), date(2026, 1, 2), date(2026, 2, 28), date(2026, 3, 1), date(2026, 7, 1),
+           date(2025, 12, 31), date(2024, 2, 29), date(2024, 3, 1)]
+
+
+@pytest.fixture(scope="module")
+def series():
+
+    rng = np.random.default_rng(0)
+    day, end = date(NASA_DATA_START_YEAR, 1, 1), date(LAST_YEAR, 12, 31)
+    series = {}
+    while day <= end:
+        values = rng.normal(20, 5, len(WEATHER_PARAMS))
+        series[day.strftime("%Y%m%d")] = {p: float(v) for p, v in zip(WEATHER_PARAMS, values)}
+        day += timedelta(days=1)
+    return series
+
+
+@pytest.fixture
+def network(series, tmp_path, monkeypatch):
+
+    # The network path reads everything from a pre-filled cache; nothing may be fetched.
+    cache = WeatherCache(tmp_path / "daily.sqlite")
+    cache.put_many({"lat": 1.0, "lon": 2.0}, series)
+    monkeypatch.setattr(data_fetcher, "get_weather_cache", lambda: cache)
+    monkeypatch.setattr(data_fetcher, "_fetch_missing_days",
+                        lambda coords, missing: pytest.fail(f"unexpected fetch {missing}") if missing else {})
+    return data_fetcher._fetch_windowed_weather_data_for_dates
+
+
+def brute_force(series, target, year, k):
+
+    # Mean of the real calendar days around the target's day in `year`, stopping before the target year.
+    try:
+        anchor = date(year, target.month, target.day)
+    except ValueError:
+        anchor = date(year, 2, 28)
+    days = [anchor + timedelta(days=i) for i in range(-k, k + 1)]
+    rows = [series[d.strftime("%Y%m%d")] for d in days if d.year < target.year and d.strftime("%Y%m%d") in series]
+    return np.array([np.mean([r[p] for r in rows]) for p in WEATHER_PARAMS])
+
+
+@pytest.mark.parametrize("k", [3, 7])
+def test_tile_and_network_windows_match(series, network, k):
+
+    tile = ClimatologyTile.from_series("Test", {"lat": 1.0, "lon": 2.0}, series,
+                                       range(NASA_DATA_START_YEAR, LAST_YEAR + 1), WEATHER_PARAMS)
+    from_tile = dict(zip(TARGETS, tile.windowed_histories(TARGETS, k)))
+    from_network = network({"lat": 1.0, "lon": 2.0}, TARGETS, k)
+    for target in TARGETS:
+        assert list(from_tile[target].index) == list(from_network[target].index)
+        assert list(from_tile[target].index) == list(range(NASA_DATA_START_YEAR, target.year))
+        np.testing.assert_allclose(from_tile[target].values, from_network[target].values, rtol=1e-5)
+
+
+def test_windows_use_real_calendar_days(series):
+
+    tile = ClimatologyTile.from_series("Test", {"lat": 1.0, "lon": 2.0}, series,
+                                       range(NASA_DATA_START_YEAR, LAST_YEAR + 1), WEATHER_PARAMS)
+    for target, block in zip(TARGETS, tile.windowed_histories(TARGETS, 3)):
+        for year in (NASA_DATA_START_YEAR, 1999, 2000, target.year - 1):
+            row = block.values[list(block.index).index(year)]
+            np.testing.assert_allclose(row, brute_force(series, target, year, 3), rtol=1e-5)
+
+
+def test_extremes_table_and_history_paths_agree(series, network, monkeypatch):
+
+    # A trend window must not leak into the history path: both sides count single calendar days.
+    monkeypatch.setattr(data_fetcher, "CLIMATOLOGY_WINDOW_DAYS", 3)
+    monkeypatch.setattr(extremes, "_tables", {})
+    tile = ClimatologyTile.from_series("Test", {"lat": 1.0, "lon": 2.0}, series,
+                                       range(NASA_DATA_START_YEAR, LAST_YEAR + 1), WEATHER_PARAMS)
+    targets = [d for d in TARGETS if d.year == LAST_YEAR + 1]
+    monkeypatch.setattr(extremes, "find_climatology_tile", lambda coords, year: tile)
+    from_table = extremes.get_extremes_for_dates({"lat": 1.0, "lon": 2.0}, targets)
+    monkeypatch.setattr(extremes, "find_climatology_tile", lambda coords, year: None)
+    from_history = extremes.get_extremes_for_dates({"lat": 1.0, "lon": 2.0}, targets)
+
+    for target in targets:
+        table, history = from_table[target], from_history[target]
+        assert table["years"] == history["years"] == LAST_YEAR + 1 - NASA_DATA_START_YEAR
+        assert table["probabilities"] == pytest.approx(history["probabilities"], abs=2e-3)
+        for param in WEATHER_PARAMS:
+            assert table["percentiles"][param] == pytest.approx(history["percentiles"][param], abs=2e-3)
@@ -0,0 +1,17 @@
+# tests/test_import_budget.py
+import subprocess
+import sys
+
+import pytest
+
+from import_budget import ENTRY_POINTS, ROOT
+
+
+@pytest.mark.parametrize("entry", sorted(ENTRY_POINTS))
+def test_entry_point_imports_stay_within_budget(entry):
+
+    # The budget script itself, in a subprocess, exactly as it is run by hand; it exits 1 when an entry
+    # point is over budget or imports a lazy module up front.
+    proc = subprocess.run([sys.executable, str(ROOT / "benchmarks" / "import_budget.py"), entry],
+                          cwd=ROOT, capture_output=True, text=True, timeout=300)
+    assert proc.returncode == 0, proc.stdout + proc.stderr
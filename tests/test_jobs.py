@@ -0,0 +1,157 @@
+# tests/test_jobs.py
+import time
+from datetime import date
+
+import pytest
+
+import plan_jobs
+from data_fetcher import WEATHER_PARAMS
+from jobs import Job, JobRegistry
+from plan_jobs import PLAN_STAGES, run_plan
+
+
+def wait_done(job, timeout=5.0):
+
+    deadline = time.monotonic() + timeout
+    while not job.done:
+        assert time.monotonic() < deadline, f"job still {job.status}"
+        time.sleep(0.01)
+
+
+def block_until_cancelled(job):
+
+    job.start_stage("work")
+    job.cancel_event.wait(5)
+    job.start_stage("after")
+    return "finished"
+
+
+@pytest.fixture
+def registry():
+
+    registry = JobRegistry(max_workers=2, retention_seconds=60)
+    yield registry
+    for key in list(registry._jobs):
+        registry.cancel(key)
+
+
+def test_one_job_per_session_key(registry):
+
+    first = registry.submit("alice", lambda job: "a1")
+    wait_done(first)
+    second = registry.submit("alice", lambda job: "a2")
+    other = registry.submit("bob", lambda job: "b1")
+    wait_done(second)
+    wait_done(other)
+
+    assert registry.get("alice") is second and second.result == "a2"
+    assert registry.get("bob") is other and other.result == "b1"
+    assert registry.pop("alice", first) is None
+    assert registry.pop("alice", second) is second
+    assert registry.get("alice") is None
+
+
+def test_resubmitting_cancels_the_running_job(registry):
+
+    first = registry.submit("alice", block_until_cancelled, stages=("work", "after"))
+    while first.stage != "work":
+        time.sleep(0.01)
+    assert registry.active_count() == 1
+    second = registry.submit("alice", lambda job: "again")
+    wait_done(first)
+    wait_done(second)
+
+    assert first.status == "cancelled" and first.result is None
+    assert second.status == "done" and second.result == "again"
+    assert registry.active_count() == 0
+
+
+def test_uncollected_finished_jobs_are_pruned(registry):
+
+    stale = registry.submit("alice", lambda job: "old")
+    fresh = registry.submit("bob", lambda job: "new")
+    wait_done(stale)
+    wait_done(fresh)
+    stale.finished_at -= 120
+    running = registry.submit("carol", block_until_cancelled)
+
+    assert registry.get("alice") is None
+    assert registry.get("bob") is fresh
+    assert registry.get("carol") is running
+
+
+class StubPlanner:
+
+    # Stands in for the fetchers and the LLM, recording calls between the job's stage changes.
+    def __init__(self, monkeypatch, job, hourly_error=None):
+        self.events = []
+        self.hourly_error = hourly_error
+        start_stage = job.start_stage
+        monkeypatch.setattr(job, "start_stage", lambda name: (self.events.append(name), start_stage(name)))
+        monkeypatch.setattr(plan_jobs, "get_shared_predictions", self.predictions)
+        monkeypatch.setattr(plan_jobs, "get_hourly_predictions", self.hourly)
+        monkeypatch.setattr(plan_jobs, "get_extremes_for_dates", self.extremes)
+        monkeypatch.setattr(plan_jobs, "generate_schedule_with_ollama", self.schedule)
+        monkeypatch.setattr(plan_jobs, "get_plan_recommendations", self.recommendations)
+
+    def predictions(self, coords, dates):
+        self.events.append("get_shared_predictions")
+        return {d: ({param: 20.0 for param in WEATHER_PARAMS}, {}, {}) for d in dates}
+
+    def hourly(self, coords, dates):
+        self.events.append("get_hourly_predictions")
+        if self.hourly_error:
+            raise self.hourly_error
+        return {d: [{"hour": h, "temperature": 20.0} for h in range(24)] for d in dates}
+
+    def extremes(self, coords, dates):
+        self.events.append("get_extremes_for_dates")
+        return {d: {"years": 30} for d in dates}
+
+    def schedule(self, **kwargs):
+        self.events.append("generate_schedule_with_ollama")
+        yield from ("9:00 ", "walk")
+
+    def recommendations(self, weather_data, activities_list, stream, cancel_event):
+        self.events.append("get_plan_recommendations")
+        yield from ("Bring ", "water")
+
+
+def test_run_plan_stage_order(monkeypatch):
+
+    job = Job("alice", PLAN_STAGES)
+    stub = StubPlanner(monkeypatch, job)
+    day = date(2026, 7, 1)
+    result = run_plan(job, "Cairo", (30.04, 31.24), "Daily Plan", [day], "walk")
+
+    assert stub.events == [
+        "weather", "get_shared_predictions",
+        "hourly", "get_hourly_predictions",
+        "extremes", "get_extremes_for_dates",
+        "schedule", "generate_schedule_with_ollama",
+        "recommendations", "get_plan_recommendations",
+    ]
+    assert result["ai_schedule"] == job.text == "9:00 walk"
+    assert result["recommendations"] == job.recommendations == "Bring water"
+    assert result["extremes"] == {day: {"years": 30}}
+    assert len(result["hourly_weather_data"][day]) == 24
+    assert result["warnings"] == []
+
+
+def test_run_plan_warns_when_hourly_data_is_missing(monkeypatch):
+
+    job = Job("alice", PLAN_STAGES)
+    StubPlanner(monkeypatch, job, hourly_error=ValueError("truncated POWER response"))
+    result = run_plan(job, "Cairo", (30.04, 31.24), "Daily Plan", [date(2026, 7, 1)], "walk")
+
+    assert result["hourly_weather_data"] == {}
+    assert result["extremes"]
+    assert len(result["warnings"]) == 1 and "Hour-by-hour" in result["warnings"][0]
+
+
+def test_run_plan_does_not_hide_unexpected_errors(monkeypatch):
+
+    job = Job("alice", PLAN_STAGES)
+    StubPlanner(monkeypatch, job, hourly_error=TypeError("bug"))
+    with pytest.raises(TypeError):
+        run_plan(job, "Cairo", (30.04, 31.24), "Daily Plan", [date(2026, 7, 1)], "walk")
@@ -0,0 +1,46 @@
+# tests/test_llm_backends.py
+import pytest
+
+import llm_backends
+from ai_planner import llm_generate, llm_generate_stream
+from llm_backends import LLMBackend, LLMError, StubBackend, get_backend
+
+
+def test_backends_must_implement_generate_and_stream():
+
+    with pytest.raises(TypeError):
+        LLMBackend("model")
+
+    class Partial(LLMBackend):
+        def _generate(self, prompt, temperature, system, max_tokens):
+            return "text", 0, 0
+
+    with pytest.raises(TypeError):
+        Partial("model")
+
+
+def test_setup_failures_are_llm_errors(monkeypatch):
+
+    def broken(**kwargs):
+        raise RuntimeError("no API key")
+
+    monkeypatch.setitem(llm_backends.BACKENDS, "broken", broken)
+    with pytest.raises(LLMError, match="no API key"):
+        get_backend("broken")
+    with pytest.raises(LLMError):
+        get_backend("no-such-backend")
+
+
+def test_setup_failures_come_back_as_warning_text(monkeypatch):
+
+    monkeypatch.setitem(llm_backends.BACKENDS, "broken", lambda **kwargs: 1 / 0)
+    assert llm_generate("prompt", backend="broken").startswith("⚠️ LLM error (broken)")
+    chunks = list(llm_generate_stream("prompt", backend="broken"))
+    assert len(chunks) == 1 and chunks[0].startswith("⚠️ LLM error (broken)")
+
+
+def test_stub_backend_generates_and_streams_the_same_text():
+
+    backend = StubBackend()
+    text = backend.generate("a prompt", use_cache=False)
+    assert "".join(backend.stream("a prompt", use_cache=False)) == text
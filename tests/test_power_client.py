@@ -0,0 +1,103 @@
+# tests/test_power_client.py
+import json
+
+import pytest
+import requests
+
+import power_client
+from power_client import _retry_delay, fetch_json, fetch_json_many
+
+URL = "https://power.example/api?start=20200101&end=20200102"
+
+
+class StubResponse:
+
+    def __init__(self, status_code=200, payload=None, body=None, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.content = body if body is not None else json.dumps(payload or {}).encode()
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class StubSession:
+
+    # Replays `responses` in order; an exception instance is raised instead of returned.
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def get(self, url, timeout=None):
+        self.calls += 1
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+@pytest.fixture
+def session(monkeypatch):
+
+    delays = []
+    monkeypatch.setattr(power_client._rate_limiter, "rate", 0)
+    monkeypatch.setattr(power_client.time, "sleep", delays.append)
+
+    def use(*responses):
+        stub = StubSession(*responses)
+        stub.delays = delays
+        monkeypatch.setattr(power_client, "_session", stub)
+        return stub
+
+    return use
+
+
+@pytest.mark.parametrize("status", sorted(power_client.RETRY_STATUSES))
+def test_transient_statuses_are_retried(session, status):
+
+    stub = session(StubResponse(status), StubResponse(payload={"ok": 1}))
+    assert fetch_json(URL, max_retries=2) == {"ok": 1}
+    assert stub.calls == 2 and len(stub.delays) == 1
+
+
+def test_connection_errors_are_retried(session):
+
+    stub = session(requests.exceptions.ConnectionError(), requests.exceptions.Timeout(), StubResponse(payload={"ok": 1}))
+    assert fetch_json(URL, max_retries=2) == {"ok": 1}
+    assert stub.calls == 3
+
+
+def test_truncated_json_is_retried(session):
+
+    stub = session(StubResponse(body=b'{"properties": {"param'), StubResponse(payload={"ok": 1}))
+    assert fetch_json(URL, max_retries=1) == {"ok": 1}
+    assert stub.calls == 2
+
+
+def test_client_errors_are_not_retried(session):
+
+    stub = session(StubResponse(404), StubResponse(payload={"ok": 1}))
+    assert fetch_json(URL, max_retries=3) is None
+    assert stub.calls == 1 and not stub.delays
+
+
+def test_gives_up_after_the_retries(session):
+
+    stub = session(*[StubResponse(503)] * 3)
+    assert fetch_json(URL, max_retries=2) is None
+    assert stub.calls == 3 and len(stub.delays) == 2
+
+
+def test_retry_after_is_honoured_and_capped():
+
+    assert _retry_delay(0, StubResponse(429, headers={"Retry-After": "2"})) == 2.0
+    assert _retry_delay(0, StubResponse(429, headers={"Retry-After": "9999"})) == power_client.POWER_BACKOFF_MAX_SECONDS
+    for attempt in range(6):
+        delay = _retry_delay(attempt, StubResponse(503))
+        assert 0 <= delay <= min(power_client.POWER_BACKOFF_MAX_SECONDS, power_client.POWER_BACKOFF_SECONDS * 2 ** attempt)
+
+
+def test_fetch_json_many_keeps_input_order_and_marks_failures(session):
+
+    session(StubResponse(payload={"n": 1}), StubResponse(404))
+    assert fetch_json_many([URL, URL], max_workers=1) == [{"n": 1}, None]
@@ -0,0 +1,105 @@
+# tests/test_power_fetch.py
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pytest
+
+import data_fetcher
+import power_client
+from config import CITIES
+from data_fetcher import POWER_PARAMETERS, _fetch_missing_days
+from power_fixtures import FixtureResponse, FixtureSession, load_fixtures
+from weather_cache import WeatherCache
+
+CAIRO = CITIES["Cairo"]
+
+
+class FlakySession(FixtureSession):
+
+    # Multi-year requests fail with a 503, as an overloaded POWER does for big chunks; single-year windows work.
+    def __init__(self, series):
+        super().__init__(series)
+        self.urls = []
+
+    def get(self, url, timeout=None, **kwargs):
+
+        self.urls.append(url)
+        query = parse_qs(urlparse(url).query)
+        if query["start"][0][:4] != query["end"][0][:4]:
+            return FixtureResponse({}, 503)
+        return super().get(url, timeout, **kwargs)
+
+
+@pytest.fixture(scope="module")
+def fixture_series():
+
+    return load_fixtures({"Cairo": CAIRO}, list(POWER_PARAMETERS.values()), 1981, 2025)
+
+
+@pytest.fixture
+def power(fixture_series, tmp_path, monkeypatch):
+
+    # POWER is the checked-in fixture set; no rate limit or backoff sleeps, a throwaway cache.
+    monkeypatch.setattr(power_client._rate_limiter, "rate", 0)
+    monkeypatch.setattr(power_client, "_retry_delay", lambda attempt, response=None: 0)
+    monkeypatch.setattr(data_fetcher, "get_weather_cache", lambda: WeatherCache(tmp_path / "daily.sqlite"))
+
+    def use(session_class=FixtureSession):
+        session = session_class(fixture_series)
+        monkeypatch.setattr(power_client, "_session", session)
+        return session
+
+    return use
+
+
+def expected(fixture_series, ds):
+
+    params = fixture_series[(CAIRO["lat"], CAIRO["lon"])]
+    return {name: params[code][ds] for name, code in POWER_PARAMETERS.items()}
+
+
+def assert_day(found, fixture_series, ds):
+
+    want = expected(fixture_series, ds)
+    for name, value in want.items():
+        if value == -999:
+            assert np.isnan(found[ds][name])
+        else:
+            assert found[ds][name] == value
+
+
+def test_chunk_responses_are_sliced_per_day(power, fixture_series):
+
+    session = power()
+    # Every year 1981-2000 misses Mar 1 and, in leap years, Feb 29: two 15-year chunks, one request each.
+    missing = {year: [f"{year}0301"] + ([f"{year}0229"] if year % 4 == 0 else []) for year in range(1981, 2001)}
+    found = _fetch_missing_days(CAIRO, missing)
+    assert session.requests == 2
+    for days in missing.values():
+        for ds in days:
+            assert_day(found, fixture_series, ds)
+    assert "19840229" in found and "19850229" not in found
+    assert len([ds for ds in found if ds[:4] == "1990"]) == 365
+
+
+def test_few_missing_years_are_fetched_as_windows(power, fixture_series):
+
+    session = power(FlakySession)
+    found = _fetch_missing_days(CAIRO, {2020: ["20200228", "20200301"], 2021: ["20210105"]})
+    assert len(session.urls) == 2
+    assert sorted(found) == ["20200228", "20200229", "20200301", "20210105"]
+    for ds in found:
+        assert_day(found, fixture_series, ds)
+
+
+def test_failed_chunk_is_split_into_year_windows(power, fixture_series):
+
+    session = power(FlakySession)
+    missing = {year: [f"{year}0710", f"{year}0712"] for year in range(1981, 1987)}
+    found = _fetch_missing_days(CAIRO, missing)
+    # The 1981-1995 chunk fails every attempt, then each year goes out as its own Jul 10-12 window.
+    chunk_attempts = power_client.POWER_MAX_RETRIES + 1
+    assert len(session.urls) == chunk_attempts + len(missing)
+    assert sorted(found) == sorted(f"{year}07{day}" for year in missing for day in (10, 11, 12))
+    for ds in found:
+        assert_day(found, fixture_series, ds)
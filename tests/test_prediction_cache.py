@@ -0,0 +1,175 @@
+# tests/test_prediction_cache.py
+import threading
+import time
+
+import pytest
+
+from metrics import METRICS
+from prediction_cache import REDIS_PREFIX, MemoryStore, PredictionCache, RedisStore
+
+
+def wait_for_waiters(before, count=1, timeout=5.0):
+
+    # A caller blocked on another's computation shows up in the prediction_cache_waits counter.
+    deadline = time.monotonic() + timeout
+    while METRICS.snapshot()["counters"].get("prediction_cache_waits", 0) < before + count:
+        assert time.monotonic() < deadline, "second caller never started waiting"
+        time.sleep(0.01)
+
+
+def test_concurrent_callers_share_one_computation():
+
+    cache = PredictionCache(MemoryStore())
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def compute(keys):
+        calls.append(list(keys))
+        started.set()
+        release.wait(5)
+        return {key: f"value-{key}" for key in keys}
+
+    results = {}
+    before = METRICS.snapshot()["counters"].get("prediction_cache_waits", 0)
+    owner = threading.Thread(target=lambda: results.update(owner=cache.get_many(["a"], compute)))
+    owner.start()
+    assert started.wait(5)
+    waiter = threading.Thread(target=lambda: results.update(waiter=cache.get_many(["a"], compute)))
+    waiter.start()
+    wait_for_waiters(before)
+    release.set()
+    owner.join(5)
+    waiter.join(5)
+
+    assert calls == [["a"]]
+    assert results["owner"] == results["waiter"] == {"a": "value-a"}
+    assert cache.get_many(["a"], compute) == {"a": "value-a"}
+    assert calls == [["a"]]
+
+
+def test_failure_reaches_waiters_and_is_not_cached():
+
+    cache = PredictionCache(MemoryStore())
+    started, release = threading.Event(), threading.Event()
+
+    def failing(keys):
+        started.set()
+        release.wait(5)
+        raise RuntimeError("POWER down")
+
+    errors = {}
+
+    def call(name):
+        try:
+            cache.get_many(["a"], failing)
+        except RuntimeError as e:
+            errors[name] = e
+
+    before = METRICS.snapshot()["counters"].get("prediction_cache_waits", 0)
+    owner = threading.Thread(target=call, args=("owner",))
+    owner.start()
+    assert started.wait(5)
+    waiter = threading.Thread(target=call, args=("waiter",))
+    waiter.start()
+    wait_for_waiters(before)
+    release.set()
+    owner.join(5)
+    waiter.join(5)
+
+    assert str(errors["owner"]) == str(errors["waiter"]) == "POWER down"
+    assert cache.get_many(["a"], lambda keys: {key: 1 for key in keys}) == {"a": 1}
+
+
+def test_uncacheable_values_are_recomputed():
+
+    cache = PredictionCache(MemoryStore())
+    calls = []
+
+    def compute(keys):
+        calls.append(list(keys))
+        return {key: None for key in keys}
+
+    assert cache.get_many(["a"], compute) == {"a": None}
+    assert cache.get_many(["a"], compute) == {"a": None}
+    assert calls == [["a"], ["a"]]
+
+
+def test_memory_store_expires_entries():
+
+    store = MemoryStore(max_entries=2)
+    store.set("a", 1, ttl=0.01)
+    store.set("b", 2, ttl=60)
+    time.sleep(0.02)
+    assert store.get("a") is None
+    assert store.get("b") == 2
+
+
+@pytest.mark.parametrize("max_entries", [1, 2])
+def test_memory_store_evicts_least_recently_used(max_entries):
+
+    store = MemoryStore(max_entries=max_entries)
+    store.set("a", 1, ttl=60)
+    store.set("b", 2, ttl=60)
+    assert store.get("b") == 2
+    assert (store.get("a") == 1) == (max_entries == 2)
+
+
+def test_slow_leader_is_not_waited_for_past_the_deadline():
+
+    cache = PredictionCache(MemoryStore(), wait_seconds=0.05)
+    started, release = threading.Event(), threading.Event()
+
+    def slow(keys):
+        started.set()
+        release.wait(5)
+        return {key: "leader" for key in keys}
+
+    owner = threading.Thread(target=lambda: cache.get_many(["a"], slow))
+    owner.start()
+    assert started.wait(5)
+    try:
+        assert cache.get_many(["a"], lambda keys: {key: "local" for key in keys}) == {"a": "local"}
+    finally:
+        release.set()
+        owner.join(5)
+
+
+class FakeRedis:
+
+    # The few commands RedisStore uses; eval() only understands the check-and-delete unlock script.
+    def __init__(self):
+        self.data = {}
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value.encode() if isinstance(value, str) else value
+        return True
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def exists(self, key):
+        return int(key in self.data)
+
+    def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def eval(self, script, numkeys, key, token):
+        if self.data.get(key) == token.encode():
+            return self.delete(key)
+        return 0
+
+
+def test_redis_unlock_only_releases_its_own_lock():
+
+    client = FakeRedis()
+    slow, fast = RedisStore(client=client), RedisStore(client=client)
+    assert slow.lock("k", 10)
+    assert not fast.lock("k", 10)
+    client.delete(REDIS_PREFIX + "lock:k")  # the slow holder's lock expires
+    assert fast.lock("k", 10)
+    slow.unlock("k")
+    assert fast.locked("k")
+    fast.unlock("k")
+    assert not fast.locked("k")
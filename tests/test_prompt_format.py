@@ -0,0 +1,88 @@
+# tests/test_prompt_format.py
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from prompt_format import (estimate_tokens, fit_token_budget, format_hourly_for_prompt, format_weather_for_prompt,
+                           hourly_table_rows)
+
+WEEK = [date(2026, 7, 6) + timedelta(days=i) for i in range(7)]
+
+
+def hourly_week():
+
+    # Temperature is the hour itself, so block averages are easy to check.
+    return {day: [{"hour": h, "temperature": float(h), "humidity": 50.0, "wind_speed": 3.0, "precipitation": 0.0}
+                  for h in range(24)] for day in WEEK}
+
+
+def test_rows_that_fit_are_kept_whole():
+
+    header, rows = "date,temp_c", ["2026-07-06,20.0", "2026-07-07,22.0"]
+    assert fit_token_budget(header, rows, max_tokens=1000) == "date,temp_c\n2026-07-06,20.0\n2026-07-07,22.0"
+
+
+def test_rows_over_budget_become_a_summary():
+
+    header = "date,temp_c,rh_pct"
+    rows = [f"2026-07-{day:02d},{day:.1f},50.0" for day in range(1, 31)]
+    text = fit_token_budget(header, rows, max_tokens=60)
+    lines = text.split("\n")
+    kept = lines[1:-1]
+
+    assert lines[0] == header and kept == rows[:len(kept)] and kept
+    dropped = len(rows) - len(kept)
+    first = len(kept) + 1
+    assert lines[-1] == (f"# {dropped} more rows (2026-07-{first:02d}..2026-07-30) min/mean/max: "
+                         f"temp_c {first:.1f}/{(first + 30) / 2:.1f}/30.0; rh_pct 50.0/50.0/50.0")
+    assert estimate_tokens(text) <= 60
+
+
+def test_first_row_is_kept_even_over_budget():
+
+    lines = fit_token_budget("date,temp_c", ["2026-07-06,20.0", "2026-07-07,22.0"], max_tokens=1).split("\n")
+    assert lines[:2] == ["date,temp_c", "2026-07-06,20.0"]
+    assert lines[2].startswith("# 1 more rows (2026-07-07)")
+
+
+def test_weather_rows_leave_missing_values_blank():
+
+    text = format_weather_for_prompt({WEEK[0]: {"temperature": 20.04, "humidity": np.nan}, WEEK[1]: {}})
+    assert text.split("\n") == ["date,day,temp_c,rh_pct,wind_ms,precip_mm,pressure_kpa,solar_wm2",
+                                "2026-07-06,Mon,20.0,,,,,"]
+
+
+def test_hourly_within_budget_is_not_coarsened():
+
+    data = {WEEK[0]: hourly_week()[WEEK[0]]}
+    header, rows = hourly_table_rows(data)
+    assert format_hourly_for_prompt(data, max_tokens=10000) == "\n".join([header] + rows)
+
+
+@pytest.mark.parametrize("max_tokens, step", [(600, 3), (300, 6), (150, 12)])
+def test_hourly_is_coarsened_to_fit(max_tokens, step):
+
+    text = format_hourly_for_prompt(hourly_week(), max_tokens=max_tokens)
+    lines = text.split("\n")
+
+    assert lines[0] == f"# {step}-hour averages"
+    assert len(lines) == 2 + len(WEEK) * 24 // step
+    assert estimate_tokens(text) <= max_tokens
+    first_block = lines[2].split(",")
+    assert first_block[:3] == ["2026-07-06", "Mon", "00"]
+    assert float(first_block[3]) == pytest.approx((step - 1) / 2, abs=0.05)
+
+
+def test_hourly_falls_back_to_a_summary_when_even_12_hours_do_not_fit():
+
+    lines = format_hourly_for_prompt(hourly_week(), max_tokens=60).split("\n")
+    assert lines[0] == "# 12-hour averages"
+    assert lines[-1].startswith("# ") and "more rows" in lines[-1]
+    assert len(lines) < 2 + len(WEEK) * 2
+
+
+def test_no_hourly_data():
+
+    assert format_hourly_for_prompt(None) == ""
+    assert format_hourly_for_prompt({WEEK[0]: []}) == ""
@@ -0,0 +1,84 @@
+# tests/test_scheduler.py
+from datetime import date, timedelta
+
+import pytest
+
+from scheduler import format_schedule, parse_activities, plan_schedule
+
+MONDAY = date(2026, 7, 6)
+WEEK = [MONDAY + timedelta(days=i) for i in range(7)]
+MILD = {"temperature": 21.0, "wind_speed": 3.0, "precipitation": 0.0}
+
+
+@pytest.mark.parametrize("name, outdoor", [
+    ("Park picnic", True),
+    ("Morning jog", True),
+    ("Walking the dog", True),
+    ("Go for a run", True),
+    ("Brunch with friends", False),
+    ("Chess tournament", False),
+    ("Campus visit", False),
+    ("Run errands", False),
+    ("Sparkling wine tasting", False),
+])
+def test_outdoor_keywords_match_whole_words(name, outdoor):
+
+    assert parse_activities(name)[0]["outdoor"] is outdoor
+
+
+@pytest.mark.parametrize("line, weekday, name", [
+    ("Monday: Team meeting", 0, "Team meeting"),
+    ("fri - Dinner at 7:30 PM", 4, "Dinner at 7:30 PM"),
+    ("Sun. – Beach day", 6, "Beach day"),
+    ("Sunday brunch", None, "Sunday brunch"),
+    ("Mondays are for reading", None, "Mondays are for reading"),
+])
+def test_weekday_prefixes(line, weekday, name):
+
+    (activity,) = parse_activities(line)
+    assert (activity["weekday"], activity["name"]) == (weekday, name)
+
+
+def test_parse_activities_reads_times_and_periods():
+
+    dinner, jog = parse_activities("Fri: Dinner at 7:30 PM\n\n  Morning jog  ")
+    assert dinner["minutes"] == 19 * 60 + 30 and dinner["hours"] == list(range(18, 22))
+    assert jog["name"] == "Morning jog" and jog["minutes"] is None and jog["hours"] == list(range(6, 12))
+
+
+def test_weekday_activities_go_on_their_day():
+
+    weather = {day: dict(MILD) for day in WEEK}
+    entries = plan_schedule(weather, "Wednesday: Team meeting\nSat - Dinner at 7:30 PM", "Weekly Plan", WEEK)
+
+    assert [(e["activity"], e["date"]) for e in entries] == [("Team meeting", WEEK[2]), ("Dinner at 7:30 PM", WEEK[5])]
+    assert entries[1]["time"] == "19:30"
+
+
+def test_outdoor_activity_avoids_heavy_rain():
+
+    weather = {day: {**MILD, "precipitation": 20.0} for day in WEEK}
+    weather[WEEK[3]] = dict(MILD)
+    (entry,) = plan_schedule(weather, "Picnic in the park", "Weekly Plan", WEEK)
+
+    assert entry["date"] == WEEK[3] and entry["warning"] is None
+
+
+def test_activities_for_missing_weekdays_are_listed_as_not_scheduled():
+
+    entries = plan_schedule({MONDAY: MILD}, "Morning jog\nFriday: Team meeting", "Daily Plan", [MONDAY])
+
+    assert [(e["activity"], e["date"]) for e in entries] == [("Morning jog", MONDAY), ("Team meeting", None)]
+    assert entries[1]["time"] is None and "Friday" in entries[1]["warning"]
+    text = format_schedule(entries)
+    assert text.startswith("**Monday, July 06**")
+    assert text.endswith("**Not scheduled**\n- Team meeting — " + entries[1]["warning"])
+
+
+def test_only_unscheduled_activities():
+
+    entries = plan_schedule({MONDAY: MILD}, "Tue: Dentist", "Daily Plan", [MONDAY])
+
+    assert [(e["activity"], e["date"]) for e in entries] == [("Dentist", None)]
+    assert format_schedule(entries).startswith("**Not scheduled**")
+    assert format_schedule([]) == "No activities to schedule."
@@ -0,0 +1,51 @@
+# tests/test_trends.py
+import warnings
+
+import numpy as np
+
+from trends import fit_linear_trends, predict_from_trends, window_means
+
+
+def test_fit_linear_trends_matches_polyfit():
+
+    rng = np.random.default_rng(1)
+    years = np.arange(1981, 2026)
+    values = rng.normal(20, 5, (3, len(years), 4)) + 0.05 * (years - 1981)[None, :, None]
+    values[0, ::7, 1] = np.nan
+    slopes, intercepts = fit_linear_trends(years, values)
+    for d in range(values.shape[0]):
+        for p in range(values.shape[2]):
+            keep = ~np.isnan(values[d, :, p])
+            slope, intercept = np.polyfit(years[keep], values[d, keep, p], 1)
+            np.testing.assert_allclose([slopes[d, p], intercepts[d, p]], [slope, intercept], rtol=1e-6)
+    np.testing.assert_allclose(predict_from_trends(slopes, intercepts, np.full(3, 2026)),
+                               slopes * 2026 + intercepts)
+
+
+def test_fit_linear_trends_needs_two_points():
+
+    years = np.arange(2000, 2005)
+    values = np.full((len(years), 2), np.nan)
+    values[2, 0] = 1.0
+    values[:, 1] = 5.0
+    slopes, intercepts = fit_linear_trends(years, values)
+    assert np.isnan(slopes[0]) and np.isnan(intercepts[0])
+    assert slopes[1] == 0.0 and intercepts[1] == 5.0
+
+
+def test_window_means_matches_nanmean():
+
+    rng = np.random.default_rng(2)
+    values = rng.normal(size=(50, 3))
+    values[rng.random(values.shape) < 0.2] = np.nan
+    lo = np.array([0, 5, 10, 49, 20])
+    hi = np.array([0, 14, 30, 49, 19])
+    means = window_means(values, lo, hi)
+    for i, (a, b) in enumerate(zip(lo, hi)):
+        if b < a:
+            assert np.isnan(means[i]).all()
+            continue
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            expected = np.nanmean(values[a:b + 1], axis=0)
+        np.testing.assert_allclose(means[i], expected, rtol=1e-12, equal_nan=True)
@@ -0,0 +1,85 @@
+# tests/test_weather_cache.py
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+import weather_cache
+from weather_cache import HourlyCache, WeatherCache
+
+POINT = {"lat": 30.0444, "lon": 31.2357}
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+
+    clock = Clock()
+    monkeypatch.setattr(weather_cache.time, "time", clock)
+    return clock
+
+
+def record(value):
+
+    return {"temperature": value, "humidity": 50.0}
+
+
+def test_final_rows_never_expire_provisional_rows_do(tmp_path, clock):
+
+    cache = WeatherCache(tmp_path / "daily.sqlite", provisional_days=90, ttl_seconds=3600)
+    recent = (datetime.now() - timedelta(days=2)).strftime("%Y%m%d")
+    cache.put_many(POINT, {"20000101": record(1.0), recent: record(2.0)})
+
+    clock.now += 3599
+    assert set(cache.get_many(POINT, ["20000101", recent])) == {"20000101", recent}
+    clock.now += 2
+    found = cache.get_many(POINT, ["20000101", recent])
+    assert set(found) == {"20000101"}
+    assert found["20000101"]["temperature"] == 1.0
+    assert np.isnan(found["20000101"]["pressure"])
+
+    cache.put_many(POINT, {recent: record(3.0)})
+    assert cache.get_many(POINT, [recent])[recent]["temperature"] == 3.0
+
+
+def test_least_recently_read_rows_are_evicted(tmp_path, clock):
+
+    cache = WeatherCache(tmp_path / "daily.sqlite", max_rows=10)
+    old = [f"199001{day:02d}" for day in range(1, 11)]
+    cache.put_many(POINT, {ds: record(1.0) for ds in old})
+    clock.now += 1
+    cache.get_many(POINT, old[:5])
+    clock.now += 1
+    cache.put_many(POINT, {"20000101": record(2.0), "20000102": record(3.0)})
+
+    # 12 rows over a cap of 10: down to 9, dropping the three oldest that were never read again.
+    stats = cache.stats()
+    assert stats["rows"] == 9 and stats["evictions"] == 3
+    kept = cache.get_many(POINT, old + ["20000101", "20000102"])
+    assert set(old[5:8]).isdisjoint(kept)
+    assert set(old[:5]) | set(old[8:]) | {"20000101", "20000102"} == set(kept)
+
+
+def test_points_are_keyed_by_rounded_coordinates(tmp_path):
+
+    cache = WeatherCache(tmp_path / "daily.sqlite")
+    cache.put_many(POINT, {"20000101": record(1.0)})
+    assert cache.get_many({"lat": 30.04441, "lon": 31.23569}, ["20000101"])
+    assert not cache.get_many({"lat": 30.05, "lon": 31.2357}, ["20000101"])
+
+
+def test_hourly_rows_round_trip_and_check_the_layout(tmp_path):
+
+    cache = HourlyCache(tmp_path / "hourly.sqlite")
+    block = np.arange(48, dtype=np.float32).reshape(24, 2)
+    cache.put_many(POINT, {"20000101": block}, ["temperature", "humidity"])
+    np.testing.assert_array_equal(cache.get_many(POINT, ["20000101"], ["temperature", "humidity"])["20000101"], block)
+    assert cache.get_many(POINT, ["20000101"], ["temperature"]) == {}
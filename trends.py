@@ -0,0 +1,61 @@
+# trends.py
+import numpy as np
+
+
+def stack_histories(histories):
+
+    # [WeatherBlock indexed by year, ...] -> (years, values) with values shaped (days, years, params);
+    # years missing from a given day are NaN so they drop out of that day's fit.
+    years = np.unique(np.concatenate([history.index for history in histories])).astype(int)
+    params = histories[0].params
+    values = np.full((len(histories), len(years), len(params)), np.nan)
+    for d, history in enumerate(histories):
+        if len(history):
+            values[d, np.searchsorted(years, history.index)] = history.values
+    return years, values
+
+
+def fit_linear_trends(years, values, min_points=2):
+
+    # Least-squares line per series along the year axis (-2), ignoring NaNs, in closed form:
+    # slope = sum(dx * dy) / sum(dx^2) with dx, dy centred on the masked means.
+    # values is (..., years, params); slopes and intercepts come back as (..., params).
+    values = np.asarray(values, dtype=float)
+    x = np.asarray(years, dtype=float).reshape((-1, 1))
+    mask = ~np.isnan(values)
+    n = mask.sum(axis=-2)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_x = np.where(mask, x, 0.0).sum(axis=-2) / n
+        mean_y = np.where(mask, values, 0.0).sum(axis=-2) / n
+        dx = np.where(mask, x - mean_x[..., None, :], 0.0)
+        dy = np.where(mask, values - mean_y[..., None, :], 0.0)
+        sxx = (dx * dx).sum(axis=-2)
+        slopes = (dx * dy).sum(axis=-2) / sxx
+        intercepts = mean_y - slopes * mean_x
+
+    invalid = (n < min_points) | (sxx == 0)
+    slopes[invalid] = np.nan
+    intercepts[invalid] = np.nan
+    return slopes, intercepts
+
+
+def predict_from_trends(slopes, intercepts, target_years):
+
+    # target_years broadcasts against the leading (day) axis of slopes/intercepts.
+    target_years = np.asarray(target_years, dtype=float)
+    return slopes * target_years[..., None] + intercepts
+
+
+def window_means(values, lo, hi):
+
+    # NaN-aware mean of rows lo[i]..hi[i] (inclusive) along axis 0, for every window at once, from
+    # running sums: O(rows + windows) whatever the window width. Empty windows give NaN.
+    values = np.asarray(values, dtype=float)
+    valid = ~np.isnan(values)
+    zero = np.zeros((1,) + values.shape[1:])
+    sums = np.concatenate([zero, np.cumsum(np.where(valid, values, 0.0), axis=0)])
+    counts = np.concatenate([zero, np.cumsum(valid, axis=0)])
+    lo, hi = np.asarray(lo, dtype=int), np.asarray(hi, dtype=int) + 1
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (sums[hi] - sums[lo]) / (counts[hi] - counts[lo])
@@ -0,0 +1,68 @@
+# weather_block.py
+import numpy as np
+
+
+class WeatherBlock:
+
+    # Array-backed table of weather values: one float32 row per key (a year of history, or a
+    # predicted date) and one column per parameter. Reads like the old {key: {param: value}} dicts
+    # (len, `in`, block[key][param], items()) without boxing every value as a Python float.
+    __slots__ = ("index", "values", "params")
+
+    def __init__(self, index, values, params):
+        self.index = np.asarray(index)
+        self.values = np.asarray(values, dtype=np.float32).reshape(len(self.index), len(params))
+        self.params = tuple(params)
+
+    @classmethod
+    def from_records(cls, records, params):
+
+        keys = list(records)
+        values = np.full((len(keys), len(params)), np.nan, dtype=np.float32)
+        for i, key in enumerate(keys):
+            record = records[key]
+            for p, param in enumerate(params):
+                value = record.get(param)
+                if value is not None:
+                    values[i, p] = value
+        index = np.array(keys, dtype=int if all(isinstance(k, (int, np.integer)) for k in keys) else object)
+        return cls(index, values, params)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __bool__(self):
+        return len(self.index) > 0
+
+    def __contains__(self, key):
+        return bool((self.index == key).any()) if len(self.index) else False
+
+    def __getitem__(self, key):
+        positions = np.flatnonzero(self.index == key)
+        if not len(positions):
+            raise KeyError(key)
+        return self.row(positions[0])
+
+    def __repr__(self):
+        return f"WeatherBlock({len(self)} rows x {len(self.params)} params)"
+
+    def keys(self):
+        return self.index.tolist()
+
+    def row(self, position):
+        return {param: float(value) for param, value in zip(self.params, self.values[position])}
+
+    def items(self):
+        for position, key in enumerate(self.index.tolist()):
+            yield key, self.row(position)
+
+    def column(self, param):
+        return self.values[:, self.params.index(param)]
+
+    def to_frame(self, index_name=None):
+
+        import pandas as pd
+
+        frame = pd.DataFrame(self.values, index=self.index, columns=list(self.params))
+        frame.index.name = index_name
+        return frame
@@ -0,0 +1,228 @@
+# weather_cache.py
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+from coords import coord_key
+from metrics import incr
+
+
+ROOT = Path(__file__).resolve().parent
+
+CACHE_PATH = Path(os.environ.get("CLIMAX_CACHE_DIR", "").strip() or ROOT / ".cache") / "power_daily.sqlite"
+# POWER keeps revising the last few months; anything older is final and cached forever.
+PROVISIONAL_DAYS = int(os.environ.get("CLIMAX_CACHE_PROVISIONAL_DAYS", "90"))
+PROVISIONAL_TTL_SECONDS = int(os.environ.get("CLIMAX_CACHE_TTL_SECONDS", str(24 * 3600)))
+MAX_ROWS = int(os.environ.get("CLIMAX_CACHE_MAX_ROWS", "1000000"))
+HOURLY_CACHE_PATH = CACHE_PATH.with_name("power_hourly.sqlite")
+HOURLY_MAX_ROWS = int(os.environ.get("CLIMAX_HOURLY_CACHE_MAX_ROWS", "200000"))
+
+CACHE_COLUMNS = ["temperature", "humidity", "wind_speed", "precipitation", "pressure", "solar_radiation"]
+
+
+class _DayCache:
+
+    # One SQLite table keyed by (point, day) with the freshness rules and LRU cap shared by the daily and
+    # hourly caches; subclasses name the table and its value columns and decode the rows they read.
+    table = None
+    columns_sql = None
+    metric = None
+
+    def __init__(self, path, provisional_days, ttl_seconds, max_rows):
+        self.path = Path(path)
+        self.provisional_days = provisional_days
+        self.ttl_seconds = ttl_seconds
+        self.max_rows = max_rows
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"""CREATE TABLE IF NOT EXISTS {self.table} (
+                lat REAL NOT NULL, lon REAL NOT NULL, date TEXT NOT NULL, {self.columns_sql},
+                fetched_at REAL NOT NULL, accessed_at REAL NOT NULL,
+                PRIMARY KEY (lat, lon, date))"""
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_accessed ON {self.table} (accessed_at)")
+        self._conn.commit()
+
+    def _is_provisional(self, date_str):
+
+        cutoff = (datetime.now() - timedelta(days=self.provisional_days)).strftime("%Y%m%d")
+        return date_str >= cutoff
+
+    def _read(self, city_coords, date_strs, columns, decode):
+
+        # -> {date_str: decode(values)} for the fresh rows; stale provisional rows and rows decode()
+        # turns into None count as misses.
+        date_strs = [str(d) for d in date_strs]
+        if not date_strs:
+            return {}
+        lat, lon = coord_key(city_coords)
+        now = time.time()
+        found = {}
+        with self._lock:
+            for i in range(0, len(date_strs), 500):
+                chunk = date_strs[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT date, fetched_at, {', '.join(columns)} FROM {self.table} "
+                    f"WHERE lat = ? AND lon = ? AND date IN ({', '.join('?' * len(chunk))})",
+                    [lat, lon, *chunk],
+                ).fetchall()
+                for date_str, fetched_at, *values in rows:
+                    if self._is_provisional(date_str) and now - fetched_at > self.ttl_seconds:
+                        continue
+                    value = decode(values)
+                    if value is not None:
+                        found[date_str] = value
+            if found:
+                self._conn.executemany(
+                    f"UPDATE {self.table} SET accessed_at = ? WHERE lat = ? AND lon = ? AND date = ?",
+                    [(now, lat, lon, d) for d in found],
+                )
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(date_strs) - len(found)
+        incr(f"{self.metric}_hits", len(found))
+        incr(f"{self.metric}_misses", len(date_strs) - len(found))
+        return found
+
+    def _write(self, city_coords, rows, columns):
+
+        # rows: {date_str: [value per column]}
+        if not rows:
+            return
+        lat, lon = coord_key(city_coords)
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (lat, lon, date, {', '.join(columns)}, fetched_at, accessed_at) "
+                f"VALUES ({', '.join('?' * (len(columns) + 5))})",
+                [(lat, lon, str(d), *values, now, now) for d, values in rows.items()],
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+
+        # LRU: once over the cap, drop the least recently read rows down to 90% of it.
+        count = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        if count <= self.max_rows:
+            return
+        excess = count - int(self.max_rows * 0.9)
+        self._conn.execute(
+            f"DELETE FROM {self.table} WHERE rowid IN (SELECT rowid FROM {self.table} ORDER BY accessed_at LIMIT ?)",
+            (excess,),
+        )
+        self.evictions += excess
+
+    def stats(self):
+
+        with self._lock:
+            rows = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "rows": rows,
+            "evictions": self.evictions,
+            "path": str(self.path),
+        }
+
+    def clear(self):
+
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._conn.commit()
+            self.hits = self.misses = self.evictions = 0
+
+
+class WeatherCache(_DayCache):
+
+    table = "daily"
+    columns_sql = ", ".join(f"{c} REAL" for c in CACHE_COLUMNS)
+    metric = "weather_cache"
+
+    def __init__(self, path=CACHE_PATH, provisional_days=PROVISIONAL_DAYS,
+                 ttl_seconds=PROVISIONAL_TTL_SECONDS, max_rows=MAX_ROWS):
+        super().__init__(path, provisional_days, ttl_seconds, max_rows)
+
+    def get_many(self, city_coords, date_strs):
+
+        # Returns {date_str: {param: value}} for the fresh rows; stale provisional rows count as misses.
+        return self._read(city_coords, date_strs, CACHE_COLUMNS,
+                          lambda values: {c: (np.nan if v is None else v) for c, v in zip(CACHE_COLUMNS, values)})
+
+    def put_many(self, city_coords, series):
+
+        rows = {}
+        for date_str, record in series.items():
+            values = [record.get(c, np.nan) for c in CACHE_COLUMNS]
+            rows[date_str] = [None if v is None or np.isnan(v) else float(v) for v in values]
+        self._write(city_coords, rows, CACHE_COLUMNS)
+
+
+class HourlyCache(_DayCache):
+
+    # One row per (point, day) holding that day's 24 x params float32 block as raw bytes, so an hourly
+    # history is 24x more values than the daily one but not 24x more rows.
+    table = "hourly"
+    columns_sql = "params TEXT NOT NULL, data BLOB NOT NULL"
+    metric = "hourly_cache"
+
+    def __init__(self, path=HOURLY_CACHE_PATH, provisional_days=PROVISIONAL_DAYS,
+                 ttl_seconds=PROVISIONAL_TTL_SECONDS, max_rows=HOURLY_MAX_ROWS):
+        super().__init__(path, provisional_days, ttl_seconds, max_rows)
+
+    def get_many(self, city_coords, date_strs, params):
+
+        # -> {date_str: float32 array (24, len(params))}; rows stored with another parameter layout are misses.
+        layout = ",".join(params)
+
+        def decode(values):
+            row_layout, data = values
+            if row_layout != layout:
+                return None
+            return np.frombuffer(data, dtype=np.float32).reshape(24, len(params))
+
+        return self._read(city_coords, date_strs, ("params", "data"), decode)
+
+    def put_many(self, city_coords, days, params):
+
+        # days: {date_str: array (24, len(params))}
+        layout = ",".join(params)
+        self._write(city_coords, {d: [layout, np.ascontiguousarray(block, dtype=np.float32).tobytes()]
+                                  for d, block in days.items()}, ("params", "data"))
+
+
+_cache = None
+_cache_lock = threading.Lock()
+_hourly_cache = None
+
+
+def get_weather_cache():
+
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = WeatherCache()
+        return _cache
+
+
+def get_hourly_cache():
+
+    global _hourly_cache
+    with _cache_lock:
+        if _hourly_cache is None:
+            _hourly_cache = HourlyCache()
+        return _hourly_cache